@@ -1,18 +1,30 @@
 from datetime import datetime
+from typing import Optional
 from select import select
 from fastapi import APIRouter,Depends, HTTPException, logger
 from pydantic import BaseModel
 from sqlalchemy import Select, func, text
 from app.models.document import Document
 from app.models.notification import Notification, NotificationTargetType
+from app.schema.pagination import Page
 from app.schema.document import DocumentApproveRequest, DocumentResponse, VerificationStatus
 from app.schema.notification import NotificationCreate, NotificationResponse
 from app.schema.user import UserDashboardResponse, UserRole,get_super_admin_role,get_sub_admin_role,UserResponse
 from app.core.database import get_db
+from app.core.entity_loader import load_user
+from app.core.read_replicas import get_db_read
+from app.core.pagination import PageParams, page_params, paginate
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import RegistrationStatus, User
-from app.models.registration import RegistrationInfo, RegistrationProduct
+from app.models.registration import PartnershipLevel, RegistrationInfo, RegistrationProduct
 from app.services.auth.jwt import get_current_user
+from app.api.routes.document import required_types_for
+from app.services.document_summary import summarize
+from app.core.rate_limit import rate_limit_stats
+from app.core.sql_instrumentation import slow_query_stats
+from app.core.invalidation import invalidation_bus
+from app.core.db_deadlines import deadline_stats
+from app.services.auth.password_service import password_service
 from app.schema.category import PersonalInfoDashboardResponse
 import logging
 
@@ -83,36 +95,40 @@ async def approve_registration(
 
 
 
-@admin_router.get("/users",response_model=list[UserDashboardResponse])
+@admin_router.get("/users",response_model=Page[UserDashboardResponse])
 async def get_users(
+    partnership:Optional[PartnershipLevel]=None,
     role:UserRole=Depends(get_super_admin_role),
-    db:AsyncSession=Depends(get_db)
+    page:PageParams=Depends(page_params),
+    db:AsyncSession=Depends(get_db_read)
 ):
     if role not in [get_super_admin_role(),get_sub_admin_role()]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     try:
-        result=await db.execute(
-            Select(User).filter(User.role not in [UserRole.super_admin, UserRole.sub_admin])
-        )
-        users=result.scalars().all()
-        return users
+        stmt = Select(User).filter(User.role not in [UserRole.super_admin, UserRole.sub_admin])
+        if partnership is not None:
+            # Containment on the JSONB array, answered from ix_users_partnership_level
+            stmt = stmt.filter(User.holds_partnership(partnership))
+        return await paginate(db, stmt, User, page)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users:{str(e)}")
     
-@admin_router.get("/document-info",response_model=list[DocumentResponse])
+@admin_router.get("/document-info",response_model=Page[DocumentResponse])
 async def get_users(
     role:UserRole=Depends(get_super_admin_role),
-    db:AsyncSession=Depends(get_db)
+    page:PageParams=Depends(page_params),
+    db:AsyncSession=Depends(get_db_read)
 ):
     if role not in [get_super_admin_role(),get_sub_admin_role()]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     try:
-        result=await db.execute(
-            Select(Document) )
-        users=result.scalars().all()
-        return users
+        return await paginate(db, Select(Document), Document, page)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users:{str(e)}")
     
@@ -121,7 +137,7 @@ async def get_users(
 async def get_users(
     user_id:int,
     role:UserRole=Depends(get_super_admin_role),
-    db:AsyncSession=Depends(get_db)
+    db:AsyncSession=Depends(get_db_read)
 ):
     if role not in [get_super_admin_role(),get_sub_admin_role()]:
         raise HTTPException(status_code=403, detail="Access denied")
@@ -136,7 +152,7 @@ async def get_users(
     
 
 @admin_router.get("/registrationinfo/{user_id}",response_model=PersonalInfoDashboardResponse)
-async def get_user(user_id:int,role:UserRole=Depends(get_super_admin_role),db:AsyncSession=Depends(get_db)):
+async def get_user(user_id:int,role:UserRole=Depends(get_super_admin_role),db:AsyncSession=Depends(get_db_read)):
 
     if role not in [get_super_admin_role(),get_sub_admin_role()]:
         raise HTTPException(status_code=403, detail="Access denied")
@@ -154,7 +170,7 @@ async def get_user(user_id:int,role:UserRole=Depends(get_super_admin_role),db:As
         raise HTTPException(status_code=500, detail=f"Failed to fetch user: {str(e)}")
     
 @admin_router.get("/user/{user_id}",response_model=UserDashboardResponse)
-async def get_user(user_id:int,role:UserRole=Depends(get_super_admin_role),db:AsyncSession=Depends(get_db)):
+async def get_user(user_id:int,role:UserRole=Depends(get_super_admin_role),db:AsyncSession=Depends(get_db_read)):
 
     if role not in [get_super_admin_role(),get_sub_admin_role()]:
         raise HTTPException(status_code=403, detail="Access denied")
@@ -263,6 +279,16 @@ async def approve_document(
         db.add(user_notification)
         
         db.add(document)
+
+        if request.approve:
+            # Approving the last required document completes the document step
+            # Summarised in this transaction, so it already counts this approval
+            verified_types = (await summarize(db, document.user_id)).verified_types
+            user = await load_user(db, document.user_id)
+            if user and user.registration_step < 4 and all(t in verified_types for t in required_types_for(user.role)):
+                user.registration_step = 4
+                db.add(user)
+
         await db.commit()
         await db.refresh(document)
         
@@ -280,7 +306,7 @@ async def get_user_product_data(
     user_id: int,
     current_user: UserResponse = Depends(get_current_user),
      role: UserRole = Depends(get_super_admin_role),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_read)
 ):
     try:
         result = await db.execute(
@@ -402,4 +428,51 @@ async def update_kpi_score(
     except Exception as e:
         await db.rollback()
         logger.error(f"Error updating KPI score for document {user_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to update KPI score: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to update KPI score: {str(e)}")
+
+
+@admin_router.get("/metrics/rate-limits", status_code=200)
+async def get_rate_limit_metrics(
+    top: int = 10,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    if current_user.role not in [get_super_admin_role(), get_sub_admin_role()]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {"limiters": rate_limit_stats(top)}
+
+
+@admin_router.get("/metrics/password-hashing", status_code=200)
+async def get_password_hashing_metrics(
+    current_user: UserResponse = Depends(get_current_user)
+):
+    if current_user.role not in [get_super_admin_role(), get_sub_admin_role()]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return password_service.stats()
+
+
+@admin_router.get("/metrics/slow-queries", status_code=200)
+async def get_slow_query_metrics(
+    top: int = 20,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    if current_user.role not in [get_super_admin_role(), get_sub_admin_role()]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {"statements": slow_query_stats.top(top)}
+
+
+@admin_router.get("/metrics/cache-invalidation", status_code=200)
+async def get_cache_invalidation_metrics(
+    current_user: UserResponse = Depends(get_current_user)
+):
+    if current_user.role not in [get_super_admin_role(), get_sub_admin_role()]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return invalidation_bus.stats()
+
+
+@admin_router.get("/metrics/db-deadlines", status_code=200)
+async def get_db_deadline_metrics(
+    current_user: UserResponse = Depends(get_current_user)
+):
+    if current_user.role not in [get_super_admin_role(), get_sub_admin_role()]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return deadline_stats.snapshot()
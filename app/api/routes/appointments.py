@@ -3,7 +3,10 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.read_replicas import get_db_read
+from app.core.pagination import PageParams, page_params, paginate
 from app.models.appointment import Appointment, VerificationStatus
+from app.schema.pagination import Page
 from app.schema.appointment import AppointmentByDayResponse, AppointmentResponse
 from datetime import date, datetime, timedelta, time
 from typing import List, Optional
@@ -13,6 +16,8 @@ import pytz
 import uuid
 
 from app.schema.user import UserResponse
+from app.services.storage import save_upload
+from app.utils.uploads import max_size_for
 from app.services.auth.jwt import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -22,20 +27,16 @@ ALLOWED_EXTENSIONS = [".pdf", ".doc", ".docx"]
 
 
 
-@appointment_router.get("/", response_model=List[AppointmentResponse])
+@appointment_router.get("/", response_model=Page[AppointmentResponse])
 async def get_appointments(
-    db: AsyncSession = Depends(get_db)
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_db_read)
 ):
 
     try:
-        result = await db.execute(
-            select(Appointment).filter(
-            ).order_by(Appointment.appointment_date, Appointment.appointment_time)
-        )
-        appointments = result.scalars().all()
-        if not appointments:
-            return []
-        return [AppointmentResponse.from_orm(appointment) for appointment in appointments]
+        return await paginate(db, select(Appointment), Appointment, page)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching appointments: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch appointments: {str(e)}")
@@ -153,13 +154,12 @@ async def create_appointment(
             )
         try:
             upload_dir = "uploads/documents"
-            os.makedirs(upload_dir, exist_ok=True)
             unique_filename = f"appointment_{uuid.uuid4()}{file_ext}"
             file_path = os.path.join(upload_dir, unique_filename)
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            await save_upload(file, file_path, max_size_for("appointment"))
             file_name = file.filename
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error uploading file: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
@@ -199,7 +199,7 @@ async def create_appointment(
 @appointment_router.get("/getAppointmentByDay", response_model=AppointmentByDayResponse)
 async def get_appointment_by_day(
     date: str = Query(..., description="Date in YYYY-MM-DD format"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_read)
 ):
     try:
         # Validate and parse date
@@ -237,7 +237,7 @@ async def get_appointment_by_day(
 @appointment_router.get("/user-appointement", response_model=List[AppointmentResponse])
 async def get_appointments(
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_read)
 
 ):
     try:
@@ -9,8 +9,11 @@ from app.models.otp import OTP
 load_dotenv()
 from jose import JWTError
 from pydantic import BaseModel
-from app.core.security import get_password_hash, verify_password
-from app.services.auth.jwt import create_access_token, create_refresh_token, role_required
+from app.services.auth.password_service import password_service
+from app.services.auth.jwt import create_access_token, create_refresh_token, role_required, oauth2_scheme
+from app.services.auth.revocation import revocation_service
+from app.core.rate_limit import login_limiter, forgot_password_limiter, resend_otp_limiter, verify_otp_limiter
+from app.services.auth.token_cache import token_digest
 from app.utils.email import send_otp_email, verify_otp_code
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -93,7 +96,8 @@ async def update_sub_admin_endpoint(
 
 
 @auth_router.post("/verify/otp", response_model=Token)
-async def verify_otp(email: str, otp: str, db: AsyncSession = Depends(get_db)):
+async def verify_otp(email: str, otp: str, request: Request, db: AsyncSession = Depends(get_db)):
+    await verify_otp_limiter.check(request, email)
     # Strip quotes from OTP
     clean_otp = otp.strip('"')
     logger.debug(f"Verify OTP for email: {email}, otp: {clean_otp}")
@@ -119,7 +123,8 @@ async def verify_otp(email: str, otp: str, db: AsyncSession = Depends(get_db)):
         role=user.role.value,
         visibility_level=user.visibility_level,
         ownership=user.ownership,
-        expires_delta=timedelta(hours=1)
+        expires_delta=timedelta(hours=1),
+        permissions_version=user.permissions_version
     )
     refresh_token = create_refresh_token(
         username=user.username,
@@ -128,7 +133,8 @@ async def verify_otp(email: str, otp: str, db: AsyncSession = Depends(get_db)):
         role=user.role.value,
         visibility_level=user.visibility_level,
         ownership=user.ownership,
-        expires_delta=timedelta(days=7)
+        expires_delta=timedelta(days=7),
+        permissions_version=user.permissions_version
     )
     return Token(
         access_token=access_token,
@@ -141,12 +147,14 @@ async def verify_otp(email: str, otp: str, db: AsyncSession = Depends(get_db)):
     )
 
 @auth_router.post("/login", response_model=Token)
-async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
+async def login(user: UserLogin, request: Request, db: AsyncSession = Depends(get_db)):
+    await login_limiter.check(request, user.email)
     logger.debug(f"Login payload: {user.dict()}")
     return await login_user(db, user)
 
 @auth_router.post("/forgot/password")
-async def forgot_password(email: str, db: AsyncSession = Depends(get_db)):
+async def forgot_password(email: str, request: Request, db: AsyncSession = Depends(get_db)):
+    await forgot_password_limiter.check(request, email)
     logger.debug(f"Forgot password for email: {email}")
     result = await db.execute(select(User).filter(User.email == email))
     user = result.scalar_one_or_none()
@@ -168,7 +176,7 @@ async def reset_password(email: str, otp: str, new_password: str, db: AsyncSessi
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.password_hash = get_password_hash(new_password)
+    user.password_hash = await password_service.hash_password(new_password)
     db.add(user)
     await db.commit()
     return {"message": "Password reset successfully"}
@@ -183,17 +191,29 @@ async def change_password(
     logger.debug(f"Change password for user_id: {current_user.id}")
     result = await db.execute(select(User).filter(User.id == current_user.id))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(current_password, user.password_hash):
+    if not user or not user.password_hash or not await password_service.verify_password(current_password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid current password")
     
-    user.password_hash = get_password_hash(new_password)
+    user.password_hash = await password_service.hash_password(new_password)
     db.add(user)
     await db.commit()
     return {"message": "Password changed successfully"}
 
 @auth_router.post("/logout")
-async def logout(current_user: UserResponse = Depends(role_required("vendor", "buyer", "super_admin", "sub_admin"))):
+async def logout(
+    request: Optional[RefreshTokenRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: UserResponse = Depends(role_required("vendor", "buyer", "super_admin", "sub_admin"))
+):
     logger.debug(f"Logout for user_id: {current_user.id}")
+    await revocation_service.revoke(token)
+    if request and request.refresh_token:
+        try:
+            payload = jwt.decode(request.refresh_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"])
+            if payload.get("user_id") == current_user.id:
+                await revocation_service.revoke(request.refresh_token)
+        except JWTError:
+            logger.warning(f"Ignoring invalid refresh token on logout for user_id: {current_user.id}")
     return {"message": "Logged out successfully"}
 
 
@@ -344,6 +364,8 @@ async def google_callback_endpoint(request: Request, db: AsyncSession = Depends(
 @auth_router.post("/refresh-token", response_model=Token)
 async def refresh_token_endpoint(request: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
     logger.debug("Processing refresh token request")
+    if revocation_service.is_revoked(token_digest(request.refresh_token)):
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
     try:
         payload = jwt.decode(request.refresh_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"])
         email: str = payload.get("sub")
@@ -352,10 +374,15 @@ async def refresh_token_endpoint(request: RefreshTokenRequest, db: AsyncSession
         visibility_level: Optional[int] = payload.get("visibility_level")
         ownership: Optional[dict] = payload.get("ownership")
         
-        if not email or not user_id or not role:
-            raise HTTPException(status_code=401, detail="Invalid refresh token")
-        
-        result = await db.execute(select(User).filter(User.id == user_id, User.email == email))
+        if "pv" in payload:
+            # Compact token: only the principal id is carried
+            if not user_id:
+                raise HTTPException(status_code=401, detail="Invalid refresh token")
+            result = await db.execute(select(User).filter(User.id == user_id))
+        else:
+            if not email or not user_id or not role:
+                raise HTTPException(status_code=401, detail="Invalid refresh token")
+            result = await db.execute(select(User).filter(User.id == user_id, User.email == email))
         user = result.scalar_one_or_none()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -369,7 +396,8 @@ async def refresh_token_endpoint(request: RefreshTokenRequest, db: AsyncSession
             role=user.role.value,
             visibility_level=user.visibility_level,
             ownership=user.ownership,
-            expires_delta=timedelta(hours=1)
+            expires_delta=timedelta(hours=1),
+            permissions_version=user.permissions_version
         )
         refresh_token = create_refresh_token(
             username=user.username,
@@ -378,9 +406,10 @@ async def refresh_token_endpoint(request: RefreshTokenRequest, db: AsyncSession
             role=user.role.value,
             visibility_level=user.visibility_level,
             ownership=user.ownership,
-            expires_delta=timedelta(days=7)
+            expires_delta=timedelta(days=7),
+            permissions_version=user.permissions_version
         )
-        logger.info(f"Token refreshed for user {email}")
+        logger.info(f"Token refreshed for user {user.email}")
         return Token(
             access_token=access_token,
             token_type="bearer",
@@ -399,7 +428,8 @@ async def refresh_token_endpoint(request: RefreshTokenRequest, db: AsyncSession
     
 
 @auth_router.post("/resend-otp")
-async def resend_otp(request: ResendOTPRequest, db: AsyncSession = Depends(get_db)):
+async def resend_otp(request: ResendOTPRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
+    await resend_otp_limiter.check(http_request, request.email)
     logger.debug(f"Resend OTP for email: {request.email}")
     result = await db.execute(select(User).filter(User.email == request.email))
     user = result.scalar_one_or_none()
@@ -1,19 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, status
 from fastapi.params import Form
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.read_replicas import get_db_read
+from app.core.pagination import PageParams, page_params, paginate
+from app.core.invalidation import invalidation_bus
 from app.models.document import Document, VerificationStatus
 from app.models.notification import Notification, NotificationTargetType
-from app.models.user import User
-from app.schema.document import DocumentResponse, DocumentReuploadRequest
-from app.services.auth.jwt import get_current_user
+from app.schema.document import (
+    DocumentResponse, DocumentReuploadRequest,
+    DocumentPresignRequest, DocumentPresignResponse, DocumentConfirmRequest,
+)
+from app.services.auth.jwt import get_current_user, SECRET_KEY, ALGORITHM
+from app.schema.pagination import Page
 from app.schema.user import UserResponse
+from app.services.blob_store import blob_store
+from app.services.document_summary import document_summary_cache
+from app.services.storage import storage, incoming_key, STORAGE_PRESIGN_EXPIRY
+from app.utils.uploads import max_size_for
 import os
 import logging
-import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from jose import JWTError, jwt
 
 logger = logging.getLogger(__name__)
 doc_router = APIRouter(prefix="/user", tags=["documents"])
@@ -50,23 +60,76 @@ BUYER_REQUIRED_TYPES = [
     "certifications"
 ]
 
-async def save_file(file: UploadFile, user_id: int, document_type: str) -> str:
+async def save_files(db: AsyncSession, files: list[UploadFile], user_id: int, document_type: str) -> list[str]:
+    """Store the uploads in the blob store (identical bytes are kept once) and return the blob paths, in order"""
     try:
-        upload_dir = f"uploads/documents/{user_id}"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        unique_filename = f"{document_type}_{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        return file_path
+        stored = await blob_store.store_many(db, files, max_size_for(document_type))
+        for file, blob in zip(files, stored):
+            if blob.deduplicated:
+                logger.debug(f"{file.filename} from user {user_id} matches stored blob {blob.sha256}")
+        return [blob.path for blob in stored]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving file for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
+async def save_file(db: AsyncSession, file: UploadFile, user_id: int, document_type: str) -> str:
+    return (await save_files(db, [file], user_id, document_type))[0]
+
+def required_types_for(role) -> list[str]:
+    return VENDOR_REQUIRED_TYPES if role == "vendor" else BUYER_REQUIRED_TYPES
+
+def upload_notification_message(document_ids: list[int], document_type: str, user_id: int) -> str:
+    if len(document_ids) == 1:
+        return f"Document {document_ids[0]} ({document_type}) uploaded by user_id={user_id} awaiting approval."
+    shown = ", ".join(str(id) for id in document_ids[:20])
+    if len(document_ids) > 20:
+        shown += f" and {len(document_ids) - 20} more"
+    return f"{len(document_ids)} documents ({document_type}) uploaded by user_id={user_id} awaiting approval: {shown}."
+
+async def replace_document_file(db: AsyncSession, document: Document, file_path: str, file_url: str, user_id: int):
+    """Point `document` at a new file, send it back to review and notify the admins"""
+    await blob_store.release(db, [document.file_path])
+
+    document.file_path = file_path
+    document.file_url = file_url
+    document.ai_verification_status = VerificationStatus.PENDING
+    document.updated_at = func.now()
+    
+    # Create notification for admins
+    admin_notification = Notification(
+        admin_id=user_id,
+        message=f"Document {document.id} ({document.document_type}) re-uploaded by user_id={user_id} awaiting approval.",
+        target_type=NotificationTargetType.ALL_ADMINS,
+        visibility=True
+    )
+    db.add(admin_notification)
+    db.add(document)
+
+def create_upload_token(user_id: int, key: str, document_type: str, file_name: str, sha256: str) -> str:
+    # Outlives the presigned form, so an upload finishing right at the deadline can still be confirmed
+    expire = datetime.utcnow() + timedelta(seconds=STORAGE_PRESIGN_EXPIRY) + timedelta(hours=1)
+    claims = {
+        "purpose": "document_upload",
+        "user_id": user_id,
+        "key": key,
+        "document_type": document_type,
+        "file_name": file_name,
+        "sha256": sha256,
+        "exp": expire,
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_upload_token(token: str, user_id: int) -> dict:
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+    if claims.get("purpose") != "document_upload" or claims.get("user_id") != user_id:
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+    return claims
+
 @doc_router.post("/documents", status_code=status.HTTP_201_CREATED)
 async def upload_document(
     document_type: str,
@@ -98,70 +161,46 @@ async def upload_document(
         )
 
     try:
-        document_ids = []
-        for file in files:
-            file_path = await save_file(file, current_user.id, document_type)
-            
-            new_document = Document(
-                user_id=current_user.id,
-                document_type=document_type,
-                file_path=file_path,
-                file_url=file_url,
-                file_name=file.filename,
-                ai_verification_status=VerificationStatus.PENDING,
-            )
-
-            db.add(new_document)
-            await db.flush()  # Ensure ID is generated
-            document_ids.append(new_document.id)
-
-            admin_notification = Notification(
-                admin_id=current_user.id,
-                message=f"Document {new_document.id} ({new_document.document_type}) uploaded by user_id={current_user.id} awaiting approval.",
-                target_type=NotificationTargetType.ALL_ADMINS,
-                visibility=True
-            )
-            db.add(admin_notification)
-
-        await db.commit()  
-        logger.debug(f"Committed documents for user {current_user.email}: {document_ids}")
-
+        # Files are received and written concurrently (bounded), then all rows go in with one INSERT
+        file_paths = await save_files(db, files, current_user.id, document_type)
         result = await db.execute(
-            select(Document).filter(Document.id.in_(document_ids))
+            insert(Document).returning(Document.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": current_user.id,
+                    "document_type": document_type,
+                    "file_path": file_path,
+                    "file_url": file_url,
+                    "file_name": file.filename,
+                    "ai_verification_status": VerificationStatus.PENDING,
+                }
+                for file, file_path in zip(files, file_paths)
+            ],
         )
-        saved_documents = result.scalars().all()
-        if len(saved_documents) != len(document_ids):
-            raise HTTPException(
-                status_code=500,
-                detail=f"Only {len(saved_documents)} out of {len(document_ids)} documents saved in database"
-            )
-
-        await db.refresh(new_document)  # Refresh the last document
+        document_ids = list(result.scalars().all())
+        # A bulk INSERT skips the flush hooks, so evict the owner's progress summary explicitly
+        await invalidation_bus.publish(db, "document_summary", current_user.id)
 
-        result = await db.execute(
-            select(Document).filter(Document.user_id == current_user.id)
+        admin_notification = Notification(
+            admin_id=current_user.id,
+            message=upload_notification_message(document_ids, document_type, current_user.id),
+            target_type=NotificationTargetType.ALL_ADMINS,
+            visibility=True
         )
-        documents = result.scalars().all()
-        required_types = VENDOR_REQUIRED_TYPES if current_user.role == "vendor" else BUYER_REQUIRED_TYPES
-        verified_types = {doc.document_type for doc in documents if doc.ai_verification_status == VerificationStatus.PASS}
-        
-        if all(t in verified_types for t in required_types):
-            result = await db.execute(
-                select(User).filter(User.id == current_user.id)
-            )
-            user = result.scalar_one_or_none()
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-            if user.registration_step < 4:
-                user.registration_step = 4
-                db.add(user)
-                await db.commit()
+        db.add(admin_notification)
+
+        # The new rows are all PENDING, so they cannot complete the required set;
+        # the move to registration step 4 happens when the last one is approved.
+        await db.commit()
 
         logger.info(f"Documents uploaded successfully for user {current_user.email}: {document_ids}")
         return {
             "message": "Documents uploaded successfully",
             "documents": document_ids
         }
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         await db.rollback()
         logger.error(f"Error uploading documents for {current_user.email}: {str(e)}")
@@ -169,43 +208,61 @@ async def upload_document(
 
 @doc_router.get("/documents/progress")
 async def get_document_progress(
+    include_documents: bool = Query(False, description="also list each uploaded document; costs a row per document, prefer GET /user/documents"),
     current_user: UserResponse = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     logger.debug(f"Fetching document progress for {current_user.email}")
     try:
-        result = await db.execute(
-            select(Document).filter(Document.user_id == current_user.id)
-        )
-        documents = result.scalars().all()
-        uploaded_types = {doc.document_type for doc in documents}
-        required_types = VENDOR_REQUIRED_TYPES if current_user.role == "vendor" else BUYER_REQUIRED_TYPES
+        # Counts per (type, status) from one GROUP BY, cached per user until a document write
+        summary = await document_summary_cache.get(db, current_user.id)
+        required_types = required_types_for(current_user.role)
         total_required = len(required_types)
-        uploaded_count = len(uploaded_types)
+        uploaded_count = len(summary.uploaded_types)
         
         # For product_catalog and certifications, check if at least one document exists
-        missing_types = [t for t in required_types if t not in uploaded_types]
-        
-        # Include uploaded documents with id, status, and file_url
-        uploaded_documents = [
-            {
-                "document_type": doc.document_type, 
-                "id": doc.id, 
-                "status": doc.ai_verification_status.value,
-                "file_url": doc.file_url
-            }
-            for doc in documents
-        ]
+        missing_types = summary.missing(required_types)
         
-        return {
+        response = {
             "progress": f"{uploaded_count}/{total_required}",
-            "uploaded_documents": uploaded_documents,
-            "missing_documents": missing_types
+            "missing_documents": missing_types,
+            "status_counts": summary.counts
         }
+        if include_documents:
+            # Include uploaded documents with id, status, and file_url (plain rows, no ORM objects)
+            result = await db.execute(
+                select(Document.document_type, Document.id, Document.ai_verification_status, Document.file_url)
+                .filter(Document.user_id == current_user.id)
+            )
+            response["uploaded_documents"] = [
+                {
+                    "document_type": document_type,
+                    "id": id,
+                    "status": ai_verification_status.value,
+                    "file_url": file_url
+                }
+                for document_type, id, ai_verification_status, file_url in result.all()
+            ]
+        return response
     except Exception as e:
         logger.error(f"Error fetching document progress for {current_user.email}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch document progress: {str(e)}")
 
+@doc_router.get("/documents", response_model=Page[DocumentResponse])
+async def get_my_documents(
+    page: PageParams = Depends(page_params),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_read)
+):
+    """The user's uploaded documents, newest first, one page at a time"""
+    try:
+        return await paginate(db, select(Document).filter(Document.user_id == current_user.id), Document, page)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching documents for {current_user.email}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch documents: {str(e)}")
+
 @doc_router.post("/reupload", status_code=status.HTTP_200_OK, response_model=DocumentResponse)
 async def reupload_document(
     document_id: int = Form(...),
@@ -249,30 +306,116 @@ async def reupload_document(
                 detail=f"Document type mismatch. Expected {document.document_type}, got {document_type}"
             )
 
-        file_path = await save_file(file, current_user.id, document_type)
-        
-        document.file_path = file_path
-        document.file_url = file_url
-        document.ai_verification_status = VerificationStatus.PENDING
-        document.updated_at = func.now()
-        
-        # Create notification for admins
-        admin_notification = Notification(
-            admin_id=current_user.id,
-            message=f"Document {document.id} ({document.document_type}) re-uploaded by user_id={current_user.id} awaiting approval.",
-            target_type=NotificationTargetType.ALL_ADMINS,
-            visibility=True
-        )
-        db.add(admin_notification)
-        
-        db.add(document)
+        file_path = await save_file(db, file, current_user.id, document_type)
+        await replace_document_file(db, document, file_path, file_url, current_user.id)
         await db.commit()
         await db.refresh(document)
 
         
         logger.info(f"Document {document.id} re-uploaded by user_id={current_user.id}")
         return document
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         await db.rollback()
         logger.error(f"Error re-uploading document {document_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to re-upload document: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to re-upload document: {str(e)}")
+
+@doc_router.post("/documents/presign", response_model=DocumentPresignResponse)
+async def presign_document_upload(
+    request: DocumentPresignRequest,
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Start a direct upload: the client hashes the file, sends it straight to storage
+    with the returned form (which only accepts content with that SHA-256), then calls
+    /user/documents/confirm with the upload token. Only available with an
+    object-storage backend.
+    """
+    if request.document_type not in ALLOWED_DOCUMENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid document type. Allowed: {ALLOWED_DOCUMENT_TYPES}"
+        )
+    file_ext = os.path.splitext(request.file_name)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file format for {request.file_name}. Allowed: {ALLOWED_EXTENSIONS}"
+        )
+    if not storage.supports_presigned_uploads:
+        raise HTTPException(status_code=400, detail="Direct uploads are not enabled; upload through /user/documents")
+
+    key = incoming_key(file_ext)
+    sha256 = request.sha256.lower()
+    form = await storage.presign_upload(key, max_size_for(request.document_type), sha256)
+    logger.debug(f"Presigned {key} for user {current_user.email}: {request.document_type}")
+    return {
+        "upload_token": create_upload_token(current_user.id, key, request.document_type, request.file_name, sha256),
+        **form,
+    }
+
+@doc_router.post("/documents/confirm", status_code=status.HTTP_201_CREATED)
+async def confirm_document_upload(
+    request: DocumentConfirmRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Register a file uploaded via /user/documents/presign as a new document, or as a replacement for document_id"""
+    claims = decode_upload_token(request.upload_token, current_user.id)
+    document_type = claims["document_type"]
+
+    try:
+        document = None
+        if request.document_id is not None:
+            result = await db.execute(
+                select(Document).filter(
+                    Document.id == request.document_id,
+                    Document.user_id == current_user.id
+                )
+            )
+            document = result.scalar_one_or_none()
+            if not document:
+                raise HTTPException(status_code=404, detail="Document not found or not owned by user")
+            if document.document_type != document_type:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Document type mismatch. Expected {document.document_type}, got {document_type}"
+                )
+
+        stored = await blob_store.adopt(db, claims["key"], max_size_for(document_type), claims.get("sha256"))
+
+        if document is not None:
+            await replace_document_file(db, document, stored.path, request.file_url, current_user.id)
+        else:
+            document = Document(
+                user_id=current_user.id,
+                document_type=document_type,
+                file_path=stored.path,
+                file_url=request.file_url,
+                file_name=claims["file_name"],
+                ai_verification_status=VerificationStatus.PENDING,
+            )
+            db.add(document)
+            await db.flush()
+            db.add(Notification(
+                admin_id=current_user.id,
+                message=f"Document {document.id} ({document.document_type}) uploaded by user_id={current_user.id} awaiting approval.",
+                target_type=NotificationTargetType.ALL_ADMINS,
+                visibility=True
+            ))
+        await db.commit()
+
+        logger.info(f"Document {document.id} confirmed from direct upload by user_id={current_user.id}")
+        return {
+            "message": "Document uploaded successfully",
+            "documents": [document.id]
+        }
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error confirming upload for {current_user.email}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to confirm upload: {str(e)}")
@@ -2,9 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.read_replicas import get_db_read
+from app.core.pagination import PageParams, page_params, paginate
 from app.models.job import Job
 from app.models.user import User
 from app.services.auth.jwt import get_current_user
+from app.schema.pagination import Page
 from app.schema.job import JobCreate, JobUpdate, JobResponse, JobFullResponse
 from app.schema.user import UserResponse
 from app.schema.user import UserRole
@@ -14,19 +17,20 @@ logger = logging.getLogger(__name__)
 jobs_router = APIRouter(prefix="/jobs", tags=["jobs"])
 
 
-@jobs_router.get("/", response_model=list[JobResponse])
-async def get_jobs(db: AsyncSession = Depends(get_db)):
+@jobs_router.get("/", response_model=Page[JobResponse])
+async def get_jobs(page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_db_read)):
     try:
-        result = await db.execute(select(Job))
-        jobs = result.scalars().all()
-        logger.info(f"Fetched {len(jobs)} job postings")
+        jobs = await paginate(db, select(Job), Job, page)
+        logger.info(f"Fetched {len(jobs['items'])} job postings")
         return jobs
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching jobs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch jobs: {str(e)}")
 
 @jobs_router.get("/{id}", response_model=JobFullResponse)
-async def get_job_details(id: int, db: AsyncSession = Depends(get_db)):
+async def get_job_details(id: int, db: AsyncSession = Depends(get_db_read)):
 
     try:
         result = await db.execute(select(Job).filter(Job.id == id))
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.core.database import get_db
+from app.core.read_replicas import get_db_read
+from app.core.pagination import PageParams, page_params, paginate
 from app.models.notification import Notification, NotificationTargetType
+from app.schema.pagination import Page
 from app.schema.notification import NotificationResponse
 from app.services.auth.jwt import get_current_user
 from app.schema.user import UserResponse, UserRole
@@ -11,10 +13,11 @@ import logging
 logger = logging.getLogger(__name__)
 notification_router = APIRouter(prefix="/notifications", tags=["notifications"])
 
-@notification_router.get("/", response_model=list[NotificationResponse])
+@notification_router.get("/", response_model=Page[NotificationResponse])
 async def get_notifications(
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_db_read)
 ):
     try:
         # Define role-to-target mapping
@@ -27,17 +30,19 @@ async def get_notifications(
         
         target_types = role_to_targets.get(current_user.role, [NotificationTargetType.ALL_USERS])
         
-        result = await db.execute(
-            select(Notification)
-            .filter(
+        notifications = await paginate(
+            db,
+            select(Notification).filter(
                 Notification.target_type.in_(target_types),
                 Notification.visibility == True
-            )
-            .order_by(Notification.created_at.desc())
+            ),
+            Notification,
+            page,
         )
-        notifications = result.scalars().all()
-        logger.info(f"Fetched {len(notifications)} notifications for user_id={current_user.id}, role={current_user.role}")
+        logger.info(f"Fetched {len(notifications['items'])} notifications for user_id={current_user.id}, role={current_user.role}")
         return notifications
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching notifications for user_id={current_user.id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch notifications: {str(e)}")
\ No newline at end of file
@@ -4,18 +4,21 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_, or_
 from app.core.database import get_db
+from app.core.read_replicas import get_db_read
+from app.core.pagination import PageParams, page_params, paginate
+from app.core.entity_loader import load_user, load_partnership_fees
 from app.core.config import settings
 from app.models.payment import Payment, PaymentType, PaymentStatus, PaymentPlan, PaymentNotification, PartnershipDeactivation
 from app.models.partnership_pricing import PartnershipLevelModel
-from app.models.partnership_fees import PartnershipFees, PartnershipLevelGroup
+from app.models.partnership_fees import PartnershipLevelGroup
 from app.services.auth.jwt import get_current_user
+from app.schema.pagination import Page
 from app.schema.user import UserResponse, UserRole
 from app.schema.payment import (
     PaymentRequest, PaymentResponse, SubscriptionResponse, PaymentWebhook,
     PaymentHistoryResponse, PaymentNotificationResponse, PartnershipDeactivationResponse,
     PaymentAnalyticsResponse
 )
-from app.models.user import User
 from app.models.notification import Notification, NotificationTargetType
 from app.models.registration import PartnershipLevel
 from app.utils.partnership_level_mapping import (
@@ -38,23 +41,6 @@ async def get_admin_role(current_user: UserResponse = Depends(get_current_user))
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
-def get_user_active_partnerships(user: User) -> List[PartnershipLevel]:
-    """Get list of active partnerships from user's partnership_level JSON array"""
-    if user.partnership_level is None:
-        return [PartnershipLevel.DROP_SHIPPING]
-    if isinstance(user.partnership_level, list):
-        return [PartnershipLevel(p) if isinstance(p, str) else p for p in user.partnership_level]
-    if isinstance(user.partnership_level, str):
-        return [PartnershipLevel(user.partnership_level)]
-    return [PartnershipLevel.DROP_SHIPPING]
-
-def add_partnership_to_user(user: User, partnership: PartnershipLevel):
-    """Add a partnership to user's active partnerships array"""
-    current = get_user_active_partnerships(user)
-    if partnership not in current:
-        current.append(partnership)
-    user.partnership_level = [p.value for p in current]
-
 @payments_router.post("/monthly", response_model=SubscriptionResponse)
 async def create_monthly_subscription(
     request: PaymentRequest,
@@ -67,8 +53,7 @@ async def create_monthly_subscription(
     """
     try:
         # Get user from database
-        result = await db.execute(select(User).filter(User.id == current_user.id))
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -190,8 +175,7 @@ async def create_lateral_payment(
             raise HTTPException(status_code=400, detail="from_partnership is required for lateral payments")
         
         # Get user from database
-        result = await db.execute(select(User).filter(User.id == current_user.id))
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -199,7 +183,7 @@ async def create_lateral_payment(
         to_partnership = request.partnership_level
         
         # Check if user has the from_partnership active
-        active_partnerships = get_user_active_partnerships(user)
+        active_partnerships = user.active_partnerships
         if from_partnership not in active_partnerships:
             raise HTTPException(
                 status_code=400,
@@ -232,10 +216,7 @@ async def create_lateral_payment(
         
         # Get lateral fee for this level and tier
         level_group = get_partnership_level_group(to_partnership)
-        result = await db.execute(
-            select(PartnershipFees).filter(PartnershipFees.level_group == level_group)
-        )
-        fees = result.scalar_one_or_none()
+        fees = await load_partnership_fees(db, level_group)
         if not fees:
             raise HTTPException(
                 status_code=404, 
@@ -308,8 +289,7 @@ async def create_registration_payment(
             raise HTTPException(status_code=400, detail="from_partnership is required for registration payments")
         
         # Get user from database
-        result = await db.execute(select(User).filter(User.id == current_user.id))
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -324,7 +304,7 @@ async def create_registration_payment(
             )
         
         # Check if user has the from_partnership active
-        active_partnerships = get_user_active_partnerships(user)
+        active_partnerships = user.active_partnerships
         if from_partnership not in active_partnerships:
             raise HTTPException(
                 status_code=400,
@@ -340,10 +320,7 @@ async def create_registration_payment(
         
         # Get registration fee for the target level
         to_level_group = get_partnership_level_group(to_partnership)
-        result = await db.execute(
-            select(PartnershipFees).filter(PartnershipFees.level_group == to_level_group)
-        )
-        fees = result.scalar_one_or_none()
+        fees = await load_partnership_fees(db, to_level_group)
         if not fees:
             raise HTTPException(
                 status_code=404, 
@@ -412,12 +389,11 @@ async def stripe_webhook(
                 payment.payment_status = PaymentStatus.SUCCESS
                 
                 # Get user and update their active partnerships
-                user_result = await db.execute(select(User).filter(User.id == payment.user_id))
-                user = user_result.scalar_one_or_none()
+                user = await load_user(db, payment.user_id)
                 
                 if user and payment_type in ["lateral", "registration"]:
                     # Add the new partnership to user's active partnerships
-                    add_partnership_to_user(user, payment.partnership_level)
+                    user.add_partnership(payment.partnership_level)
                     db.add(user)
                 
                 db.add(payment)
@@ -435,12 +411,11 @@ async def stripe_webhook(
                 payment.next_payment_due = datetime.utcnow() + timedelta(days=30)
                 
                 # Get user and add partnership to active partnerships array
-                user_result = await db.execute(select(User).filter(User.id == payment.user_id))
-                user = user_result.scalar_one_or_none()
+                user = await load_user(db, payment.user_id)
                 
                 if user:
                     # Add the partnership to user's active partnerships if not already present
-                    add_partnership_to_user(user, payment.partnership_level)
+                    user.add_partnership(payment.partnership_level)
                     db.add(user)
                 
                 db.add(payment)
@@ -535,18 +510,11 @@ async def send_payment_notification(payment: Payment, days_delinquent: int, db:
 async def deactivate_partnership(payment: Payment, db: AsyncSession):
     """Deactivate partnership after 30 days of non-payment"""
     try:
-        result = await db.execute(select(User).filter(User.id == payment.user_id))
-        user = result.scalar_one_or_none()
+        user = await load_user(db, payment.user_id)
         
         if user:
-            # Remove partnership from user's active partnerships
-            active_partnerships = get_user_active_partnerships(user)
-            if payment.partnership_level in active_partnerships:
-                active_partnerships.remove(payment.partnership_level)
-                # Ensure user has at least DROP_SHIPPING
-                if not active_partnerships:
-                    active_partnerships = [PartnershipLevel.DROP_SHIPPING]
-                user.partnership_level = [p.value for p in active_partnerships]
+            # Remove partnership from user's active partnerships (falls back to DROP_SHIPPING)
+            user.remove_partnership(payment.partnership_level)
             
             # Create deactivation record
             deactivation = PartnershipDeactivation(
@@ -562,18 +530,17 @@ async def deactivate_partnership(payment: Payment, db: AsyncSession):
     except Exception as e:
         logger.error(f"Error deactivating partnership: {str(e)}")
 
-@payments_router.get("/history", response_model=List[PaymentHistoryResponse])
+@payments_router.get("/history", response_model=Page[PaymentHistoryResponse])
 async def get_payment_history(
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_db_read)
 ):
-    """Get payment history for current user"""
+    """Get payment history for current user, newest first"""
     try:
-        result = await db.execute(
-            select(Payment).filter(Payment.user_id == current_user.id).order_by(Payment.created_at.desc())
-        )
-        payments = result.scalars().all()
-        return payments
+        return await paginate(db, select(Payment).filter(Payment.user_id == current_user.id), Payment, page)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching payment history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch payment history: {str(e)}")
@@ -581,7 +548,7 @@ async def get_payment_history(
 @payments_router.get("/notifications", response_model=List[PaymentNotificationResponse])
 async def get_payment_notifications(
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_read)
 ):
     """Get payment notifications for current user"""
     try:
@@ -597,7 +564,7 @@ async def get_payment_notifications(
 @payments_router.get("/analytics", response_model=PaymentAnalyticsResponse)
 async def get_payment_analytics(
     current_user: UserResponse = Depends(get_admin_role),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_read)
 ):
     """Get payment analytics for admin"""
     try:
@@ -645,7 +612,7 @@ async def get_payment_analytics(
 async def get_payment_pricing(
     partnership_level: PartnershipLevel,
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_read)
 ):
     """Get pricing information for a specific partnership level"""
     try:
@@ -669,7 +636,7 @@ async def get_payment_pricing(
 @payments_router.get("/pricing", response_model=List[dict])
 async def get_all_payment_pricing(
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_read)
 ):
     """Get pricing information for all partnership levels"""
     try:
@@ -730,18 +697,17 @@ async def check_overdue_payments(
         logger.error(f"Error checking overdue payments: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to check overdue payments: {str(e)}")
 
-@payments_router.get("/deactivations", response_model=List[PartnershipDeactivationResponse])
+@payments_router.get("/deactivations", response_model=Page[PartnershipDeactivationResponse])
 async def get_partnership_deactivations(
     current_user: UserResponse = Depends(get_admin_role),
-    db: AsyncSession = Depends(get_db)
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_db_read)
 ):
-    """Get all partnership deactivations (Admin only)"""
+    """Get all partnership deactivations, newest first (Admin only)"""
     try:
-        result = await db.execute(
-            select(PartnershipDeactivation).order_by(PartnershipDeactivation.deactivated_at.desc())
-        )
-        deactivations = result.scalars().all()
-        return deactivations
+        return await paginate(db, select(PartnershipDeactivation), PartnershipDeactivation, page)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching deactivations: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch deactivations: {str(e)}")
@@ -96,7 +96,7 @@ async def update_user_retention_period(
             email=user.email,
             current_retention_months=user.retention_period,
             retention_start_date=user.retention_start_date.isoformat() if user.retention_start_date else None,
-            partnership_level=user.partnership_level or "UNKNOWN"
+            partnership_level=", ".join(p.value for p in user.active_partnerships)
         )
         
     except HTTPException:
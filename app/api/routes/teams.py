@@ -2,12 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.read_replicas import get_db_read
 from app.models.teams import Team, TeamMember
 from app.models.user import User
 from app.services.auth.jwt import get_current_user
 from app.schema.teams import TeamCreate, TeamUpdate, TeamResponse, TeamFullResponse, TeamMemberCreate, TeamMemberUpdate, TeamMemberResponse
 from app.schema.user import UserResponse
 from app.schema.user import UserRole
+from app.services.storage import save_upload
+from app.utils.uploads import max_size_for
 import os
 import uuid
 import logging
@@ -22,24 +25,22 @@ ALLOWED_EXTENSIONS = {".png", ".jpg", ".jpeg"}
 async def save_member_image(file: UploadFile, team_id: int) -> str:
     try:
         upload_dir = f"uploads/team_members/{team_id}"
-        os.makedirs(upload_dir, exist_ok=True)
         file_ext = os.path.splitext(file.filename)[1].lower()
         if file_ext not in ALLOWED_EXTENSIONS:
             raise HTTPException(status_code=400, detail=f"Invalid file format. Allowed: {ALLOWED_EXTENSIONS}")
         unique_filename = f"{uuid.uuid4()}{file_ext}"
         file_path = os.path.join(upload_dir, unique_filename)
         
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
+        await save_upload(file, file_path, max_size_for("team_image"))
         return file_path
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving team member image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
 
 @teams_router.get("/", response_model=list[TeamResponse])
-async def get_teams(db: AsyncSession = Depends(get_db)):
+async def get_teams(db: AsyncSession = Depends(get_db_read)):
     try:
         result = await db.execute(
             select(Team).options(selectinload(Team.members))
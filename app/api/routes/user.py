@@ -4,11 +4,14 @@ from sqlalchemy.sql import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.entity_loader import load_user, load_registration_info
+from app.core.invalidation import invalidation_bus
 from app.models.document import Document
 from app.models.user import RegistrationStatus, User
 from app.models.registration import RegistrationAgreement, RegistrationInfo, RegistrationLevel, RegistrationProduct, PartnershipLevel
 from app.models.payment import PartnershipDeactivation
 from app.services.auth.jwt import get_current_user
+from app.services.blob_store import blob_store
 from app.schema.user import (
     UserDashboardResponse,
     UserResponse,
@@ -93,10 +96,7 @@ async def update_profile(
 ):
     try:
         # Fetch user
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -111,10 +111,7 @@ async def update_profile(
             user.email = user_update.email
 
         # Fetch or create registration info
-        result = await db.execute(
-            select(RegistrationInfo).filter(RegistrationInfo.user_id == current_user.id)
-        )
-        reg_info = result.scalar_one_or_none()
+        reg_info = await load_registration_info(db, current_user.id)
         if not reg_info:
             reg_info = RegistrationInfo(user_id=current_user.id)
 
@@ -147,10 +144,7 @@ async def get_profile(
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -166,10 +160,7 @@ async def check_registration_status(
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -414,20 +405,12 @@ async def deactivate_partnership(
     """
     try:
         # Get user from database
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Get current active partnerships
-        active_partnerships = []
-        if user.partnership_level:
-            if isinstance(user.partnership_level, list):
-                active_partnerships = [PartnershipLevel(p) if isinstance(p, str) else p for p in user.partnership_level]
-            elif isinstance(user.partnership_level, str):
-                active_partnerships = [PartnershipLevel(user.partnership_level)]
+        active_partnerships = user.active_partnerships
         
         # Check if the partnership is active
         if request.partnership_level not in active_partnerships:
@@ -443,15 +426,8 @@ async def deactivate_partnership(
                 detail="Cannot deactivate the only active partnership. You must have at least one active partnership."
             )
         
-        # Remove the partnership from active list
-        active_partnerships.remove(request.partnership_level)
-        
-        # Ensure user has at least DROP_SHIPPING if list becomes empty (safety check)
-        if not active_partnerships:
-            active_partnerships = [PartnershipLevel.DROP_SHIPPING]
-        
-        # Update user's partnership level
-        user.partnership_level = [p.value for p in active_partnerships]
+        # Remove the partnership from active list (falls back to DROP_SHIPPING if it empties)
+        user.remove_partnership(request.partnership_level)
         
         # Check if deactivation record already exists
         existing_deactivation = await db.execute(
@@ -486,7 +462,7 @@ async def deactivate_partnership(
         return {
             "message": f"Partnership {request.partnership_level.value} deactivated successfully",
             "user_id": user.id,
-            "active_partnerships": [p.value for p in active_partnerships],
+            "active_partnerships": [p.value for p in user.active_partnerships],
             "deactivated_partnership": request.partnership_level.value
         }
     except HTTPException:
@@ -500,8 +476,7 @@ async def deactivate_partnership(
 @user_router.post("/rejected/{user_id}", status_code=200)
 async def rejected_user(user_id: int, db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(select(User).filter(User.id == user_id))
-        user = result.scalar_one_or_none()
+        user = await load_user(db, user_id)
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -514,7 +489,11 @@ async def rejected_user(user_id: int, db: AsyncSession = Depends(get_db)):
         await db.execute(delete(RegistrationInfo).where(RegistrationInfo.user_id == user_id))
         await db.execute(delete(RegistrationLevel).where(RegistrationLevel.user_id == user_id))
         await db.execute(delete(RegistrationProduct).where(RegistrationProduct.user_id == user_id))
+        # A bulk DELETE skips the Document after_delete hook, so release the files here
+        document_paths = await db.execute(select(Document.file_path).where(Document.user_id == user_id))
+        await blob_store.release(db, document_paths.scalars().all())
         await db.execute(delete(Document).where(Document.user_id == user_id))
+        await invalidation_bus.publish(db, "document_summary", user_id)
         await db.execute(delete(RegistrationAgreement).where(RegistrationAgreement.user_id == user_id))
 
 
@@ -3,15 +3,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.entity_loader import load_user
 from app.models.registration import PartnershipLevel
 from app.services.auth.jwt import get_current_user
 from app.schema.user import UserResponse
 from app.models.document import Document, VerificationStatus
-from app.models.user import User
 from app.models.notification import Notification, NotificationTargetType
 import logging
 from datetime import datetime, timedelta
-from app.utils.partnership_levels import get_available_partnerships, get_retention_expiration, is_retention_period_over, partnership_level,partnership_dic, update_partnership_level
+from app.utils.partnership_levels import get_available_partnerships, get_retention_expiration, is_retention_period_over, partnership_level, update_partnership_level
 from app.utils.partnership_level_mapping import get_partnership_level_group, get_level_number
 logger = logging.getLogger(__name__)
 verification_router = APIRouter(prefix="/verification", tags=["verification"])
@@ -43,10 +43,7 @@ async def get_kpi_score(
             kpi_score = round(min(kpi_score, 10), 2)  # Cap at 10
         
         # Get user
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             logger.error(f"User not found: {current_user.email}")
             raise HTTPException(status_code=404, detail="User not found")
@@ -61,10 +58,6 @@ async def get_kpi_score(
         await db.commit()
         await db.refresh(user)
         
-        partnership_levels = partnership_dic
-        
-        current_level = next((level for level in partnership_levels if level["level"] == user.partnership_level), partnership_levels[0])
-        
         logger.info(f"KPI score for {current_user.email}: kpi_score={kpi_score}, "
                    f"partnership_level={user.partnership_level}, "
                    f"retention_period={user.retention_period}, "
@@ -122,10 +115,7 @@ async def get_current_partnership(
 ):
     logger.debug(f"Fetching current partnership for {current_user.email}")
     try:
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             logger.error(f"User not found: {current_user.email}")
             raise HTTPException(status_code=404, detail="User not found")
@@ -135,9 +125,7 @@ async def get_current_partnership(
         is_retention_expired = retention_expiration and datetime.utcnow() >= retention_expiration if retention_expiration else False
         
         # Handle partnership_level as array
-        partnership_levels = user.partnership_level if user.partnership_level else ["DROP_SHIPPING"]
-        if isinstance(partnership_levels, str):
-            partnership_levels = [partnership_levels]
+        partnership_levels = [p.value for p in user.active_partnerships]
         
         return {
             "partnership_level": partnership_levels,
@@ -162,31 +150,22 @@ async def get_available_partnerships_api(
 ):
     logger.debug(f"Fetching available partnerships for {current_user.email}")
     try:
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             logger.error(f"User not found: {current_user.email}")
             raise HTTPException(status_code=404, detail="User not found")
         
         # Handle partnership_level as array - get highest level for KPI calculations
-        partnership_levels = user.partnership_level if user.partnership_level else ["DROP_SHIPPING"]
-        if isinstance(partnership_levels, str):
-            partnership_levels = [partnership_levels]
+        partnership_levels = [p.value for p in user.active_partnerships]
         
         # Get highest partnership level for KPI-based upgrade calculations
         highest_level = PartnershipLevel.DROP_SHIPPING
         highest_level_num = 0
-        for p_str in partnership_levels:
-            try:
-                p = PartnershipLevel(p_str) if isinstance(p_str, str) else p_str
-                level_num = get_level_number(get_partnership_level_group(p))
-                if level_num > highest_level_num:
-                    highest_level_num = level_num
-                    highest_level = p
-            except:
-                continue
+        for p in user.active_partnerships:
+            level_num = get_level_number(get_partnership_level_group(p))
+            if level_num > highest_level_num:
+                highest_level_num = level_num
+                highest_level = p
         
         # Get available partnerships based on highest level
         available_partnerships = get_available_partnerships(user.kpi_score, highest_level, user.retention_period)
@@ -226,10 +205,7 @@ async def get_kpi_score(
             kpi_score = round(min(kpi_score, 10), 2)  # Cap at 10
         
         # Get user
-        result = await db.execute(
-            select(User).filter(User.id == current_user.id)
-        )
-        user = result.scalar_one_or_none()
+        user = await load_user(db, current_user.id)
         if not user:
             logger.error(f"User not found: {current_user.email}")
             raise HTTPException(status_code=404, detail="User not found")
@@ -249,22 +225,16 @@ async def get_kpi_score(
         is_retention_expired = retention_expiration and datetime.utcnow() >= retention_expiration if retention_expiration else False
         
         # Handle partnership_level as array - get highest level for KPI calculations
-        partnership_levels = user.partnership_level if user.partnership_level else ["DROP_SHIPPING"]
-        if isinstance(partnership_levels, str):
-            partnership_levels = [partnership_levels]
+        partnership_levels = [p.value for p in user.active_partnerships]
         
         # Get highest partnership level for KPI-based upgrade calculations
         highest_level = PartnershipLevel.DROP_SHIPPING
         highest_level_num = 0
-        for p_str in partnership_levels:
-            try:
-                p = PartnershipLevel(p_str) if isinstance(p_str, str) else p_str
-                level_num = get_level_number(get_partnership_level_group(p))
-                if level_num > highest_level_num:
-                    highest_level_num = level_num
-                    highest_level = p
-            except:
-                continue
+        for p in user.active_partnerships:
+            level_num = get_level_number(get_partnership_level_group(p))
+            if level_num > highest_level_num:
+                highest_level_num = level_num
+                highest_level = p
         
         # Get available partnerships based on highest level
         available_partnerships = get_available_partnerships(kpi_score, highest_level, user.retention_period)
@@ -298,22 +268,12 @@ async def update_partnership(
     db: AsyncSession = Depends(get_db)
 ):
     """Add a partnership to user's active partnerships array"""
-    result = await db.execute(select(User).filter(User.id == current_user.id))
-    user = result.scalar_one_or_none()
+    user = await load_user(db, current_user.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get current partnerships
-    current = user.partnership_level if user.partnership_level else ["DROP_SHIPPING"]
-    if isinstance(current, str):
-        current = [current]
-    
     # Add new partnership if not already present
-    partnership_str = partnership_level.value
-    if partnership_str not in current:
-        current.append(partnership_str)
-    
-    user.partnership_level = current
+    user.add_partnership(partnership_level)
     db.add(user)            
     await db.commit()      
     await db.refresh(user)  
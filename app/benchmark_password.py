@@ -0,0 +1,62 @@
+"""
+Benchmark for password verification throughput
+Compares inline bcrypt (blocking the event loop) against the bounded
+password_service thread pool at 1, 8 and 64 concurrent login clients.
+
+Usage: python -m app.benchmark_password
+"""
+import asyncio
+import time
+from app.core.security import get_password_hash, verify_password
+from app.services.auth.password_service import PasswordService
+
+CLIENT_COUNTS = [1, 8, 64]
+LOGINS_PER_CLIENT = 4
+PASSWORD = "benchmark-password"
+
+async def measure_loop_lag(stop: asyncio.Event) -> float:
+    """Return the worst scheduling delay seen by a 10ms heartbeat"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - started - 0.01)
+    return worst
+
+async def run_clients(clients: int, login) -> tuple:
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+    async def client():
+        for _ in range(LOGINS_PER_CLIENT):
+            assert await login()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await lag_task
+    return clients * LOGINS_PER_CLIENT / elapsed, worst_lag
+
+async def main():
+    hashed = get_password_hash(PASSWORD)
+    service = PasswordService(max_queue=1024)
+
+    async def inline_login():
+        return verify_password(PASSWORD, hashed)
+
+    async def pooled_login():
+        return await service.verify_password(PASSWORD, hashed)
+
+    print("=== Password Verification Benchmark ===")
+    print(f"{'clients':>8} {'mode':>8} {'logins/s':>10} {'max loop lag (ms)':>18}")
+    for clients in CLIENT_COUNTS:
+        for mode, login in (("inline", inline_login), ("pooled", pooled_login)):
+            throughput, lag = await run_clients(clients, login)
+            print(f"{clients:>8} {mode:>8} {throughput:>10.1f} {lag * 1000:>18.1f}")
+
+    print(f"\nPool stats: {service.stats()}")
+    service.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,32 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+import logging
 import os
 from dotenv import load_dotenv
+from app.core.sql_instrumentation import instrument_engine
+from app.core.db_deadlines import apply_deadlines, acquire_connection
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# verify: refuse to start unless the database is at the Alembic head (one query)
+# create_all: create missing tables from the models; local development only
+# skip: no schema work at all
+DB_STARTUP_MODE = os.getenv("DB_STARTUP_MODE", "verify").lower()
+# Pin the expected head at deploy time to skip parsing the migration scripts on boot
+SCHEMA_EXPECTED_REVISION = os.getenv("SCHEMA_EXPECTED_REVISION")
+ALEMBIC_INI = os.getenv("ALEMBIC_INI", os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini"))
+# Full statement echo is for local debugging only; production uses SQL_LOG_MODE (see sql_instrumentation)
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
 
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,  # Log SQL queries for debugging
+    echo=SQL_ECHO,
     pool_size=20,
     max_overflow=10,
     pool_timeout=30,
@@ -19,6 +34,9 @@ engine = create_async_engine(
     pool_pre_ping=True,  # ✅ Check if connection is alive before using
 )
 
+instrument_engine(engine.sync_engine)
+apply_deadlines(engine.sync_engine)
+
 # Async session factory
 async_session = async_sessionmaker(
     engine,
@@ -26,10 +44,43 @@ async_session = async_sessionmaker(
     expire_on_commit=False,
 )
 
+class SchemaVersionMismatch(RuntimeError):
+    pass
+
+
+def expected_schema_heads() -> set:
+    if SCHEMA_EXPECTED_REVISION:
+        return {rev.strip() for rev in SCHEMA_EXPECTED_REVISION.split(",")}
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    return set(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+
+async def verify_schema_version():
+    expected = expected_schema_heads()
+    try:
+        async with engine.connect() as conn:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars().all())
+    except ProgrammingError:
+        raise SchemaVersionMismatch("alembic_version table not found; run `alembic upgrade head` first")
+    if current != expected:
+        raise SchemaVersionMismatch(
+            f"Database schema is at {sorted(current) or 'no revision'} but the code expects {sorted(expected)}; "
+            f"run `alembic upgrade head` before starting the app"
+        )
+    logger.info(f"Database schema at expected revision {sorted(expected)}")
+
+
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    if DB_STARTUP_MODE == "create_all":
+        logger.warning("DB_STARTUP_MODE=create_all: creating tables from models (development only)")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    elif DB_STARTUP_MODE == "verify":
+        await verify_schema_version()
 
 async def get_db():
     async with async_session() as session:
+        # Fail fast with a 503 rather than queue past the route's pool deadline
+        await acquire_connection(session)
         yield session
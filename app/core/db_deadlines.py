@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+from dotenv import load_dotenv
+from app.core.sql_instrumentation import current_route, current_route_for
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DB_DEADLINES_ENABLED = os.getenv("DB_DEADLINES_ENABLED", "true").lower() == "true"
+# Per priority class: statement_timeout for the route's queries and how long it may wait for a pooled connection.
+# Low-priority routes give up on the pool quickly so they never queue in front of login, and
+# have the tightest statement timeout so one that got a connection cannot hold it for long either.
+DB_DEADLINE_CLASSES: Dict[str, dict] = {
+    "critical": {"statement_timeout_ms": 3000, "pool_timeout": 10},
+    "default": {"statement_timeout_ms": 10000, "pool_timeout": 5},
+    "low": {"statement_timeout_ms": 2500, "pool_timeout": 2},
+    # Schedulers, workers and scripts (no request in scope)
+    "background": {"statement_timeout_ms": 120000, "pool_timeout": 30},
+    **json.loads(os.getenv("DB_DEADLINE_CLASSES", "{}")),
+}
+# Route -> priority class. Keys are "METHOD /path" or "/path" using the route template,
+# and may end in "*" to match a prefix; the longest match wins.
+DB_ROUTE_PRIORITIES: Dict[str, str] = {
+    "/auth/*": "critical",
+    "POST /payments/webhook": "critical",
+    "GET /admin/*": "low",
+    "GET /payments/analytics": "low",
+    "GET /retention/*": "low",
+    **json.loads(os.getenv("DB_ROUTE_PRIORITIES", "{}")),
+}
+DB_DEADLINE_RETRY_AFTER = int(os.getenv("DB_DEADLINE_RETRY_AFTER", "5"))
+
+# Postgres SQLSTATE for a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+# Set per request by DeadlineMiddleware; records which deadline (if any) the request hit
+deadline_exceeded: ContextVar[Optional[dict]] = ContextVar("deadline_exceeded", default=None)
+
+
+def priority_for(route: str) -> str:
+    if route == "-":
+        return "background"
+    method, _, path = route.partition(" ")
+    best, best_len = "default", -1
+    for pattern, priority in DB_ROUTE_PRIORITIES.items():
+        target = route if " " in pattern else path
+        if pattern.endswith("*"):
+            matched = target.startswith(pattern[:-1])
+        else:
+            matched = target == pattern
+        if matched and len(pattern) > best_len:
+            best, best_len = priority, len(pattern)
+    return best
+
+
+def deadline_for(route: str) -> dict:
+    return DB_DEADLINE_CLASSES.get(priority_for(route), DB_DEADLINE_CLASSES["default"])
+
+
+class DeadlineStats:
+    def __init__(self):
+        self.statement_timeouts: Counter = Counter()
+        self.pool_timeouts: Counter = Counter()
+
+    def record(self, kind: str, route: str):
+        counter = self.statement_timeouts if kind == "statement" else self.pool_timeouts
+        if route not in counter and len(counter) >= 1000:
+            route = "other"
+        counter[route] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "statement_timeouts": sum(self.statement_timeouts.values()),
+            "pool_timeouts": sum(self.pool_timeouts.values()),
+            "statement_timeouts_by_route": dict(self.statement_timeouts.most_common(20)),
+            "pool_timeouts_by_route": dict(self.pool_timeouts.most_common(20)),
+            "classes": DB_DEADLINE_CLASSES,
+        }
+
+
+deadline_stats = DeadlineStats()
+
+
+def _mark(kind: str):
+    deadline_stats.record(kind, current_route())
+    exceeded = deadline_exceeded.get()
+    if exceeded is not None:
+        exceeded["kind"] = kind
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    timeout_ms = int(deadline_for(current_route())["statement_timeout_ms"])
+    if connection_record.info.get("statement_timeout_ms") == timeout_ms:
+        return
+    # Straight on the driver connection, outside any transaction, so a later rollback
+    # cannot undo it; cached per connection so it costs a round-trip only when it changes
+    await_only(dbapi_connection.driver_connection.execute(f"SET statement_timeout = {timeout_ms}"))
+    connection_record.info["statement_timeout_ms"] = timeout_ms
+
+
+def _on_error(exception_context):
+    orig = exception_context.original_exception
+    if getattr(orig, "sqlstate", None) == QUERY_CANCELED or getattr(getattr(orig, "__cause__", None), "sqlstate", None) == QUERY_CANCELED:
+        _mark("statement")
+
+
+def apply_deadlines(engine: Engine):
+    """Attach per-route statement_timeout handling to a (sync) engine"""
+    if not DB_DEADLINES_ENABLED:
+        return
+    event.listen(engine, "checkout", _on_checkout)
+    event.listen(engine, "handle_error", _on_error)
+
+
+def deadline_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The database is busy; please retry shortly",
+        headers={"Retry-After": str(DB_DEADLINE_RETRY_AFTER)},
+    )
+
+
+async def acquire_connection(session: AsyncSession):
+    """Check out the session's connection now, waiting no longer than the route's pool_timeout"""
+    if not DB_DEADLINES_ENABLED:
+        return
+    pool_timeout = float(deadline_for(current_route())["pool_timeout"])
+    try:
+        await asyncio.wait_for(session.connection(), timeout=pool_timeout)
+    except (asyncio.TimeoutError, PoolTimeoutError):
+        _mark("pool")
+        logger.warning(f"No database connection within {pool_timeout}s for {current_route()}")
+        raise deadline_unavailable()
+
+
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware that turns a request which hit a database deadline into a 503
+    with Retry-After, even when the route's own error handling already turned the
+    timeout into a 500 (or let it escape).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DB_DEADLINES_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        exceeded = {"kind": None}
+        state = {"started": False, "replaced": False}
+
+        async def send_503(headers=()):
+            body = json.dumps({"detail": "The database is busy; please retry shortly"}).encode()
+            # Keep headers added by inner middleware (CORS, Server-Timing), replace the body's
+            kept = [(k, v) for k, v in headers if k.lower() not in (b"content-type", b"content-length")]
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": kept + [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(DB_DEADLINE_RETRY_AFTER).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+
+        async def send_checked(message):
+            if message["type"] == "http.response.start":
+                state["started"] = True
+                if exceeded["kind"] and message["status"] >= 500 and message["status"] != 503:
+                    state["replaced"] = True
+                    logger.warning(f"{current_route_for(scope)} hit the {exceeded['kind']} deadline; answering 503")
+                    await send_503(message.get("headers", []))
+                    return
+            elif state["replaced"]:
+                return
+            await send(message)
+
+        token = deadline_exceeded.set(exceeded)
+        try:
+            await self.app(scope, receive, send_checked)
+        except Exception:
+            if exceeded["kind"] and not state["started"]:
+                await send_503()
+                return
+            raise
+        finally:
+            deadline_exceeded.reset(token)
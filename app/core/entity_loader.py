@@ -0,0 +1,168 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from app.models.partnership_fees import PartnershipFees
+from app.models.registration import RegistrationInfo
+from app.models.user import User
+
+_MISSING = object()
+
+
+class EntityLoader:
+    """
+    DataLoader-style cache bound to one session (and so to one request).
+
+    load() calls for the same model and key column made in the same event-loop tick
+    are coalesced into one `WHERE column IN (...)` query, and every result, including
+    "not found", is memoized, so repeated loads cost no further round-trips. Primary
+    key lookups are served from the session's identity map when the row is already
+    there. Rows flushed by the session are primed into the memo, deleted rows are
+    forgotten, and a rollback clears everything.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+        # (model, column name) -> {key: row or None}
+        self._memo: Dict[Tuple[type, str], Dict[Any, Any]] = {}
+        # (model, column name) -> {key: future} waiting for the next dispatch
+        self._pending: Dict[Tuple[type, str], Dict[Any, asyncio.Future]] = {}
+        # An AsyncSession cannot run two statements at once
+        self._lock = asyncio.Lock()
+        self._dispatches = set()
+        self.queries = 0
+        self.hits = 0
+
+    @staticmethod
+    def _column_name(model, column: Optional[str]) -> str:
+        return column or model.__mapper__.primary_key[0].key
+
+    def _from_identity_map(self, model, key):
+        identity = identity_key(model, key)
+        row = self._session.sync_session.identity_map.get(identity)
+        if row is None:
+            return None
+        state = inspect(row)
+        # Expired (e.g. after a rollback) or partially loaded rows would lazy-load their
+        # columns on attribute access, which an AsyncSession cannot do; select them instead
+        if state.expired or state.unloaded.intersection(state.mapper.column_attrs.keys()):
+            return None
+        return row
+
+    async def load(self, model, key, column: Optional[str] = None):
+        """Row of `model` whose `column` (default: primary key) equals `key`, or None"""
+        if key is None:
+            return None
+        column = self._column_name(model, column)
+        memo = self._memo.setdefault((model, column), {})
+        row = memo.get(key, _MISSING)
+        if row is not _MISSING:
+            self.hits += 1
+            return row
+        if column == model.__mapper__.primary_key[0].key:
+            row = self._from_identity_map(model, key)
+            if row is not None:
+                self.hits += 1
+                memo[key] = row
+                return row
+
+        pending = self._pending.setdefault((model, column), {})
+        future = pending.get(key)
+        if future is None:
+            future = pending[key] = asyncio.get_running_loop().create_future()
+            if len(pending) == 1:
+                # Runs after the loads already scheduled for this tick have queued their keys
+                task = asyncio.ensure_future(self._dispatch(model, column))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+        return await future
+
+    async def load_many(self, model, keys: Iterable, column: Optional[str] = None) -> List[Any]:
+        """Rows for `keys` in the same order (None where missing), fetched in one query"""
+        return list(await asyncio.gather(*(self.load(model, key, column) for key in keys)))
+
+    async def _dispatch(self, model, column: str):
+        batch = self._pending.pop((model, column), {})
+        if not batch:
+            return
+        try:
+            async with self._lock:
+                self.queries += 1
+                attribute = getattr(model, column)
+                result = await self._session.execute(select(model).filter(attribute.in_(list(batch))))
+                rows = result.scalars().all()
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        memo = self._memo.setdefault((model, column), {})
+        found: Dict[Any, Any] = {}
+        for row in rows:
+            # Non-unique columns (e.g. RegistrationInfo.user_id) resolve to the first row
+            found.setdefault(getattr(row, column), row)
+        for key, future in batch.items():
+            memo[key] = found.get(key)
+            if not future.done():
+                future.set_result(memo[key])
+
+    def prime(self, row, column: Optional[str] = None):
+        model = type(row)
+        column = self._column_name(model, column)
+        key = getattr(row, column, None)
+        if key is not None:
+            self._memo.setdefault((model, column), {})[key] = row
+
+    def forget(self, model, key, column: Optional[str] = None):
+        self._memo.get((model, self._column_name(model, column)), {}).pop(key, None)
+
+    def clear(self):
+        self._memo.clear()
+
+    def _after_flush(self, session: Session):
+        for row in session.new:
+            for model, column in list(self._memo):
+                if isinstance(row, model):
+                    self.prime(row, column)
+        for row in session.deleted:
+            for (model, column), memo in self._memo.items():
+                if isinstance(row, model):
+                    memo.pop(getattr(row, column, None), None)
+
+
+def get_loader(db: AsyncSession) -> EntityLoader:
+    """The loader for this session, created on first use"""
+    loader = db.info.get("entity_loader")
+    if loader is None:
+        loader = db.info["entity_loader"] = EntityLoader(db)
+    return loader
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    loader = session.info.get("entity_loader")
+    if loader is not None:
+        loader._after_flush(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    # Rolled-back rows are expired and can no longer be read without a reload
+    loader = session.info.get("entity_loader")
+    if loader is not None:
+        loader.clear()
+
+
+async def load_user(db: AsyncSession, user_id: int):
+    return await get_loader(db).load(User, user_id)
+
+
+async def load_registration_info(db: AsyncSession, user_id: int):
+    return await get_loader(db).load(RegistrationInfo, user_id, column="user_id")
+
+
+async def load_partnership_fees(db: AsyncSession, level_group):
+    return await get_loader(db).load(PartnershipFees, level_group, column="level_group")
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import uuid
+import asyncpg
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_ENABLED = os.getenv("INVALIDATION_ENABLED", "true").lower() == "true"
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "cache_invalidation")
+# TTL caches fall back to while the listener is down and evictions from other workers may be missed
+INVALIDATION_FALLBACK_TTL = float(os.getenv("INVALIDATION_FALLBACK_TTL", "5"))
+INVALIDATION_RECONNECT_MIN = float(os.getenv("INVALIDATION_RECONNECT_MIN", "1"))
+INVALIDATION_RECONNECT_MAX = float(os.getenv("INVALIDATION_RECONNECT_MAX", "60"))
+# How often the listener connection is probed; asyncpg only notices a dead socket on use
+INVALIDATION_HEALTHCHECK_INTERVAL = float(os.getenv("INVALIDATION_HEALTHCHECK_INTERVAL", "15"))
+
+# handler(id, version); id is None when the whole cache must be dropped (e.g. after a reconnect)
+Handler = Callable[[Optional[str], Optional[int]], None]
+
+
+class InvalidationBus:
+    """
+    Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+    Models registered with track() publish (entity, id, version) automatically
+    whenever a session flushes a change to one of their rows; other writers call
+    publish(db, entity, id, version). Either way the NOTIFY runs inside the writer's
+    transaction, so it is only delivered if and when that transaction commits, and
+    the local worker's handlers run from the session's after_commit hook. Each
+    worker keeps one dedicated listener connection and runs the handlers subscribed
+    to the entity for every notification it receives.
+
+    While the listener is down caches should use effective_ttl(), which drops to
+    INVALIDATION_FALLBACK_TTL; after reconnecting every cache is flushed since
+    notifications sent in the gap were lost.
+    """
+
+    def __init__(self, channel: str = INVALIDATION_CHANNEL):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, List[Handler]] = {}
+        # model -> (entity, version attribute or None, id attribute)
+        self._tracked: Dict[type, Tuple[str, Optional[str], str]] = {}
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self.received = 0
+        self.published = 0
+        self.reconnects = 0
+
+    @property
+    def listening(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    def subscribe(self, entity: str, handler: Handler):
+        self._handlers.setdefault(entity, []).append(handler)
+
+    def effective_ttl(self, ttl: float) -> float:
+        if not INVALIDATION_ENABLED or self.listening:
+            return ttl
+        return min(ttl, INVALIDATION_FALLBACK_TTL)
+
+    def track(self, model, entity: str, version_attr: Optional[str] = None, id_attr: str = "id"):
+        """
+        Publish an invalidation for every flushed insert, update or delete of `model`,
+        identified by its `id_attr` (e.g. "user_id" for a cache keyed by owner)
+        """
+        self._tracked[model] = (entity, version_attr, id_attr)
+
+    def _queue(self, info: dict, entity: str, id, version: Optional[int]) -> Optional[str]:
+        event_ = {"entity": entity, "id": str(id), "version": version}
+        info.setdefault("pending_invalidations", []).append(event_)
+        if not INVALIDATION_ENABLED:
+            return None
+        self.published += 1
+        return json.dumps({**event_, "origin": self.origin})
+
+    async def publish(self, db: AsyncSession, entity: str, id, version: Optional[int] = None):
+        """Queue an invalidation on `db`'s transaction; it fires only if the transaction commits"""
+        payload = self._queue(db.info, entity, id, version)
+        if payload is not None:
+            await db.execute(select(func.pg_notify(self.channel, payload)))
+
+    def _publish_flushed(self, session: Session):
+        for row in list(session.new) + list(session.dirty) + list(session.deleted):
+            tracked = self._tracked.get(type(row))
+            if tracked is None or (row in session.dirty and not session.is_modified(row)):
+                continue
+            entity, version_attr, id_attr = tracked
+            version = getattr(row, version_attr, None) if version_attr else None
+            payload = self._queue(session.info, entity, getattr(row, id_attr), version)
+            if payload is not None:
+                # Still inside the flush: runs on the transaction's connection without autoflushing
+                session.connection().execute(select(func.pg_notify(self.channel, payload)))
+
+    def dispatch(self, entity: str, id: Optional[str], version: Optional[int]):
+        for handler in self._handlers.get(entity, []):
+            try:
+                handler(id, version)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {entity} failed: {str(e)}")
+
+    def _flush_all(self):
+        for entity in self._handlers:
+            self.dispatch(entity, None, None)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed invalidation payload: {payload[:200]}")
+            return
+        if message.get("origin") == self.origin:
+            # Already applied locally from after_commit
+            return
+        self.received += 1
+        self.dispatch(message.get("entity"), message.get("id"), message.get("version"))
+
+    async def _connect(self):
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = await asyncpg.connect(dsn)
+        await conn.add_listener(self.channel, self._on_notification)
+        return conn
+
+    async def _close_connection(self):
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.is_closed():
+            try:
+                await conn.close(timeout=5)
+            except Exception:
+                conn.terminate()
+
+    async def _listen_loop(self):
+        delay = INVALIDATION_RECONNECT_MIN
+        while True:
+            try:
+                self._conn = await self._connect()
+                if self.reconnects:
+                    logger.info(f"Invalidation listener reconnected on '{self.channel}'")
+                self._flush_all()
+                self._connected.set()
+                delay = INVALIDATION_RECONNECT_MIN
+                while True:
+                    await asyncio.sleep(INVALIDATION_HEALTHCHECK_INTERVAL)
+                    await self._conn.execute("SELECT 1", timeout=5)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self._connected.clear()
+                await self._close_connection()
+                self.reconnects += 1
+                logger.error(f"Invalidation listener down, retrying in {delay:.0f}s (caches use a {INVALIDATION_FALLBACK_TTL:.0f}s TTL meanwhile): {str(e)}")
+                try:
+                    await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                except asyncio.CancelledError:
+                    break
+                delay = min(delay * 2, INVALIDATION_RECONNECT_MAX)
+
+    async def start(self):
+        if not INVALIDATION_ENABLED:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen_loop())
+        try:
+            # Don't hold up startup on a slow database; the loop keeps retrying
+            await asyncio.wait_for(self._connected.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning("Invalidation listener not connected yet; caches use the fallback TTL")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_connection()
+
+    def stats(self) -> dict:
+        return {
+            "channel": self.channel,
+            "listening": self.listening,
+            "published": self.published,
+            "received": self.received,
+            "reconnects": self.reconnects,
+        }
+
+
+# Global instance
+invalidation_bus = InvalidationBus()
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    if invalidation_bus._tracked:
+        invalidation_bus._publish_flushed(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for event_ in session.info.pop("pending_invalidations", []):
+        invalidation_bus.dispatch(event_["entity"], event_["id"], event_["version"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("pending_invalidations", None)
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+# Hard cap; larger ?limit= values are clamped rather than rejected
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "200"))
+
+
+@dataclass
+class PageParams:
+    cursor: Optional[str]
+    limit: int
+
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, description=f"page size, at most {PAGE_MAX_LIMIT}"),
+) -> PageParams:
+    return PageParams(cursor=cursor, limit=min(limit, PAGE_MAX_LIMIT))
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def _match_timezone(value: datetime, column) -> datetime:
+    """
+    Give a cursor timestamp the same awareness as `column`, which asyncpg requires;
+    naive columns hold UTC. Only a cursor taken from another list can differ.
+    """
+    if getattr(column.type, "timezone", False):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+async def paginate(db: AsyncSession, stmt, model, params: PageParams) -> dict:
+    """
+    Keyset-paginate `stmt` newest first over (model.created_at, model.id).
+
+    Each page is an index range scan from the cursor instead of an OFFSET, so the
+    cost of a page does not grow with the table or with how deep the client pages.
+    Returns {"items": [...], "next_cursor": str | None}; next_cursor is None on the last page.
+    """
+    created_at, id = model.created_at, model.id
+    if params.cursor:
+        cursor_created_at, cursor_id = decode_cursor(params.cursor)
+        stmt = stmt.filter(tuple_(created_at, id) < tuple_(_match_timezone(cursor_created_at, created_at), cursor_id))
+    stmt = stmt.order_by(created_at.desc(), id.desc()).limit(params.limit + 1)
+    rows = (await db.execute(stmt)).scalars().all()
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return {"items": rows, "next_cursor": next_cursor}
@@ -0,0 +1,168 @@
+import logging
+import math
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Per-key metrics are trimmed to the hottest keys once this many are tracked
+MAX_TRACKED_KEYS = 10000
+
+
+class MemoryRateLimitBackend:
+    """Per-worker window counters; limits are multiplied by the number of workers"""
+
+    def __init__(self):
+        # (key, window_index) -> (count, window_seconds)
+        self._counts: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._last_cleanup = time.time()
+
+    async def incr(self, key: str, window_index: int, window: int) -> Tuple[int, int]:
+        """Increment the current window and return (previous window count, current window count)"""
+        current, _ = self._counts.get((key, window_index), (0, window))
+        self._counts[(key, window_index)] = (current + 1, window)
+        previous, _ = self._counts.get((key, window_index - 1), (0, window))
+        self._cleanup()
+        return previous, current + 1
+
+    def _cleanup(self):
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        # Drop windows that can no longer be the current or previous one
+        self._counts = {
+            (key, index): (count, window)
+            for (key, index), (count, window) in self._counts.items()
+            if index >= int(now // window) - 1
+        }
+
+
+class RedisRateLimitBackend:
+    """Window counters in Redis so limits hold across all workers"""
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url, decode_responses=True)
+        self._redis = client
+
+    async def incr(self, key: str, window_index: int, window: int) -> Tuple[int, int]:
+        current_key = f"ratelimit:{key}:{window_index}"
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.get(f"ratelimit:{key}:{window_index - 1}")
+            pipe.incr(current_key)
+            pipe.expire(current_key, 2 * window)
+            previous, current, _ = await pipe.execute()
+        return int(previous or 0), int(current)
+
+
+def create_rate_limit_backend(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "redis":
+        return RedisRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+_backend = create_rate_limit_backend()
+
+
+def get_client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """
+    Sliding-window-counter limiter for one route.
+
+    Each rule is (scope, limit, window_seconds) where scope is "ip" or "email".
+    The request count over the last window is estimated from the current and
+    previous fixed windows, so memory is O(1) per key on both backends.
+    """
+
+    def __init__(self, route: str, rules: List[Tuple[str, int, int]], backend=None):
+        self.route = route
+        self.rules = rules
+        self._backend = backend
+        self.allowed = Counter()
+        self.rejected = Counter()
+
+    @property
+    def backend(self):
+        return self._backend or _backend
+
+    async def check(self, request: Request, email: Optional[str] = None):
+        """Count this request against every rule; raises 429 with Retry-After when any is exceeded"""
+        if not RATE_LIMIT_ENABLED:
+            return
+        values = {"ip": get_client_ip(request), "email": email.lower().strip() if email else None}
+        now = time.time()
+        for scope, limit, window in self.rules:
+            value = values.get(scope)
+            if value is None:
+                continue
+            key = f"{self.route}:{scope}:{window}s:{value}"
+            window_index = int(now // window)
+            elapsed = now - window_index * window
+            previous, current = await self.backend.incr(key, window_index, window)
+            estimated = previous * (1 - elapsed / window) + current
+            if estimated > limit:
+                self._record(self.rejected, key)
+                retry_after = self._retry_after(previous, current, limit, window, elapsed)
+                logger.warning(f"Rate limit exceeded on {self.route} for {scope}={value}, retry after {retry_after}s")
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, please try again later",
+                    headers={"Retry-After": str(retry_after)}
+                )
+            self._record(self.allowed, key)
+
+    @staticmethod
+    def _retry_after(previous: int, current: int, limit: int, window: int, elapsed: float) -> int:
+        if current >= limit or previous == 0:
+            # Not enough room until the current window becomes the previous one
+            return max(1, math.ceil(window - elapsed))
+        # Wait until the previous window's weight has decayed enough
+        wait = window * (1 - (limit - current) / previous) - elapsed
+        return max(1, math.ceil(wait))
+
+    @staticmethod
+    def _record(counter: Counter, key: str):
+        counter[key] += 1
+        if len(counter) > MAX_TRACKED_KEYS:
+            hottest = counter.most_common(MAX_TRACKED_KEYS // 2)
+            counter.clear()
+            counter.update(dict(hottest))
+
+    def stats(self, top: int = 10) -> dict:
+        return {
+            "route": self.route,
+            "rules": [{"scope": s, "limit": l, "window_seconds": w} for s, l, w in self.rules],
+            "allowed": sum(self.allowed.values()),
+            "rejected": sum(self.rejected.values()),
+            "hot_keys": [{"key": k, "requests": n} for k, n in self.allowed.most_common(top)],
+            "rejected_keys": [{"key": k, "rejections": n} for k, n in self.rejected.most_common(top)],
+        }
+
+
+login_limiter = RateLimiter("login", [("ip", 30, 60), ("email", 10, 300)])
+forgot_password_limiter = RateLimiter("forgot_password", [("ip", 10, 3600), ("email", 3, 900)])
+resend_otp_limiter = RateLimiter("resend_otp", [("ip", 10, 600), ("email", 3, 600)])
+verify_otp_limiter = RateLimiter("verify_otp", [("ip", 30, 600), ("email", 5, 600)])
+
+ALL_LIMITERS = [login_limiter, forgot_password_limiter, resend_otp_limiter, verify_otp_limiter]
+
+
+def rate_limit_stats(top: int = 10) -> List[dict]:
+    return [limiter.stats(top) for limiter in ALL_LIMITERS]
@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncEngine
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.core.database import async_session
+from app.core.sql_instrumentation import instrument_engine
+from app.core.db_deadlines import apply_deadlines, acquire_connection
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated replica URLs; with none configured get_db_read uses the primary
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_POOL_SIZE = int(os.getenv("REPLICA_POOL_SIZE", "10"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+# After a client's own write, its reads go to the primary for this long
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_STICKY_BACKEND = os.getenv("REPLICA_STICKY_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Replay lag in seconds; 0 when the replica has replayed everything it received (an idle
+# primary would otherwise make pg_last_xact_replay_timestamp look stale)
+LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+# Set per request by ReadYourWritesMiddleware; flipped when a primary session writes
+request_wrote: ContextVar[Optional[dict]] = ContextVar("request_wrote", default=None)
+
+
+def sticky_key_from_headers(headers) -> Optional[str]:
+    """Identify the client by its bearer token so stickiness follows the user, not the worker"""
+    authorization = headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+class InMemoryStickinessStore:
+    """Per-process write marks; stickiness only holds when the follow-up read hits the same worker"""
+
+    def __init__(self):
+        self._until: Dict[str, float] = {}
+
+    async def mark(self, key: str, seconds: float):
+        now = time.time()
+        self._until[key] = now + seconds
+        if len(self._until) > 10000:
+            self._until = {k: v for k, v in self._until.items() if v > now}
+
+    async def is_sticky(self, key: str) -> bool:
+        return self._until.get(key, 0) > time.time()
+
+
+class RedisStickinessStore:
+    """Write marks as short-lived Redis keys shared by all workers"""
+
+    KEY_PREFIX = "primary_sticky:"
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url, decode_responses=True)
+        self._redis = client
+
+    async def mark(self, key: str, seconds: float):
+        await self._redis.set(f"{self.KEY_PREFIX}{key}", 1, px=int(seconds * 1000))
+
+    async def is_sticky(self, key: str) -> bool:
+        return bool(await self._redis.exists(f"{self.KEY_PREFIX}{key}"))
+
+
+def create_stickiness_store(backend: str = REPLICA_STICKY_BACKEND):
+    if backend == "redis":
+        return RedisStickinessStore()
+    return InMemoryStickinessStore()
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine: AsyncEngine = create_async_engine(
+            url,
+            pool_size=REPLICA_POOL_SIZE,
+            max_overflow=5,
+            pool_timeout=10,
+            pool_recycle=1800,
+            pool_pre_ping=True,
+        )
+        instrument_engine(self.engine.sync_engine)
+        apply_deadlines(self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(
+            self.engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            info={"replica": True},
+        )
+        self.name = self.engine.url.render_as_string(hide_password=True)
+        self.lag: Optional[float] = None
+        self.healthy = False
+
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions to replicas.
+
+    Healthy replicas (reachable, replay lag under REPLICA_MAX_LAG_SECONDS as of the
+    last check) are used round-robin. Reads fall back to the primary when none is
+    healthy, and for REPLICA_STICKY_SECONDS after the same client wrote through the
+    primary so it always sees its own writes.
+    """
+
+    def __init__(self, urls: List[str] = DATABASE_REPLICA_URLS, stickiness_store=None):
+        self._replicas = [Replica(url) for url in urls]
+        self._round_robin = itertools.count()
+        self._stickiness = stickiness_store or create_stickiness_store()
+        self._task: Optional[asyncio.Task] = None
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self.sticky_reads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._replicas)
+
+    def _pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self._replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    async def session_for(self, sticky_key: Optional[str]) -> AsyncSession:
+        if not self.enabled:
+            return async_session()
+        if sticky_key and await self._stickiness.is_sticky(sticky_key):
+            self.sticky_reads += 1
+            return async_session()
+        replica = self._pick()
+        if replica is None:
+            self.primary_reads += 1
+            return async_session()
+        self.replica_reads += 1
+        return replica.sessionmaker()
+
+    async def mark_write(self, sticky_key: str):
+        await self._stickiness.mark(sticky_key, REPLICA_STICKY_SECONDS)
+
+    async def check_lag(self):
+        for replica in self._replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    replica.lag = float((await conn.execute(LAG_QUERY)).scalar() or 0)
+                was_healthy = replica.healthy
+                replica.healthy = replica.lag <= REPLICA_MAX_LAG_SECONDS
+                if was_healthy and not replica.healthy:
+                    logger.warning(f"Replica {replica.name} lagging {replica.lag:.1f}s, skipping it")
+            except Exception as e:
+                if replica.healthy:
+                    logger.error(f"Replica {replica.name} unreachable, skipping it: {str(e)}")
+                replica.healthy = False
+                replica.lag = None
+
+    async def _lag_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(REPLICA_LAG_CHECK_INTERVAL)
+                await self.check_lag()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error checking replica lag: {str(e)}")
+
+    async def start(self):
+        if not self.enabled:
+            return
+        await self.check_lag()
+        logger.info(f"Read replicas: {[(r.name, r.healthy, r.lag) for r in self._replicas]}")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._lag_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self._replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [{"name": r.name, "healthy": r.healthy, "lag_seconds": r.lag} for r in self._replicas],
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+        }
+
+
+# Global instance
+replica_router = ReplicaRouter()
+
+
+def _flag_write(session: Session):
+    if session.info.get("replica"):
+        return
+    wrote = request_wrote.get()
+    if wrote is not None:
+        wrote["value"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    _flag_write(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _flag_write(orm_execute_state.session)
+
+
+async def get_db_read(request: Request):
+    """Read-only session for GET routes; never use it for writes"""
+    session = await replica_router.session_for(sticky_key_from_headers(request.headers))
+    async with session:
+        await acquire_connection(session)
+        yield session
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware that pins a client's reads to the primary briefly after it writes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_router.enabled:
+            await self.app(scope, receive, send)
+            return
+        wrote = {"value": False}
+
+        async def send_after_marking(message):
+            # Record the write before the client sees the response, so its next read cannot beat the mark
+            if message["type"] == "http.response.start" and wrote["value"]:
+                headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+                sticky_key = sticky_key_from_headers(headers)
+                if sticky_key:
+                    try:
+                        await replica_router.mark_write(sticky_key)
+                    except Exception as e:
+                        logger.error(f"Failed to record write for read-your-writes: {str(e)}")
+            await send(message)
+
+        token = request_wrote.set(wrote)
+        try:
+            await self.app(scope, receive, send_after_marking)
+        finally:
+            request_wrote.reset(token)
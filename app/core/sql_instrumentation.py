@@ -0,0 +1,303 @@
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+# Imported by app.core.database before it loads .env itself
+load_dotenv()
+
+logger = logging.getLogger("app.sql")
+
+# off: no instrumentation; sampled: log SQL_LOG_SAMPLE_PERCENT of statements plus slow ones; slow: slow ones only
+SQL_LOG_MODE = os.getenv("SQL_LOG_MODE", "slow").lower()
+SQL_LOG_SAMPLE_PERCENT = float(os.getenv("SQL_LOG_SAMPLE_PERCENT", "1"))
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# Distinct normalized statements tracked per window, and how long a window lasts
+SQL_STATS_MAX_STATEMENTS = int(os.getenv("SQL_STATS_MAX_STATEMENTS", "500"))
+SQL_STATS_WINDOW_SECONDS = float(os.getenv("SQL_STATS_WINDOW_SECONDS", "3600"))
+
+# Per-request statement counting, Server-Timing headers and N+1 detection
+SQL_REQUEST_STATS = os.getenv("SQL_REQUEST_STATS", "true").lower() == "true"
+# A statement shape executed this many times in one request is reported as a likely N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+# Max statements per request; 0 disables. SQL_QUERY_BUDGETS overrides it per route,
+# e.g. {"GET /admin/users": 3, "POST /payments/webhook": 10}
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "0"))
+SQL_QUERY_BUDGETS: Dict[str, int] = json.loads(os.getenv("SQL_QUERY_BUDGETS", "{}"))
+# Answer requests over budget with a 500 instead of only logging; meant for the test suite / CI
+SQL_QUERY_BUDGET_ENFORCE = os.getenv("SQL_QUERY_BUDGET_ENFORCE", "false").lower() == "true"
+
+# ASGI scope of the request being served, so statements can be attributed to a route
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PLACEHOLDER_RE = re.compile(r"\$\d+(?:::[A-Z_]+(?:\[\])?)?|%\(\w+\)s")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def current_route() -> str:
+    return current_route_for(current_scope.get())
+
+
+def current_route_for(scope: Optional[dict]) -> str:
+    if scope is None:
+        return "-"
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "-")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse literals, IN-lists and whitespace so the same query shape aggregates together"""
+    normalized = _PLACEHOLDER_RE.sub("?", statement)
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("(...)", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+def _redact_value(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Replace bound values with their type (and length for strings) so PII and secrets never reach the log"""
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: report the first row's shape and the row count
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+class SlowQueryStats:
+    """Rolling per-statement-shape timings for queries over the slow threshold"""
+
+    def __init__(self, max_statements: int = SQL_STATS_MAX_STATEMENTS, window_seconds: float = SQL_STATS_WINDOW_SECONDS):
+        self._max_statements = max_statements
+        self._window_seconds = window_seconds
+        self._current: Dict[str, dict] = {}
+        self._previous: Dict[str, dict] = {}
+        self._window_started = time.monotonic()
+
+    def _rotate(self):
+        if time.monotonic() - self._window_started >= self._window_seconds:
+            self._previous, self._current = self._current, {}
+            self._window_started = time.monotonic()
+
+    def record(self, statement: str, duration_ms: float, route: str):
+        self._rotate()
+        key = normalize_statement(statement)
+        entry = self._current.get(key)
+        if entry is None:
+            if len(self._current) >= self._max_statements:
+                # Evict the least slow shape to stay bounded
+                fastest = min(self._current, key=lambda k: self._current[k]["max_ms"])
+                if self._current[fastest]["max_ms"] >= duration_ms:
+                    return
+                del self._current[fastest]
+            entry = self._current[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()}
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        if len(entry["routes"]) < 10:
+            entry["routes"].add(route)
+
+    def top(self, n: int = 20) -> List[dict]:
+        self._rotate()
+        merged: Dict[str, dict] = {}
+        for window in (self._previous, self._current):
+            for statement, entry in window.items():
+                combined = merged.setdefault(statement, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()})
+                combined["count"] += entry["count"]
+                combined["total_ms"] += entry["total_ms"]
+                combined["max_ms"] = max(combined["max_ms"], entry["max_ms"])
+                combined["routes"] |= entry["routes"]
+        ranked = sorted(merged.items(), key=lambda item: item[1]["max_ms"], reverse=True)[:n]
+        return [
+            {
+                "statement": statement,
+                "count": entry["count"],
+                "max_ms": round(entry["max_ms"], 2),
+                "avg_ms": round(entry["total_ms"] / entry["count"], 2),
+                "routes": sorted(entry["routes"]),
+            }
+            for statement, entry in ranked
+        ]
+
+    def reset(self):
+        self._current.clear()
+        self._previous.clear()
+        self._window_started = time.monotonic()
+
+
+slow_query_stats = SlowQueryStats()
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class RequestQueryStats:
+    """Statements and DB time accumulated by one request"""
+
+    __slots__ = ("count", "db_ms", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.db_ms = 0.0
+        # Bound statements keep their placeholders, so the raw SQL string is already the shape
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration_ms: float):
+        self.count += 1
+        self.db_ms += duration_ms
+        self.shapes[statement] += 1
+
+    def repeated_shapes(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD) -> List[tuple]:
+        return [(statement, n) for statement, n in self.shapes.most_common() if n >= threshold]
+
+
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def query_budget_for(route: str) -> int:
+    return SQL_QUERY_BUDGETS.get(route, SQL_QUERY_BUDGET)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    duration_ms = (time.perf_counter() - started) * 1000
+    request_stats = current_query_stats.get()
+    if request_stats is not None:
+        request_stats.record(statement, duration_ms)
+    if SQL_LOG_MODE == "off":
+        return
+    if duration_ms >= SQL_SLOW_QUERY_MS:
+        route = current_route()
+        slow_query_stats.record(statement, duration_ms, route)
+        logger.warning(
+            f"Slow query {duration_ms:.1f}ms route={route} "
+            f"statement={_WHITESPACE_RE.sub(' ', statement)} params={redact_parameters(parameters)}"
+        )
+    elif SQL_LOG_MODE == "sampled" and random.random() * 100 < SQL_LOG_SAMPLE_PERCENT:
+        logger.info(
+            f"Query {duration_ms:.1f}ms route={current_route()} "
+            f"statement={_WHITESPACE_RE.sub(' ', statement)} params={redact_parameters(parameters)}"
+        )
+
+
+def _handle_error(exception_context):
+    # The statement failed, so after_cursor_execute will not pop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine: Engine, mode: str = SQL_LOG_MODE):
+    """Attach timing listeners to a (sync) engine unless both SQL logging and request stats are off"""
+    if mode == "off" and not SQL_REQUEST_STATS:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    logger.info(f"SQL instrumentation enabled: mode={mode}, slow threshold={SQL_SLOW_QUERY_MS}ms")
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that exposes the current request's scope to SQL instrumentation
+    and, with SQL_REQUEST_STATS, counts the request's statements.
+
+    Adds a Server-Timing header (db time and statement count, plus total time), logs
+    statement shapes repeated SQL_N_PLUS_ONE_THRESHOLD or more times, and checks the
+    route's query budget when the response starts. With SQL_QUERY_BUDGET_ENFORCE the
+    response of a request over budget is replaced by a 500 carrying the
+    QueryBudgetExceeded message, so the test client sees the failure.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        scope_token = current_scope.set(scope)
+        if not SQL_REQUEST_STATS:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                current_scope.reset(scope_token)
+            return
+
+        stats = RequestQueryStats()
+        stats_token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        # Set at http.response.start when the budget is enforced and was exceeded
+        exceeded: Optional[QueryBudgetExceeded] = None
+        budget_checked = False
+
+        async def send_with_timing(message):
+            nonlocal exceeded, budget_checked
+            if message["type"] == "http.response.start":
+                budget_checked = True
+                exceeded = self._check_budget(stats, current_route_for(scope))
+                headers = list(message.get("headers", []))
+                if exceeded is not None:
+                    body = str(exceeded).encode()
+                    message = {"type": "http.response.start", "status": 500}
+                    headers = [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())]
+                total_ms = (time.perf_counter() - started) * 1000
+                server_timing = f'db;dur={stats.db_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+                message["headers"] = headers + [(b"server-timing", server_timing.encode("latin-1"))]
+            elif message["type"] == "http.response.body" and exceeded is not None:
+                # Drop the original body and send the error once the app finishes its own
+                if message.get("more_body", False):
+                    return
+                message = {"type": "http.response.body", "body": str(exceeded).encode()}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(stats_token)
+            current_scope.reset(scope_token)
+        route = current_route_for(scope)
+        for statement, n in stats.repeated_shapes():
+            logger.warning(f"Possible N+1 on {route}: statement ran {n} times: {_WHITESPACE_RE.sub(' ', statement)[:300]}")
+        if not budget_checked:
+            # The app never started a response, e.g. it raised; its error is what gets reported
+            self._check_budget(stats, route)
+
+    @staticmethod
+    def _check_budget(stats: RequestQueryStats, route: str) -> Optional[QueryBudgetExceeded]:
+        """Log a request over its route's budget; returns the error to respond with when enforcing"""
+        budget = query_budget_for(route)
+        if not budget or stats.count <= budget:
+            return None
+        message = f"{route} ran {stats.count} SQL statements, over its budget of {budget}"
+        logger.warning(message)
+        if SQL_QUERY_BUDGET_ENFORCE:
+            return QueryBudgetExceeded(message)
+        return None
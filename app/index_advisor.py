@@ -0,0 +1,201 @@
+"""
+Index advisor
+Runs EXPLAIN over a catalogue of the query shapes the app issues on hot paths
+and flags sequential scans on tables large enough for an index to matter,
+along with the index that covers each shape.
+
+Point DATABASE_URL at a seeded copy of production (or a staging database);
+on an empty database every plan is a sequential scan and nothing is flagged.
+
+Usage: python -m app.index_advisor [--min-rows 1000] [--analyze]
+"""
+import argparse
+import asyncio
+import json
+from datetime import date, datetime, time as dt_time
+from typing import List, Optional
+from sqlalchemy import and_, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app.core.database import engine
+from app.models.appointment import Appointment
+from app.models.notification import Notification, NotificationTargetType
+from app.models.payment import Payment, PaymentNotification, PaymentStatus, PaymentType
+from app.models.registration import PartnershipLevel, RegistrationInfo, RegistrationLevel, RegistrationProduct
+from app.models.user import User
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, with the statement's parameters bound as usual"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+# (name, where it runs, statement, index that serves it)
+QUERY_CATALOGUE = [
+    (
+        "payment by stripe id",
+        "POST /payments/webhook",
+        select(Payment).filter(Payment.stripe_payment_id == "pi_advisor"),
+        "ix_payments_stripe_payment_id (stripe_payment_id) WHERE stripe_payment_id IS NOT NULL",
+    ),
+    (
+        "payment history",
+        "GET /payments/history",
+        select(Payment).filter(Payment.user_id == 1).order_by(Payment.created_at.desc()),
+        "ix_payments_user_id_created_at (user_id, created_at)",
+    ),
+    (
+        "active subscription check",
+        "POST /payments/monthly",
+        select(Payment).filter(
+            and_(
+                Payment.user_id == 1,
+                Payment.payment_type == PaymentType.MONTHLY,
+                Payment.payment_status == PaymentStatus.SUCCESS
+            )
+        ),
+        "ix_payments_user_id_created_at (user_id, created_at)",
+    ),
+    (
+        "overdue monthly payments",
+        "POST /payments/check-overdue, payment monitoring",
+        select(Payment).filter(
+            and_(
+                Payment.payment_type == PaymentType.MONTHLY,
+                Payment.payment_status == PaymentStatus.FAILED,
+                Payment.next_payment_due < datetime.utcnow()
+            )
+        ),
+        "ix_payments_overdue (next_payment_due) WHERE payment_type = 'MONTHLY' AND payment_status = 'FAILED'",
+    ),
+    (
+        "payment notification dedupe",
+        "send_payment_notification",
+        select(PaymentNotification).filter(
+            PaymentNotification.payment_id == 1,
+            PaymentNotification.notification_type == "PAYMENT_OVERDUE"
+        ),
+        "ix_payment_notifications_payment_id_type (payment_id, notification_type)",
+    ),
+    (
+        "registration levels by user",
+        "registration steps, retention_service",
+        select(RegistrationLevel).filter(RegistrationLevel.user_id == 1),
+        "ix_registration_levels_user_id (user_id)",
+    ),
+    (
+        "registration info by user",
+        "GET /registration/registration_info, GET /admin/registrationinfo/{user_id}",
+        select(RegistrationInfo).filter(RegistrationInfo.user_id == 1),
+        "ix_registration_info_user_id (user_id)",
+    ),
+    (
+        "registration products by user",
+        "GET /admin/user-product_data/{user_id}",
+        select(RegistrationProduct).filter(RegistrationProduct.user_id == 1),
+        "ix_registration_products_user_id (user_id)",
+    ),
+    (
+        "visible notifications for role",
+        "GET /notifications/",
+        select(Notification)
+        .filter(
+            Notification.target_type.in_([NotificationTargetType.ALL_USERS, NotificationTargetType.BUYERS]),
+            Notification.visibility == True
+        )
+        .order_by(Notification.created_at.desc()),
+        "ix_notifications_visible_target_created_at (target_type, created_at) WHERE visibility",
+    ),
+    (
+        "appointment slot check",
+        "POST /appointments/",
+        select(Appointment).filter(
+            Appointment.appointment_date == date.today(),
+            Appointment.appointment_time == dt_time(10, 0),
+            Appointment.time_zone == "EST"
+        ),
+        "ix_appointments_slot (appointment_date, appointment_time, time_zone)",
+    ),
+    (
+        "appointments by day",
+        "GET /appointments/getAppointmentByDay",
+        select(Appointment).filter(Appointment.appointment_date == date.today()),
+        "ix_appointments_slot (appointment_date, appointment_time, time_zone)",
+    ),
+    (
+        "users holding a partnership",
+        "GET /admin/users?partnership=",
+        select(User).filter(User.holds_partnership(PartnershipLevel.WHOLESALE)),
+        "ix_users_partnership_level GIN (partnership_level jsonb_path_ops)",
+    ),
+    (
+        "user by email",
+        "POST /auth/login",
+        select(User).filter(User.email == "advisor@example.com"),
+        "unique index on users.email",
+    ),
+]
+
+
+def _seq_scans(plan: dict) -> List[dict]:
+    scans = []
+    if plan.get("Node Type") == "Seq Scan":
+        scans.append(plan)
+    for child in plan.get("Plans", []):
+        scans.extend(_seq_scans(child))
+    return scans
+
+
+async def _table_rows(conn, relation: str) -> float:
+    result = await conn.execute(text("SELECT reltuples FROM pg_class WHERE relname = :relation"), {"relation": relation})
+    return float(result.scalar() or 0)
+
+
+async def advise(min_rows: float, analyze: bool) -> int:
+    flagged = 0
+    async with engine.connect() as conn:
+        if analyze:
+            await conn.execute(text("ANALYZE"))
+        for name, caller, statement, suggestion in QUERY_CATALOGUE:
+            result = await conn.execute(Explain(statement))
+            plan_json = result.scalar()
+            plan = (json.loads(plan_json) if isinstance(plan_json, str) else plan_json)[0]["Plan"]
+            scans = _seq_scans(plan)
+            problems = []
+            for scan in scans:
+                rows = await _table_rows(conn, scan["Relation Name"])
+                if rows >= min_rows:
+                    problems.append((scan, rows))
+            status = "SEQ SCAN" if problems else "ok"
+            print(f"[{status:>8}] {name} ({caller}) cost={plan['Total Cost']:.1f}")
+            for scan, rows in problems:
+                flagged += 1
+                filter_clause: Optional[str] = scan.get("Filter")
+                print(f"           {scan['Relation Name']} (~{rows:.0f} rows) filter: {filter_clause}")
+                print(f"           suggested: {suggestion}")
+    return flagged
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Flag sequential scans in the app's hot query shapes")
+    parser.add_argument("--min-rows", type=float, default=1000, help="ignore seq scans on tables smaller than this")
+    parser.add_argument("--analyze", action="store_true", help="run ANALYZE first so row estimates are current")
+    args = parser.parse_args()
+
+    print("=== Index Advisor ===")
+    flagged = await advise(args.min_rows, args.analyze)
+    print(f"\n{flagged} sequential scan(s) flagged")
+    await engine.dispose()
+    raise SystemExit(1 if flagged else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
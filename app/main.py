@@ -3,26 +3,65 @@ from contextlib import asynccontextmanager
 
 from fastapi.staticfiles import StaticFiles
 from app.core.database import init_db
+from app.core.sql_instrumentation import RequestContextMiddleware
+from app.core.read_replicas import replica_router, ReadYourWritesMiddleware
+from app.core.invalidation import invalidation_bus
+from app.core.db_deadlines import DeadlineMiddleware
 from dotenv import load_dotenv
 from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 import os
+import time
+import logging
 from app.api.version1.route_init import router
 from app.services.background_tasks import background_task_service
+from app.services.auth.password_service import password_service
+from app.services.auth.revocation import revocation_service
+from app.services.auth.google_verifier import google_token_verifier
+from app.services.mail_service import smtp_pool
+from app.services.email_outbox import email_outbox
+from app.services.blob_store import blob_store
+from app.services.auth.otp_store import otp_service
+from app.utils.uploads import UploadSizeLimitMiddleware
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 
 
 @asynccontextmanager
 async def lifespan(app:FastAPI):
-    await init_db()
-    # Start all background schedulers
-    await background_task_service.start_all_schedulers()
+    startup_phases = [
+        ("schema", init_db),
+        ("replicas", replica_router.start),
+        ("invalidation", invalidation_bus.start),
+        ("revocations", revocation_service.start),
+        ("email_outbox", email_outbox.start),
+        ("otp_sweeper", otp_service.start),
+        ("blob_sweeper", blob_store.start),
+        # Start all background schedulers
+        ("schedulers", background_task_service.start_all_schedulers),
+    ]
+    timings = {}
+    for name, start in startup_phases:
+        started = time.perf_counter()
+        await start()
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    app.state.startup_timings = timings
+    logger.info(f"Startup complete in {sum(timings.values()):.1f}ms: {timings}")
     yield
     # Stop all schedulers when app shuts down
     await background_task_service.stop_all_schedulers()
+    await revocation_service.stop()
+    await google_token_verifier.close()
+    await email_outbox.stop()
+    await otp_service.stop()
+    await blob_store.stop()
+    await smtp_pool.close()
+    await replica_router.stop()
+    await invalidation_bus.stop()
+    password_service.shutdown()
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -62,6 +101,9 @@ def create_app() -> FastAPI:
 
     app.openapi = custom_openapi
 
+    # Innermost, so its 413s still get CORS headers
+    app.add_middleware(UploadSizeLimitMiddleware)
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -76,6 +118,10 @@ def create_app() -> FastAPI:
         session_cookie="session_cookie"
     )
 
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(DeadlineMiddleware)
+    app.add_middleware(RequestContextMiddleware)
+
     app.include_router(router)
 
     return app
@@ -7,4 +7,7 @@ from .teams import Team, TeamMember
 from .appointment import Appointment
 from .notification import Notification
 from .job import Job
-from .payment import Payment, PaymentNotification, PartnershipDeactivation
\ No newline at end of file
+from .payment import Payment, PaymentNotification, PartnershipDeactivation
+from .revoked_token import RevokedToken
+from .email_outbox import EmailOutbox
+from .blob import Blob
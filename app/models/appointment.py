@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, Date, Time, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Enum, Date, Time, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import ENUM
 from app.core.database import Base
@@ -45,4 +45,11 @@ class Appointment(Base):
     file_path = Column(String(500), nullable=True)  # Optional file
     file_name = Column(String(255), nullable=True)
     verification_status = Column(Enum(VerificationStatus), default=VerificationStatus.PENDING)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Slot availability check and per-day listings
+        Index("ix_appointments_slot", "appointment_date", "appointment_time", "time_zone"),
+        # Keyset pagination of the appointment list
+        Index("ix_appointments_created_at_id", "created_at", "id"),
+    )
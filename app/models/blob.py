@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class Blob(Base):
+    """One stored file per distinct content; documents point at it through Document.file_path"""
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)  # hex SHA-256 of the content
+    path = Column(String(255), nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    # Number of rows pointing at this blob; at 0 the sweeper deletes it after a grace period
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Lets the sweeper find unreferenced blobs without scanning the table
+        Index("ix_blobs_unreferenced", "updated_at", postgresql_where=(ref_count <= 0)),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Enum, DateTime
+from sqlalchemy import Column, ForeignKey, Integer, String, Enum, DateTime, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 from enum import Enum as PyEnum
@@ -14,7 +14,12 @@ class Document(Base):
     file_name = Column(String(255), nullable=False)
     file_url = Column(String(500), nullable=True)
     ai_verification_status = Column(Enum(VerificationStatus), default=VerificationStatus.PENDING)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
-    user = relationship("User", back_populates="documents")
\ No newline at end of file
+    user = relationship("User", back_populates="documents")
+
+    __table_args__ = (
+        # Keyset pagination of the admin document list
+        Index("ix_documents_created_at_id", "created_at", "id"),
+    )
\ No newline at end of file
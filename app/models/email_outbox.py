@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.types import Enum as SQLEnum
+from app.core.database import Base
+from datetime import datetime
+from enum import Enum
+
+class EmailOutboxStatus(str, Enum):
+    PENDING = "PENDING"  # Waiting to be sent or retried
+    SENT = "SENT"
+    FAILED = "FAILED"  # Gave up after the maximum number of attempts
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)  # Replaced with a placeholder once SENT or FAILED (may hold an OTP)
+    status = Column(SQLEnum(EmailOutboxStatus), nullable=False, default=EmailOutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Earliest time the row may be claimed; pushed forward on claim (lease) and on failure (backoff)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
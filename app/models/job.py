@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -14,6 +14,11 @@ class Job(Base):
     requirements = Column(Text, nullable=False)
     salary_range = Column(String, nullable=True)
     application_deadline = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
-    posted_by = Column(Integer, ForeignKey("users.id"), nullable=False)
\ No newline at end of file
+    posted_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination of the job list
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean, ForeignKey,Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean, ForeignKey, Index, text, Enum as SQLEnum
 from sqlalchemy.sql import func
 from app.core.database import Base
 from enum import Enum
@@ -19,4 +19,14 @@ class Notification(Base):
     message = Column(String(500), nullable=False)
     target_type = Column(SQLEnum(NotificationTargetType), nullable=False)
     visibility = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Notification feed: visible rows for a set of target types, newest first
+        Index(
+            "ix_notifications_visible_target_created_at",
+            "target_type",
+            "created_at",
+            postgresql_where=text("visibility")
+        ),
+    )
@@ -1,13 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, CheckConstraint, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class OTP(Base):
     __tablename__ = "otps"
-    
+
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(255), nullable=False, index=True)  # Removed unique=True
+    email = Column(String(255), nullable=False)  # One live OTP per email; upserted on reissue
     otp_code = Column(String(6), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # UTC; swept once passed
     __table_args__ = (
         CheckConstraint("otp_code ~ '^[0-9]{6}$'", name="valid_otp_code"),
-    )
\ No newline at end of file
+        Index("ux_otps_email", "email", unique=True),
+    )
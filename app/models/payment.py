@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.types import Enum as SQLEnum
@@ -36,12 +36,25 @@ class Payment(Base):
     stripe_payment_id = Column(String, nullable=True)
     stripe_customer_id = Column(String, nullable=True)
     next_payment_due = Column(DateTime, nullable=True)  
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationship back to User
     user = relationship("User", back_populates="payments")
 
+    __table_args__ = (
+        # Stripe webhook lookups
+        Index("ix_payments_stripe_payment_id", "stripe_payment_id", postgresql_where=text("stripe_payment_id IS NOT NULL")),
+        # Per-user history (ordered by created_at) and subscription checks
+        Index("ix_payments_user_id_created_at", "user_id", "created_at"),
+        # Overdue monitoring only ever looks at failed monthly payments
+        Index(
+            "ix_payments_overdue",
+            "next_payment_due",
+            postgresql_where=text("payment_type = 'MONTHLY' AND payment_status = 'FAILED'")
+        ),
+    )
+
 class PaymentNotification(Base):
     __tablename__ = "payment_notifications"
     
@@ -55,6 +68,11 @@ class PaymentNotification(Base):
     sent_at = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Duplicate-notification check before sending payment reminders
+        Index("ix_payment_notifications_payment_id_type", "payment_id", "notification_type"),
+    )
+
 class PartnershipDeactivation(Base):
     __tablename__ = "partnership_deactivations"
     
@@ -65,4 +83,9 @@ class PartnershipDeactivation(Base):
     deactivated_at = Column(DateTime(timezone=True), server_default=func.now())
     reactivation_available = Column(Boolean, default=True)
     reactivated_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination of the admin deactivation list
+        Index("ix_partnership_deactivations_created_at_id", "created_at", "id"),
+    )
\ No newline at end of file
@@ -28,7 +28,7 @@ class PartnershipLevel(enum.Enum):
 class RegistrationLevel(Base):
     __tablename__ = "registration_levels"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     level = Column(Enum(PartnershipLevel), nullable=False)
     is_lateral = Column(Boolean, default=False)
     payment_status = Column(String(50), default="pending")
@@ -40,7 +40,7 @@ class RegistrationLevel(Base):
 class RegistrationInfo(Base):
     __tablename__ = "registration_info"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     # Business Details
     business_name = Column(String(255), nullable=False)
     business_legal_structure = Column(String(100), nullable=False)
@@ -101,7 +101,7 @@ class RegistrationInfo(Base):
 class RegistrationProduct(Base):
     __tablename__ = "registration_products"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     product_data = Column(JSONB, nullable=False)  # Stores categoryId, categoryName, subcategoryId, subcategoryName, specifications
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.database import Base
+from datetime import datetime
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_digest = Column(String(64), unique=True, nullable=False)  # hex SHA-256 of the raw token
+    expires_at = Column(DateTime, nullable=False, index=True)  # token exp (UTC); row can be purged after this
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Float, Integer, String, Boolean, Enum, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Float, Integer, String, Boolean, Enum, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
 from app.core.database import Base
+from app.models.registration import PartnershipLevel
 from datetime import datetime
+from typing import List
 import enum
 from enum import Enum as PyEnum
 
@@ -26,11 +29,12 @@ class User(Base):
     is_active = Column(Boolean, default=False)
     visibility_level = Column(Integer, default=1)  
     ownership = Column(JSON, nullable=True)  
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     google_id = Column(String, unique=True, nullable=True) 
     kpi_score = Column(Float, default=0.0)
-    partnership_level = Column(JSON, default=["DROP_SHIPPING"])  # Array of active partnerships
+    # Array of active partnerships; read and write it through active_partnerships
+    partnership_level = Column(JSONB, default=["DROP_SHIPPING"])
     retention_period = Column(Integer, default=0)
     retention_start_date = Column(DateTime, nullable=True) 
     is_registered = Column(Enum(RegistrationStatus), nullable=False, default=RegistrationStatus.PENDING)
@@ -38,7 +42,61 @@ class User(Base):
     is_lateral=Column(Boolean, default=False)
     first_register=Column(Boolean, default=False)
     payment_status=Column(Boolean, default=False)
+    permissions_version = Column(Integer, nullable=False, default=1)  # Bumped whenever role/ownership/visibility change
     
     documents = relationship("Document", back_populates="user", cascade="all, delete-orphan")
     payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Serves username prefix lookups (LIKE 'name\_%') used for unique username allocation
+        Index("ix_users_username_pattern", "username", postgresql_ops={"username": "text_pattern_ops"}),
+        # Keyset pagination of the admin user list
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Partnership membership (partnership_level @> '["WHOLESALE"]'), see holds_partnership
+        Index(
+            "ix_users_partnership_level",
+            "partnership_level",
+            postgresql_using="gin",
+            postgresql_ops={"partnership_level": "jsonb_path_ops"},
+        ),
+    )
+
+    @property
+    def active_partnerships(self) -> List[PartnershipLevel]:
+        """Active partnerships as enum members; DROP_SHIPPING when none are stored"""
+        levels = self.partnership_level
+        if isinstance(levels, str):
+            levels = [levels]
+        if not levels:
+            return [PartnershipLevel.DROP_SHIPPING]
+        return [PartnershipLevel(level) for level in levels]
+
+    @active_partnerships.setter
+    def active_partnerships(self, levels: List[PartnershipLevel]):
+        # Always assign a new list: in-place changes to a JSONB value are not tracked
+        self.partnership_level = [level.value for level in levels] or [PartnershipLevel.DROP_SHIPPING.value]
+
+    def has_partnership(self, level: PartnershipLevel) -> bool:
+        return level in self.active_partnerships
+
+    def add_partnership(self, level: PartnershipLevel) -> bool:
+        """Add `level` if not already active; returns whether anything changed"""
+        current = self.active_partnerships
+        if level in current:
+            return False
+        self.active_partnerships = current + [level]
+        return True
+
+    def remove_partnership(self, level: PartnershipLevel) -> bool:
+        """Remove `level` if active, falling back to DROP_SHIPPING; returns whether anything changed"""
+        current = self.active_partnerships
+        if level not in current:
+            return False
+        self.active_partnerships = [p for p in current if p != level]
+        return True
+
+    @classmethod
+    def holds_partnership(cls, level: PartnershipLevel):
+        """Filter clause for users holding `level`, served by the GIN index"""
+        return cls.partnership_level.contains([level.value])
    
\ No newline at end of file
@@ -32,3 +32,20 @@ class DocumentReuploadRequest(BaseModel):
 class DocumentApproveRequest(BaseModel):
     document_id: int
     approve: bool
+
+class DocumentPresignRequest(BaseModel):
+    document_type: str
+    file_name: str
+    sha256: str  # Hex SHA-256 of the file; storage rejects an upload with any other content
+
+class DocumentPresignResponse(BaseModel):
+    upload_token: str  # Pass back to /user/documents/confirm once the upload finished
+    method: str
+    url: str
+    fields: dict  # Form fields to send along with the file, which must be the last field
+    expires_in: int
+
+class DocumentConfirmRequest(BaseModel):
+    upload_token: str
+    file_url: Optional[str] = None
+    document_id: Optional[int] = None  # Replace this document's file instead of adding a new document
@@ -4,13 +4,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.user import User, UserRole
 from app.schema.user import SubAdminResponse, UserSignup, UserLogin, Token, SubAdminCreate, SubAdminUpdate, UserResponse
-from app.core.security import get_password_hash, verify_password
+from app.services.auth.password_service import password_service
 from app.services.auth.jwt import create_access_token, create_refresh_token
 from app.utils.email import send_otp_email
 from datetime import timedelta
 import logging
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from app.services.auth.google_verifier import google_token_verifier
+from app.services.auth.username_service import UsernameService
 from google_auth_oauthlib.flow import Flow
 import logging
 import os
@@ -23,8 +23,17 @@ logger = logging.getLogger(__name__)
 async def authenticate_user(db: AsyncSession, email: str, password: str):
     result = await db.execute(select(User).filter(User.email == email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not user.password_hash:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await password_service.verify_and_update(password, user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash uses an outdated bcrypt cost factor; upgrade it transparently
+        user.password_hash = new_hash
+        db.add(user)
+        await db.commit()
+        logger.info(f"Rehashed password for user {user.email} with current cost factor")
     return user
 
 async def login_user(db: AsyncSession, user_login: UserLogin) -> Token:
@@ -43,7 +52,8 @@ async def login_user(db: AsyncSession, user_login: UserLogin) -> Token:
         expires_delta=expires_delta_access,
         is_registered= user.is_registered,
         registration_step= user.registration_step,
-        first_register= user.first_register
+        first_register= user.first_register,
+        permissions_version=user.permissions_version
     )
     refresh_token = create_refresh_token(
         username=user.username,
@@ -55,7 +65,8 @@ async def login_user(db: AsyncSession, user_login: UserLogin) -> Token:
         expires_delta=expires_delta_refresh,
         is_registered= user.is_registered,
         registration_step= user.registration_step,
-        first_register= user.first_register
+        first_register= user.first_register,
+        permissions_version=user.permissions_version
     )
     return Token(
         access_token=access_token,
@@ -86,7 +97,7 @@ async def register_user(db: AsyncSession, user: UserSignup, role: UserRole) -> U
             await db.commit()
 
         # Create new user
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await password_service.hash_password(user.password)
         db_user = User(
             username=user.username,
             email=user.email,
@@ -96,8 +107,7 @@ async def register_user(db: AsyncSession, user: UserSignup, role: UserRole) -> U
             visibility_level=1 if role == UserRole.sub_admin else None,
             ownership=None
         )
-        db.add(db_user)
-        await db.commit()
+        await UsernameService.insert_user(db, db_user)
         await db.refresh(db_user)
         
         # Send OTP
@@ -105,13 +115,13 @@ async def register_user(db: AsyncSession, user: UserSignup, role: UserRole) -> U
             if not await send_otp_email(user.email, db):
                 await db.delete(db_user)
                 await db.commit()
-                logger.error(f"Failed to send OTP to {user.email}")
+                logger.error(f"Failed to queue OTP for {user.email}")
                 raise HTTPException(status_code=500, detail="Failed to send OTP email")
-            logger.info(f"User {user.email} registered, OTP sent")
+            logger.info(f"User {user.email} registered, OTP queued")
         except HTTPException as e:
             await db.delete(db_user)
             await db.commit()
-            logger.error(f"Error during OTP sending for {user.email}: {str(e)}")
+            logger.error(f"Error queuing OTP for {user.email}: {str(e)}")
             raise e
         
         return UserResponse(
@@ -123,6 +133,9 @@ async def register_user(db: AsyncSession, user: UserSignup, role: UserRole) -> U
             visibility_level=db_user.visibility_level,
             ownership=db_user.ownership
         )
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         logger.error(f"Error registering user {user.email}: {str(e)}")
         await db.rollback()
@@ -139,7 +152,7 @@ async def register_vendor(db: AsyncSession, user_data: UserSignup, role: UserRol
             await db.delete(existing_user)
             await db.commit()
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_service.hash_password(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -147,21 +160,20 @@ async def register_vendor(db: AsyncSession, user_data: UserSignup, role: UserRol
         role=role,
         is_active=False
     )
-    db.add(new_user)
-    await db.commit()
+    await UsernameService.insert_user(db, new_user)
     await db.refresh(new_user)
     
     try:
         if not await send_otp_email(user_data.email, db):  # Pass db session
             await db.delete(new_user)
             await db.commit()
-            logger.error(f"Failed to send OTP to {user_data.email}")
+            logger.error(f"Failed to queue OTP for {user_data.email}")
             raise HTTPException(status_code=500, detail="Failed to send OTP email")
-        logger.info(f"Vendor {user_data.email} registered, OTP sent")
+        logger.info(f"Vendor {user_data.email} registered, OTP queued")
     except HTTPException as e:
         await db.delete(new_user)
         await db.commit()
-        logger.error(f"Error during OTP sending for {user_data.email}: {str(e)}")
+        logger.error(f"Error queuing OTP for {user_data.email}: {str(e)}")
         raise e
     
     return UserResponse(
@@ -185,7 +197,7 @@ async def register_super_admin(db: AsyncSession, user_data: UserSignup, role: Us
             await db.delete(existing_user)
             await db.commit()
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_service.hash_password(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -201,13 +213,13 @@ async def register_super_admin(db: AsyncSession, user_data: UserSignup, role: Us
         if not await send_otp_email(user_data.email, db):  # Pass db session
             await db.delete(new_user)
             await db.commit()
-            logger.error(f"Failed to send OTP to {user_data.email}")
+            logger.error(f"Failed to queue OTP for {user_data.email}")
             raise HTTPException(status_code=500, detail="Failed to send OTP email")
-        logger.info(f"Super admin {user_data.email} registered, OTP sent")
+        logger.info(f"Super admin {user_data.email} registered, OTP queued")
     except HTTPException as e:
         await db.delete(new_user)
         await db.commit()
-        logger.error(f"Error during OTP sending for {user_data.email}: {str(e)}")
+        logger.error(f"Error queuing OTP for {user_data.email}: {str(e)}")
         raise e
     
     return UserResponse(
@@ -231,7 +243,7 @@ async def register_sub_admin(db: AsyncSession, user_data: SubAdminCreate, role:
             await db.delete(existing_user)
             await db.commit()
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_service.hash_password(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -249,7 +261,7 @@ async def register_sub_admin(db: AsyncSession, user_data: SubAdminCreate, role:
     except HTTPException as e:
         await db.delete(new_user)
         await db.commit()
-        logger.error(f"Error during OTP sending for {user_data.email}: {str(e)}")
+        logger.error(f"Error queuing OTP for {user_data.email}: {str(e)}")
         raise e
     
     return SubAdminResponse(
@@ -270,6 +282,7 @@ async def update_sub_admin(db: AsyncSession, user_id: int, user_update: SubAdmin
             user.visibility_level = user_update.visibility_level
         if user_update.ownership is not None:
             user.ownership = user_update.ownership
+        user.permissions_version = (user.permissions_version or 1) + 1
         db.add(user)
         await db.commit()
         await db.refresh(user)
@@ -295,7 +308,7 @@ async def google_login(db: AsyncSession, token: str, role: str):
         if not client_id:
             raise HTTPException(status_code=500, detail="Missing Google client ID")
         
-        idinfo = id_token.verify_oauth2_token(token, requests.Request(), client_id)
+        idinfo = await google_token_verifier.verify(token, client_id)
         
         google_id = idinfo['sub']
         email = idinfo['email']
@@ -320,7 +333,8 @@ async def google_login(db: AsyncSession, token: str, role: str):
                 user_id=existing_user.id,
                 role=existing_user.role.value,
                 visibility_level=existing_user.visibility_level,
-                ownership=existing_user.ownership
+                ownership=existing_user.ownership,
+                permissions_version=existing_user.permissions_version
             )
             refresh_token = create_refresh_token(
                 username=existing_user.username, 
@@ -328,7 +342,8 @@ async def google_login(db: AsyncSession, token: str, role: str):
                 user_id=existing_user.id,
                 role=existing_user.role.value,
                 visibility_level=existing_user.visibility_level,
-                ownership=existing_user.ownership
+                ownership=existing_user.ownership,
+                permissions_version=existing_user.permissions_version
             )
             return {
                 "access_token": access_token,
@@ -341,16 +356,6 @@ async def google_login(db: AsyncSession, token: str, role: str):
             }
         
 
-        base_username = username
-        suffix = 0
-        while True:
-            result = await db.execute(select(User).filter(User.username == username))
-            existing_username = result.scalar_one_or_none()
-            if not existing_username or not existing_username.is_active:
-                break
-            suffix += 1
-            username = f"{base_username}_{suffix}"
-        
         new_user = User(
             email=email,
             username=username,
@@ -358,8 +363,7 @@ async def google_login(db: AsyncSession, token: str, role: str):
             role=requested_role, 
             is_active=True
         )
-        db.add(new_user)
-        await db.commit()
+        await UsernameService.insert_user(db, new_user, allocate_username=True)
         await db.refresh(new_user)
         
         logger.info(f"New user {email} created via Google Sign-In as {requested_role.value}")
@@ -369,7 +373,8 @@ async def google_login(db: AsyncSession, token: str, role: str):
             user_id=new_user.id,
             role=new_user.role.value,
             visibility_level=new_user.visibility_level,
-            ownership=new_user.ownership
+            ownership=new_user.ownership,
+            permissions_version=new_user.permissions_version
         )
         refresh_token = create_refresh_token(
             username=new_user.username,
@@ -377,7 +382,8 @@ async def google_login(db: AsyncSession, token: str, role: str):
             user_id=new_user.id,
             role=new_user.role.value,
             visibility_level=new_user.visibility_level,
-            ownership=new_user.ownership
+            ownership=new_user.ownership,
+            permissions_version=new_user.permissions_version
         )
         return {
             "access_token": access_token,
@@ -388,6 +394,8 @@ async def google_login(db: AsyncSession, token: str, role: str):
             "visibility_level": new_user.visibility_level,
             "ownership": new_user.ownership
         }
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Invalid Google ID token for email {email or 'unknown'}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=401, detail="Invalid Google token")
@@ -0,0 +1,109 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional
+import httpx
+from google.auth import jwt as google_jwt
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_CERTS_TIMEOUT = float(os.getenv("GOOGLE_CERTS_TIMEOUT", "5"))
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+
+# Used when Google's response carries no usable Cache-Control max-age
+DEFAULT_CERTS_MAX_AGE = 3600
+# Floor on the cache lifetime so a burst of logins shares one fetch even if Google says no-cache
+MIN_CERTS_MAX_AGE = 60
+# Lower bound between refreshes forced by an unknown key id, so bogus kids cannot trigger a fetch per request
+MIN_FORCED_REFRESH_INTERVAL = 60
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _cache_max_age(cache_control: Optional[str]) -> int:
+    if cache_control:
+        match = _MAX_AGE_RE.search(cache_control)
+        if match:
+            return max(int(match.group(1)), MIN_CERTS_MAX_AGE)
+    return DEFAULT_CERTS_MAX_AGE
+
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens against an in-process cache of Google's signing certificates"""
+
+    def __init__(self, certs_url: str = GOOGLE_CERTS_URL):
+        self._certs_url = certs_url
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.fetches = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=GOOGLE_CERTS_TIMEOUT)
+        return self._client
+
+    async def _fetch_certs(self):
+        response = await self._get_client().get(self._certs_url)
+        response.raise_for_status()
+        certs = response.json()
+        max_age = _cache_max_age(response.headers.get("cache-control"))
+        now = time.time()
+        self._certs = certs
+        self._expires_at = now + max_age
+        self._last_fetch = now
+        self.fetches += 1
+        logger.info(f"Fetched {len(certs)} Google signing certificates, cached for {max_age}s")
+
+    async def get_certs(self, required_kid: Optional[str] = None) -> Dict[str, str]:
+        """Return cached certs, refreshing them (single-flight) when expired or missing the token's key id"""
+        if self._is_fresh(required_kid):
+            return self._certs
+        async with self._lock:
+            # Another coroutine may have refreshed while we waited for the lock
+            if not self._is_fresh(required_kid):
+                if self._certs and time.time() < self._expires_at and time.time() - self._last_fetch < MIN_FORCED_REFRESH_INTERVAL:
+                    logger.warning(f"Unknown Google key id {required_kid}, skipping refresh (fetched recently)")
+                else:
+                    await self._fetch_certs()
+        return self._certs
+
+    def _is_fresh(self, required_kid: Optional[str]) -> bool:
+        if not self._certs or time.time() >= self._expires_at:
+            return False
+        return required_kid is None or required_kid in self._certs
+
+    async def verify(self, token: str, audience: str) -> dict:
+        """Verify an ID token's signature, audience, expiry and issuer; raises ValueError if invalid"""
+        header = self._unverified_header(token)
+        certs = await self.get_certs(header.get("kid"))
+        # RSA signature verification is CPU work; keep it off the event loop
+        idinfo = await asyncio.to_thread(google_jwt.decode, token, certs=certs, audience=audience)
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}")
+        return idinfo
+
+    @staticmethod
+    def _unverified_header(token: str) -> dict:
+        try:
+            encoded_header = token.split(".", 1)[0]
+            padded = encoded_header + "=" * (-len(encoded_header) % 4)
+            return json.loads(base64.urlsafe_b64decode(padded))
+        except Exception as e:
+            raise ValueError(f"Malformed Google ID token: {str(e)}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+google_token_verifier = GoogleTokenVerifier()
@@ -5,10 +5,16 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 from app.models.user import RegistrationStatus
 from app.schema.user import UserResponse
+from app.services.auth.token_cache import token_cache, token_digest, CompactClaims
+from app.services.auth.revocation import revocation_service
+from app.services.auth.principal_cache import principal_cache
 import os
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = "HS256"
+# Compact mode: tokens carry only user_id and the permissions version; role, ownership and
+# visibility are served from principal_cache so permission changes apply immediately
+JWT_COMPACT_CLAIMS = os.getenv("JWT_COMPACT_CLAIMS", "false").lower() == "true"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def create_access_token(
@@ -22,10 +28,14 @@ def create_access_token(
     is_registered: RegistrationStatus = RegistrationStatus.PENDING,
     registration_step: int = 0,
     first_register: bool = False,
+    permissions_version: int = 1,
 ):
     # 🔹 Default: 15 minutes for access tokens
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
 
+    if JWT_COMPACT_CLAIMS:
+        return jwt.encode({"user_id": user_id, "pv": permissions_version, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
     to_encode = {
         "username": username,
         "sub": email,
@@ -58,10 +68,14 @@ def create_refresh_token(
     is_registered: RegistrationStatus = RegistrationStatus.PENDING,
     registration_step: int = 0,
     first_register: bool = False,
+    permissions_version: int = 1,
 ):
     # 🔹 Default: 7 days for refresh tokens
     expire = datetime.utcnow() + (expires_delta or timedelta(days=7))
 
+    if JWT_COMPACT_CLAIMS:
+        return jwt.encode({"user_id": user_id, "pv": permissions_version, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
     to_encode = {
         "username": username,
         "sub": email,
@@ -82,70 +96,75 @@ def create_refresh_token(
 
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def role_required(*allowed_roles: str):
-    async def verify_token(token: str = Depends(oauth2_scheme)) -> UserResponse:
+def _principal_from_claims(payload: dict) -> UserResponse:
+    username:str = payload.get("username")
+    email: str = payload.get("sub")
+    user_id: int = payload.get("user_id")
+    role: str = payload.get("role")
+    visibility_level: Optional[int] = payload.get("visibility_level")
+    ownership: Optional[Dict[str, List[str]]] = payload.get("ownership")
+    is_registered: Optional[str] = payload.get("is_registered")
+    registration_step: Optional[int] = payload.get("registration_step")
+    first_register: Optional[bool] = payload.get("first_register", False)
+    
+    if email is None or user_id is None or role is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    return UserResponse(
+        id=user_id,
+        username=username,  
+        email=email,
+        role=role,
+        is_active=True,
+        visibility_level=visibility_level,
+        ownership=ownership,
+        is_registered=is_registered,
+        registration_step=registration_step,
+        first_register=first_register
+    )
+
+async def decode_principal(token: str) -> UserResponse:
+    """Decode and validate a token, reusing its verified contents cached until the token's exp"""
+    digest = token_digest(token)
+    if revocation_service.is_revoked(digest):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    verified = token_cache.get(digest)
+    if verified is None:
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username:str = payload.get("username")
-            email: str = payload.get("sub")
-            user_id: int = payload.get("user_id")
-            role: str = payload.get("role")
-            visibility_level: Optional[int] = payload.get("visibility_level")
-            ownership: Optional[Dict[str, List[str]]] = payload.get("ownership")
-
-            
-            if email is None or user_id is None or role is None:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            if role not in allowed_roles:
-                raise HTTPException(status_code=403, detail="Insufficient role permissions")
-            
-            if role == "sub_admin":
-                if visibility_level is None:
-                    raise HTTPException(status_code=403, detail="Sub-admin requires visibility level")
-                if visibility_level < 3 and any(r in ["super_admin"] for r in allowed_roles):
-                    raise HTTPException(status_code=403, detail="Insufficient visibility level")
-            
-            return UserResponse(
-                id=user_id,
-                username=username,  
-                email=email,
-                role=role,
-                is_active=True,
-                visibility_level=visibility_level,
-                ownership=ownership)
         except JWTError:
             raise HTTPException(status_code=401, detail="Invalid token")
+        if "pv" in payload:
+            if payload.get("user_id") is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            verified = CompactClaims(payload["user_id"], payload["pv"])
+        else:
+            verified = _principal_from_claims(payload)
+        token_cache.put(digest, verified, payload.get("exp"))
+
+    if isinstance(verified, CompactClaims):
+        principal = await principal_cache.get(verified.user_id, verified.permissions_version)
+        if principal is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return principal
+    return verified
+
+def role_required(*allowed_roles: str):
+    async def verify_token(token: str = Depends(oauth2_scheme)) -> UserResponse:
+        principal = await decode_principal(token)
+        
+        if principal.role not in allowed_roles:
+            raise HTTPException(status_code=403, detail="Insufficient role permissions")
+        
+        if principal.role == "sub_admin":
+            if principal.visibility_level is None:
+                raise HTTPException(status_code=403, detail="Sub-admin requires visibility level")
+            if principal.visibility_level < 3 and any(r in ["super_admin"] for r in allowed_roles):
+                raise HTTPException(status_code=403, detail="Insufficient visibility level")
+        
+        return principal
     return verify_token
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username:str = payload.get("username")
-        email: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        role: str = payload.get("role")
-        visibility_level: Optional[int] = payload.get("visibility_level")
-        ownership: Optional[Dict[str, List[str]]] = payload.get("ownership")
-        is_registered: Optional[str] = payload.get("is_registered")
-        registration_step: Optional[int] = payload.get("registration_step")
-        first_register: Optional[bool] = payload.get("first_register", False)
-        
-        if email is None or user_id is None or role is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        return UserResponse(
-            id=user_id,
-            username=username,  
-            email=email,
-            role=role,
-            is_active=True,
-            visibility_level=visibility_level,
-            ownership=ownership,
-            is_registered=is_registered,
-            registration_step=registration_step,
-            first_register=first_register
-        )
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+    return await decode_principal(token)
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.database import async_session
+from app.models.otp import OTP
+
+logger = logging.getLogger(__name__)
+
+OTP_BACKEND = os.getenv("OTP_BACKEND", "postgres").lower()
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "600"))
+OTP_SWEEP_INTERVAL = float(os.getenv("OTP_SWEEP_INTERVAL", "300"))
+OTP_SWEEP_BATCH_SIZE = int(os.getenv("OTP_SWEEP_BATCH_SIZE", "1000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class PostgresOTPStore:
+    """
+    OTPs in the otps table, one row per email.
+
+    issue() is a single upsert executed in the caller's session, so the OTP commits
+    together with anything else the caller staged (e.g. its outbox email).
+    consume() is a single DELETE ... RETURNING that also enforces expiry.
+    """
+
+    transactional = True
+
+    async def issue(self, db: AsyncSession, email: str, otp_code: str, expires_at: datetime):
+        stmt = insert(OTP).values(email=email, otp_code=otp_code, expires_at=expires_at)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[OTP.email],
+                set_={"otp_code": stmt.excluded.otp_code, "expires_at": stmt.excluded.expires_at}
+            )
+        )
+
+    async def consume(self, db: AsyncSession, email: str, otp_code: str) -> bool:
+        result = await db.execute(
+            delete(OTP)
+            .where(
+                OTP.email == email,
+                OTP.otp_code == otp_code,
+                OTP.expires_at > datetime.utcnow()
+            )
+            .returning(OTP.id)
+        )
+        consumed = result.scalar_one_or_none() is not None
+        await db.commit()
+        return consumed
+
+    async def sweep(self, batch_size: int = OTP_SWEEP_BATCH_SIZE) -> int:
+        """Delete expired OTPs in batches so the sweep never holds long row locks"""
+        total = 0
+        while True:
+            async with async_session() as db:
+                expired_ids = (
+                    select(OTP.id)
+                    .filter(OTP.expires_at <= datetime.utcnow())
+                    .limit(batch_size)
+                    .scalar_subquery()
+                )
+                result = await db.execute(delete(OTP).where(OTP.id.in_(expired_ids)))
+                await db.commit()
+            total += result.rowcount
+            if result.rowcount < batch_size:
+                return total
+
+    async def close(self):
+        pass
+
+
+class InMemoryOTPStore:
+    """
+    Per-process OTPs, for tests and single-process development only: under several
+    workers a code issued on one would fail verification on the others, so
+    create_otp_store() refuses it when WEB_CONCURRENCY > 1.
+    """
+
+    transactional = False
+
+    def __init__(self):
+        self._otps: Dict[str, Tuple[str, float]] = {}
+
+    async def issue(self, db: AsyncSession, email: str, otp_code: str, expires_at: datetime):
+        self._otps[email] = (otp_code, time.time() + (expires_at - datetime.utcnow()).total_seconds())
+
+    async def consume(self, db: AsyncSession, email: str, otp_code: str) -> bool:
+        stored = self._otps.get(email)
+        if not stored or stored[0] != otp_code or stored[1] <= time.time():
+            return False
+        del self._otps[email]
+        return True
+
+    async def sweep(self, batch_size: int = OTP_SWEEP_BATCH_SIZE) -> int:
+        now = time.time()
+        expired = [email for email, (_, expires_at) in self._otps.items() if expires_at <= now]
+        for email in expired:
+            del self._otps[email]
+        return len(expired)
+
+    async def close(self):
+        pass
+
+
+class RedisOTPStore:
+    """OTPs as Redis keys with a native TTL, keeping OTP traffic off Postgres"""
+
+    transactional = False
+
+    KEY_PREFIX = "otp:"
+    # Delete only when the code matches, so a wrong guess does not burn the real code
+    CONSUME_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url, decode_responses=True)
+        self._redis = client
+
+    async def issue(self, db: AsyncSession, email: str, otp_code: str, expires_at: datetime):
+        ttl = max(1, int((expires_at - datetime.utcnow()).total_seconds()))
+        await self._redis.set(f"{self.KEY_PREFIX}{email}", otp_code, ex=ttl)
+
+    async def consume(self, db: AsyncSession, email: str, otp_code: str) -> bool:
+        return bool(await self._redis.eval(self.CONSUME_SCRIPT, 1, f"{self.KEY_PREFIX}{email}", otp_code))
+
+    async def sweep(self, batch_size: int = OTP_SWEEP_BATCH_SIZE) -> int:
+        # Redis expires keys itself
+        return 0
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_otp_store(backend: str = OTP_BACKEND):
+    if backend == "redis":
+        return RedisOTPStore()
+    if backend == "memory":
+        # uvicorn reads WEB_CONCURRENCY as its default worker count
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            raise ValueError("OTP_BACKEND=memory is per-process; use postgres or redis with more than one worker")
+        return InMemoryOTPStore()
+    return PostgresOTPStore()
+
+
+class OTPService:
+    """Issues and consumes OTPs through the configured store and sweeps expired ones periodically"""
+
+    def __init__(self, store=None, ttl: int = OTP_TTL_SECONDS, sweep_interval: float = OTP_SWEEP_INTERVAL):
+        self._store = store or create_otp_store()
+        self._ttl = ttl
+        self._sweep_interval = sweep_interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ttl_minutes(self) -> int:
+        return self._ttl // 60
+
+    async def issue(self, db: AsyncSession, email: str, otp_code: str):
+        """
+        Store otp_code as the only valid code for email. With the Postgres store it is
+        staged in db's transaction; the Redis and memory stores write immediately, so
+        a caller whose commit fails must discard() the code.
+        """
+        await self._store.issue(db, email, otp_code, datetime.utcnow() + timedelta(seconds=self._ttl))
+
+    async def discard(self, db: AsyncSession, email: str, otp_code: str):
+        """Undo issue() after the caller's transaction rolled back"""
+        if not self._store.transactional:
+            # consume() deletes only if the code still matches, so a newer code survives
+            await self._store.consume(db, email, otp_code)
+
+    async def consume(self, db: AsyncSession, email: str, otp_code: str) -> bool:
+        """Atomically check and invalidate a code; False if it is wrong or expired"""
+        return await self._store.consume(db, email, otp_code)
+
+    async def sweep(self) -> int:
+        removed = await self._store.sweep()
+        if removed:
+            logger.info(f"Swept {removed} expired OTPs")
+        return removed
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self._sweep_interval)
+                await self.sweep()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error sweeping expired OTPs: {str(e)}")
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._store.close()
+
+
+# Global instance
+otp_service = OTPService()
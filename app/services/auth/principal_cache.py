@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy.future import select
+from app.core.database import async_session
+from app.core.invalidation import invalidation_bus
+from app.models.user import User
+from app.schema.user import UserResponse
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long a snapshot is trusted without a version bump seen on this worker
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+
+def snapshot_from_user(user: User) -> UserResponse:
+    return UserResponse(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role.value,
+        is_active=True,
+        visibility_level=user.visibility_level,
+        ownership=user.ownership,
+        is_registered=user.is_registered.value if user.is_registered else None,
+        registration_step=user.registration_step,
+        first_register=user.first_register,
+        is_lateral=user.is_lateral,
+        payment_status=user.payment_status
+    )
+
+
+class PrincipalCache:
+    """
+    Versioned in-process snapshot of each user's role, ownership and visibility.
+
+    Compact tokens carry only user_id and the permissions version they were issued
+    with; the rest of the principal is served from here. A snapshot is reloaded from
+    the users table when it expires, when a token carries a newer version than the
+    cached one, or when a "user" invalidation arrives from any worker.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL):
+        self._ttl = ttl
+        self._snapshots: Dict[int, Tuple[int, UserResponse, float]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        # Bumped on every invalidation; a load that raced one is returned but not cached
+        self._generation = 0
+
+    async def get(self, user_id: int, permissions_version: int) -> Optional[UserResponse]:
+        cached = self._snapshots.get(user_id)
+        if cached and self._usable(cached, permissions_version):
+            return cached[1]
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            cached = self._snapshots.get(user_id)
+            if cached and self._usable(cached, permissions_version):
+                return cached[1]
+            return await self._load(user_id)
+
+    def _usable(self, cached: Tuple[int, UserResponse, float], permissions_version: int) -> bool:
+        version, _, loaded_at = cached
+        return version >= permissions_version and time.monotonic() - loaded_at < invalidation_bus.effective_ttl(self._ttl)
+
+    async def _load(self, user_id: int) -> Optional[UserResponse]:
+        generation = self._generation
+        async with async_session() as db:
+            result = await db.execute(select(User).filter(User.id == user_id))
+            user = result.scalar_one_or_none()
+        if not user:
+            self._snapshots.pop(user_id, None)
+            return None
+        snapshot = snapshot_from_user(user)
+        if generation == self._generation:
+            self._snapshots[user_id] = (user.permissions_version, snapshot, time.monotonic())
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        # The per-user lock is kept: a load may be holding it, and a fresh lock would let a second load run beside it
+        self._generation += 1
+        self._snapshots.pop(user_id, None)
+
+    def clear(self):
+        self._generation += 1
+        self._snapshots.clear()
+        self._locks = {user_id: lock for user_id, lock in self._locks.items() if lock.locked()}
+
+    def on_invalidation(self, id: Optional[str], version: Optional[int]):
+        if id is None:
+            self.clear()
+            return
+        cached = self._snapshots.get(int(id))
+        # A late notification for a version older than the cached snapshot is stale;
+        # with nothing cached a load may be in flight, so it is always invalidated
+        if not cached or version is None or cached[0] <= version:
+            self.invalidate(int(id))
+
+
+# Global instance
+principal_cache = PrincipalCache()
+# Any flushed change to a user (role, ownership, registration state, deletion) evicts its snapshot on every worker
+invalidation_bus.track(User, "user", version_attr="permissions_version")
+invalidation_bus.subscribe("user", principal_cache.on_invalidation)
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from jose import jwt
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from app.core.database import async_session
+from app.models.revoked_token import RevokedToken
+from app.services.auth.token_cache import token_cache, token_digest
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_BACKEND = os.getenv("TOKEN_REVOCATION_BACKEND", "postgres").lower()
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "5"))
+REVOCATION_PURGE_INTERVAL = float(os.getenv("REVOCATION_PURGE_INTERVAL", "3600"))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Re-read a window before the last sync so writes from workers with a skewed clock are not missed
+SYNC_OVERLAP_SECONDS = 60
+
+
+def _to_datetime(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _to_timestamp(dt: datetime) -> float:
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over SHA-256 token digests"""
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        # Double hashing on two 64-bit halves of the digest; no extra hashing needed
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes):
+        for pos in self._positions(digest):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, digest: bytes) -> bool:
+        bits = self._bits
+        for pos in self._positions(digest):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class InMemoryRevocationStore:
+    """Process-local store; used for single-worker development and as the test fake"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, float]] = {}  # digest hex -> (expires_at, revoked_at)
+
+    async def add(self, digest_hex: str, expires_at: float):
+        self._entries.setdefault(digest_hex, (expires_at, time.time()))
+
+    async def load_since(self, since: float) -> List[Tuple[str, float]]:
+        now = time.time()
+        return [
+            (digest_hex, expires_at)
+            for digest_hex, (expires_at, revoked_at) in self._entries.items()
+            if revoked_at >= since and expires_at > now
+        ]
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+        return len(expired)
+
+    async def close(self):
+        pass
+
+
+class PostgresRevocationStore:
+    """Revocations persisted in the revoked_tokens table"""
+
+    async def add(self, digest_hex: str, expires_at: float):
+        async with async_session() as db:
+            await db.execute(
+                insert(RevokedToken)
+                .values(
+                    token_digest=digest_hex,
+                    expires_at=_to_datetime(expires_at),
+                    created_at=datetime.utcnow(),
+                )
+                .on_conflict_do_nothing(index_elements=["token_digest"])
+            )
+            await db.commit()
+
+    async def load_since(self, since: float) -> List[Tuple[str, float]]:
+        async with async_session() as db:
+            result = await db.execute(
+                select(RevokedToken.token_digest, RevokedToken.expires_at).filter(
+                    RevokedToken.created_at >= _to_datetime(since),
+                    RevokedToken.expires_at > datetime.utcnow(),
+                )
+            )
+            return [(digest_hex, _to_timestamp(expires_at)) for digest_hex, expires_at in result.all()]
+
+    async def purge_expired(self) -> int:
+        async with async_session() as db:
+            result = await db.execute(
+                delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+            )
+            await db.commit()
+            return result.rowcount
+
+    async def close(self):
+        pass
+
+
+class RedisRevocationStore:
+    """Revocations kept in two Redis sorted sets: digest scored by exp, and digest scored by revocation time"""
+
+    EXPIRY_KEY = "revoked_tokens:exp"
+    ADDED_KEY = "revoked_tokens:added"
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url, decode_responses=True)
+        self._redis = client
+
+    async def add(self, digest_hex: str, expires_at: float):
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.EXPIRY_KEY, {digest_hex: expires_at})
+            pipe.zadd(self.ADDED_KEY, {digest_hex: time.time()})
+            await pipe.execute()
+
+    async def load_since(self, since: float) -> List[Tuple[str, float]]:
+        digests = await self._redis.zrangebyscore(self.ADDED_KEY, since, "+inf")
+        if not digests:
+            return []
+        scores = await self._redis.zmscore(self.EXPIRY_KEY, digests)
+        now = time.time()
+        return [
+            (digest_hex, float(expires_at))
+            for digest_hex, expires_at in zip(digests, scores)
+            if expires_at is not None and float(expires_at) > now
+        ]
+
+    async def purge_expired(self) -> int:
+        expired = await self._redis.zrangebyscore(self.EXPIRY_KEY, "-inf", time.time())
+        if not expired:
+            return 0
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.EXPIRY_KEY, *expired)
+            pipe.zrem(self.ADDED_KEY, *expired)
+            await pipe.execute()
+        return len(expired)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_revocation_store(backend: str = TOKEN_REVOCATION_BACKEND):
+    if backend == "redis":
+        return RedisRevocationStore()
+    if backend == "memory":
+        return InMemoryRevocationStore()
+    return PostgresRevocationStore()
+
+
+class TokenRevocationService:
+    """
+    Token revocation list with a Bloom filter fast path.
+
+    is_revoked() never does I/O: it consults the per-worker Bloom filter and,
+    only on a possible match, the local digest map. Both are kept in sync with
+    the shared store by a background loop, so a revocation on one worker is
+    seen by the others within REVOCATION_SYNC_INTERVAL seconds.
+    """
+
+    def __init__(self, store=None, sync_interval: float = REVOCATION_SYNC_INTERVAL):
+        self._store = store or create_revocation_store()
+        self._sync_interval = sync_interval
+        self._revoked: Dict[bytes, float] = {}
+        self._bloom = BloomFilter()
+        self._last_sync: Optional[float] = None
+        self._last_purge = time.time()
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, digest: bytes) -> bool:
+        if not self._bloom.might_contain(digest):
+            return False
+        expires_at = self._revoked.get(digest)
+        return expires_at is not None and expires_at > time.time()
+
+    def _remember(self, digest: bytes, expires_at: float):
+        if digest not in self._revoked:
+            self._bloom.add(digest)
+        self._revoked[digest] = expires_at
+        token_cache.discard(digest)
+
+    async def revoke(self, token: str):
+        """Revoke a token until its exp; the caller must have verified the token already"""
+        expires_at = jwt.get_unverified_claims(token).get("exp")
+        if expires_at is None:
+            logger.warning("Refusing to revoke token without exp claim")
+            return
+        digest = token_digest(token)
+        self._remember(digest, float(expires_at))
+        await self._store.add(digest.hex(), float(expires_at))
+
+    async def sync(self):
+        started = time.time()
+        since = 0.0 if self._last_sync is None else self._last_sync - SYNC_OVERLAP_SECONDS
+        for digest_hex, expires_at in await self._store.load_since(since):
+            self._remember(bytes.fromhex(digest_hex), expires_at)
+        self._last_sync = started
+
+    async def purge(self):
+        """Drop expired entries locally and in the store, rebuilding the Bloom filter"""
+        now = time.time()
+        self._revoked = {d: exp for d, exp in self._revoked.items() if exp > now}
+        bloom = BloomFilter()
+        for digest in self._revoked:
+            bloom.add(digest)
+        self._bloom = bloom
+        removed = await self._store.purge_expired()
+        self._last_purge = now
+        logger.info(f"Purged {removed} expired token revocations, {len(self._revoked)} active")
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self._sync_interval)
+                await self.sync()
+                if time.time() - self._last_purge >= REVOCATION_PURGE_INTERVAL:
+                    await self.purge()
+            except asyncio.CancelledError:
+                logger.info("Token revocation sync loop cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error syncing token revocations: {str(e)}")
+
+    async def start(self):
+        try:
+            await self.sync()
+            logger.info(f"Loaded {len(self._revoked)} active token revocations")
+        except Exception as e:
+            logger.error(f"Error loading token revocations: {str(e)}")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._store.close()
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._revoked),
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hash_count,
+        }
+
+
+# Global instance
+revocation_service = TokenRevocationService()
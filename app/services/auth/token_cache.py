@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple, Optional, Union
+from cachetools import TLRUCache
+from app.schema.user import UserResponse
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class CompactClaims(NamedTuple):
+    """Verified contents of a compact token; the principal itself is resolved via principal_cache"""
+    user_id: int
+    permissions_version: int
+
+
+VerifiedToken = Union[UserResponse, CompactClaims]
+
+
+def token_digest(token: str) -> bytes:
+    """SHA-256 digest of a raw token; shared key for the principal cache and the revocation list"""
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _token_expiry(key, value, now):
+    return value[1]
+
+
+class TokenCache:
+    """In-process LRU of verified token contents keyed by token digest, each entry evicted at the token's exp"""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, enabled: bool = TOKEN_CACHE_ENABLED):
+        self.enabled = enabled
+        self._cache = TLRUCache(maxsize=maxsize, ttu=_token_expiry, timer=time.time)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> Optional[VerifiedToken]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, digest: bytes, principal: VerifiedToken, exp: Optional[float]):
+        # Tokens without an exp claim are never cached
+        if not self.enabled or exp is None:
+            return
+        with self._lock:
+            self._cache[digest] = (principal, float(exp))
+
+    def discard(self, digest: bytes):
+        with self._lock:
+            self._cache.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Global instance
+token_cache = TokenCache()
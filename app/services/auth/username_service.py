@@ -0,0 +1,81 @@
+import logging
+import re
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+MAX_INSERT_ATTEMPTS = 5
+# Unique constraint on users.username (Postgres' default name for Column(unique=True))
+USERNAME_UNIQUE_CONSTRAINT = "users_username_key"
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _is_username_conflict(error: IntegrityError) -> bool:
+    # The asyncpg adapter chains the driver's UniqueViolationError, which carries the constraint name
+    cause = getattr(error.orig, "__cause__", None)
+    return getattr(cause, "constraint_name", None) == USERNAME_UNIQUE_CONSTRAINT
+
+
+class UsernameService:
+    """Username allocation and race-safe user inserts shared by the sign-up flows"""
+
+    @staticmethod
+    async def next_available_username(db: AsyncSession, base_username: str) -> str:
+        """
+        Return base_username if free, otherwise base_username_N with N one past the highest taken suffix.
+        Uses a single prefix query served by the ix_users_username_pattern index.
+        """
+        result = await db.execute(
+            select(User.username).filter(
+                or_(
+                    User.username == base_username,
+                    User.username.like(f"{_escape_like(base_username)}\\_%", escape="\\")
+                )
+            )
+        )
+        taken = set(result.scalars().all())
+        if base_username not in taken:
+            return base_username
+
+        suffix_pattern = re.compile(re.escape(base_username) + r"_(\d+)")
+        suffixes = [
+            int(match.group(1))
+            for name in taken
+            if (match := suffix_pattern.fullmatch(name))
+        ]
+        return f"{base_username}_{max(suffixes, default=0) + 1}"
+
+    @staticmethod
+    async def insert_user(db: AsyncSession, user: User, allocate_username: bool = False) -> User:
+        """
+        Insert and commit a new user inside a savepoint.
+
+        On a username unique violation (e.g. a concurrent sign-up), either retry with the
+        next free suffix (allocate_username=True) or fail with 400.
+        """
+        base_username = user.username
+        for attempt in range(MAX_INSERT_ATTEMPTS):
+            if allocate_username:
+                user.username = await UsernameService.next_available_username(db, base_username)
+            try:
+                async with db.begin_nested():
+                    db.add(user)
+                await db.commit()
+                return user
+            except IntegrityError as e:
+                if not _is_username_conflict(e):
+                    raise
+                if not allocate_username:
+                    raise HTTPException(status_code=400, detail="Email or username already registered")
+                logger.info(f"Username {user.username} taken concurrently, retrying (attempt {attempt + 1})")
+
+        logger.error(f"Could not allocate a unique username for base {base_username}")
+        raise HTTPException(status_code=409, detail="Could not allocate a unique username, please retry")
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, List, Optional, Sequence
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import event, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from dotenv import load_dotenv
+from app.core.database import async_session
+from app.models.blob import Blob
+from app.models.document import Document
+from app.services.storage import storage
+from app.utils.uploads import MB, discard_upload, spool_upload
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BLOB_ROOT = os.getenv("BLOB_ROOT", "uploads/blobs")
+# Unreferenced blobs are kept this long, so re-uploading the same bytes soon after replacing them is free
+BLOB_GRACE_SECONDS = int(os.getenv("BLOB_GRACE_SECONDS", "86400"))
+BLOB_SWEEP_INTERVAL = float(os.getenv("BLOB_SWEEP_INTERVAL", "3600"))
+BLOB_SWEEP_BATCH_SIZE = int(os.getenv("BLOB_SWEEP_BATCH_SIZE", "200"))
+# Files of one multi-file upload received and written at the same time
+BLOB_UPLOAD_CONCURRENCY = int(os.getenv("BLOB_UPLOAD_CONCURRENCY", "4"))
+
+
+@dataclass
+class StoredBlob:
+    path: str
+    size: int
+    sha256: str
+    deduplicated: bool  # True when the bytes were already stored and nothing was written
+
+
+class BlobStore:
+    """
+    Content-addressed file store with reference counting, on top of the
+    configured storage backend.
+
+    store() streams an upload to a temp file while hashing it, then upserts the
+    blobs row for the digest in the caller's transaction, bumping its ref_count.
+    Only the first copy of some content is put in storage at
+    <root>/<sha[:2]>/<sha><ext>; repeat uploads drop the temp file instead. The
+    upsert takes the row lock, so concurrent uploads of the same new content
+    serialise and only one of them writes the object. adopt() does the same for
+    an object a client uploaded directly to storage.
+
+    Callers release() a path when a row stops pointing at it; ORM deletes of a
+    Document (including cascades from its user) release its file automatically, so
+    only bulk DELETE statements need to call release() themselves. Blobs at ref_count 0
+    are deleted by the sweeper after BLOB_GRACE_SECONDS, with the row locked while
+    the object is removed so a concurrent store() of the same bytes waits and then
+    writes a fresh copy.
+    """
+
+    def __init__(self, root: str = BLOB_ROOT):
+        self.root = root
+        self._task: Optional[asyncio.Task] = None
+        self.stored = 0
+        self.deduplicated = 0
+        self.swept = 0
+
+    def path_for(self, sha256: str, ext: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}{ext}")
+
+    async def _reference(self, db: AsyncSession, blobs: dict) -> dict:
+        """Add references in one upsert; `blobs` maps sha256 -> (ext, size, count), returns sha256 -> path"""
+        stmt = pg_insert(Blob).values([
+            {"sha256": sha256, "path": self.path_for(sha256, ext), "size": size, "ref_count": count}
+            # Sorted so concurrent batches lock the rows in the same order
+            for sha256, (ext, size, count) in sorted(blobs.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Blob.sha256],
+            set_={"ref_count": Blob.ref_count + stmt.excluded.ref_count, "updated_at": func.now()},
+        ).returning(Blob.sha256, Blob.path)
+        return dict((await db.execute(stmt)).all())
+
+    async def store(self, db: AsyncSession, file: UploadFile, max_bytes: int) -> StoredBlob:
+        return (await self.store_many(db, [file], max_bytes))[0]
+
+    async def store_many(
+        self, db: AsyncSession, files: Sequence[UploadFile], max_bytes: int, concurrency: int = BLOB_UPLOAD_CONCURRENCY
+    ) -> List[StoredBlob]:
+        """
+        store() for several files at once. The files are received and written at most
+        `concurrency` at a time and referenced with a single upsert; the session itself
+        is only used from this task. Returns one StoredBlob per file, in order.
+        """
+        slots = asyncio.Semaphore(concurrency)
+
+        async def _spool(file: UploadFile):
+            async with slots:
+                return await spool_upload(file, storage.spool_dir(self.root), max_bytes)
+
+        results = await asyncio.gather(*(_spool(file) for file in files), return_exceptions=True)
+        spooled = [r for r in results if not isinstance(r, BaseException)]
+        try:
+            for r in results:
+                if isinstance(r, BaseException):
+                    raise r
+
+            blobs, first = {}, {}
+            for file, upload in zip(files, spooled):
+                ext = os.path.splitext(file.filename or "")[1].lower()
+                entry = blobs.setdefault(upload.sha256, [ext, upload.size, 0])
+                entry[2] += 1
+                first.setdefault(upload.sha256, upload)
+            paths = await self._reference(db, blobs)
+
+            async def _place(sha256: str, upload) -> bool:
+                async with slots:
+                    # Also covers a blob whose object was lost, e.g. a sweep that deleted it but failed to commit
+                    if await storage.exists(paths[sha256]):
+                        await discard_upload(upload)
+                        return True
+                    await storage.put(upload, paths[sha256])
+                    return False
+
+            existed = dict(zip(first, await asyncio.gather(*(_place(sha256, upload) for sha256, upload in first.items()))))
+            stored = []
+            for upload in spooled:
+                # Repeats within the batch are duplicates of the first copy
+                deduplicated = existed[upload.sha256] or upload is not first[upload.sha256]
+                if upload is not first[upload.sha256]:
+                    await discard_upload(upload)
+                stored.append(StoredBlob(path=paths[upload.sha256], size=upload.size, sha256=upload.sha256, deduplicated=deduplicated))
+        except BaseException:
+            await asyncio.gather(*(discard_upload(upload) for upload in spooled), return_exceptions=True)
+            raise
+        self.deduplicated += sum(blob.deduplicated for blob in stored)
+        self.stored += sum(not blob.deduplicated for blob in stored)
+        return stored
+
+    async def adopt(self, db: AsyncSession, key: str, max_bytes: int, sha256: str) -> StoredBlob:
+        """
+        Take over an object a client uploaded straight to storage at `key` with a form
+        from storage.presign_upload() for the hex digest `sha256`.
+        """
+        size = await storage.size(key)
+        if size is None:
+            raise HTTPException(status_code=400, detail="Upload not found; upload the file before confirming")
+        if size > max_bytes:
+            await storage.delete(key)
+            raise HTTPException(status_code=413, detail=f"Upload is larger than the {max_bytes // MB} MB limit")
+        # The digest storage verified on write (S3 checks the presigned checksum), not the client's claim
+        if await storage.sha256(key) != sha256:
+            await storage.delete(key)
+            raise HTTPException(status_code=400, detail="Upload does not match its checksum; upload the file again")
+        path = (await self._reference(db, {sha256: (os.path.splitext(key)[1].lower(), size, 1)}))[sha256]
+        exists = await storage.exists(path)
+        if exists:
+            await storage.delete(key)
+            self.deduplicated += 1
+        else:
+            await storage.move(key, path)
+            self.stored += 1
+        return StoredBlob(path=path, size=size, sha256=sha256, deduplicated=exists)
+
+    async def release(self, db: AsyncSession, paths: Iterable[str]):
+        """Drop one reference per path, in the caller's transaction; paths outside the store are ignored"""
+        for path, count in Counter(p for p in paths if p).items():
+            await db.execute(
+                update(Blob)
+                .where(Blob.path == path)
+                .values(ref_count=Blob.ref_count - count, updated_at=func.now())
+            )
+
+    async def sweep(self) -> int:
+        # Compared in SQL: updated_at is written with the database's now(), not the app's clock
+        cutoff = func.now() - timedelta(seconds=BLOB_GRACE_SECONDS)
+        async with async_session() as db:
+            async with db.begin():
+                result = await db.execute(
+                    select(Blob)
+                    .filter(Blob.ref_count <= 0, Blob.updated_at < cutoff)
+                    .limit(BLOB_SWEEP_BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                )
+                blobs = result.scalars().all()
+                for blob in blobs:
+                    await storage.delete(blob.path)
+                    await db.delete(blob)
+        if blobs:
+            self.swept += len(blobs)
+            logger.info(f"Swept {len(blobs)} unreferenced blobs")
+        return len(blobs)
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(BLOB_SWEEP_INTERVAL)
+                while await self.sweep() >= BLOB_SWEEP_BATCH_SIZE:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sweeping blobs: {str(e)}")
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "swept": self.swept,
+        }
+
+
+# Global instance
+blob_store = BlobStore()
+
+
+@event.listens_for(Document, "after_delete")
+def _release_deleted_document(mapper, connection, target):
+    # Runs inside the flush, on its connection, so the release commits or rolls back with the delete
+    if target.file_path:
+        connection.execute(
+            update(Blob)
+            .where(Blob.path == target.file_path)
+            .values(ref_count=Blob.ref_count - 1, updated_at=func.now())
+        )
@@ -0,0 +1,98 @@
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.invalidation import invalidation_bus
+from app.models.document import Document, VerificationStatus
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long a summary is trusted without an invalidation seen on this worker
+DOCUMENT_SUMMARY_TTL = float(os.getenv("DOCUMENT_SUMMARY_TTL", "300"))
+
+# document_type -> {status value -> number of documents}
+StatusCounts = Dict[str, Dict[str, int]]
+
+
+class DocumentSummary:
+    def __init__(self, counts: StatusCounts):
+        self.counts = counts
+
+    @property
+    def uploaded_types(self) -> set:
+        return set(self.counts)
+
+    @property
+    def verified_types(self) -> set:
+        return {t for t, by_status in self.counts.items() if by_status.get(VerificationStatus.PASS.value)}
+
+    def missing(self, required_types: list) -> list:
+        return [t for t in required_types if t not in self.counts]
+
+
+async def summarize(db: AsyncSession, user_id: int) -> DocumentSummary:
+    """Counts of the user's documents by type and status, in one GROUP BY on `db`'s transaction"""
+    result = await db.execute(
+        select(Document.document_type, Document.ai_verification_status, func.count())
+        .filter(Document.user_id == user_id)
+        .group_by(Document.document_type, Document.ai_verification_status)
+    )
+    counts: StatusCounts = {}
+    for document_type, status, count in result.all():
+        counts.setdefault(document_type, {})[status.value] = count
+    return DocumentSummary(counts)
+
+
+class DocumentSummaryCache:
+    """
+    In-process cache of each user's DocumentSummary.
+
+    Any flushed insert, update or delete of a Document publishes a
+    "document_summary" invalidation for its owner, so approvals, reuploads and
+    confirmed uploads evict the entry on every worker once they commit; writes that
+    bypass the ORM (bulk inserts and deletes) publish it themselves.
+    """
+
+    def __init__(self, ttl: float = DOCUMENT_SUMMARY_TTL):
+        self._ttl = ttl
+        self._summaries: Dict[int, Tuple[DocumentSummary, float]] = {}
+        # Bumped on every invalidation; a load that raced one is not cached
+        self._generation = 0
+
+    async def get(self, db: AsyncSession, user_id: int) -> DocumentSummary:
+        """
+        The user's summary, computed on a miss with `db`, the caller's own session, so a
+        request never holds a second pooled connection. `db` must not have unflushed or
+        uncommitted document writes for the user, or they would be cached.
+        """
+        cached = self._summaries.get(user_id)
+        if cached and time.monotonic() - cached[1] < invalidation_bus.effective_ttl(self._ttl):
+            return cached[0]
+        generation = self._generation
+        summary = await summarize(db, user_id)
+        if generation == self._generation:
+            self._summaries[user_id] = (summary, time.monotonic())
+        return summary
+
+    def invalidate(self, user_id: int):
+        self._generation += 1
+        self._summaries.pop(user_id, None)
+
+    def clear(self):
+        self._generation += 1
+        self._summaries.clear()
+
+    def on_invalidation(self, id: Optional[str], version: Optional[int]):
+        if id is None:
+            self.clear()
+        else:
+            self.invalidate(int(id))
+
+
+# Global instance
+document_summary_cache = DocumentSummaryCache()
+invalidation_bus.track(Document, "document_summary", id_attr="user_id")
+invalidation_bus.subscribe("document_summary", document_summary_cache.on_invalidation)
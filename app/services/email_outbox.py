@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.database import async_session
+from app.models.email_outbox import EmailOutbox, EmailOutboxStatus
+from app.services.mail_service import smtp_pool, EMAIL_FROM, SMTP_POOL_SIZE, SMTP_CONNECT_TIMEOUT, SMTP_SEND_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "2"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+EMAIL_OUTBOX_BASE_BACKOFF = float(os.getenv("EMAIL_OUTBOX_BASE_BACKOFF", "5"))
+EMAIL_OUTBOX_MAX_BACKOFF = float(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF", "900"))
+# Worst case for one message: two attempts, each a NOOP probe or connect plus the send
+_WORST_SEND_SECONDS = 2 * (2 * SMTP_CONNECT_TIMEOUT + SMTP_SEND_TIMEOUT)
+# A claimed row becomes claimable again after this long, so a worker dying mid-send does not lose mail.
+# It must outlast a whole batch going through the pool in ceil(batch / pool size) rounds, or another
+# worker re-claims rows still being sent and the recipient gets the mail twice; the env value is a floor.
+EMAIL_OUTBOX_LEASE_SECONDS = max(
+    int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "0")),
+    math.ceil(EMAIL_OUTBOX_BATCH_SIZE / SMTP_POOL_SIZE) * _WORST_SEND_SECONDS + 60,
+)
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "7"))
+EMAIL_OUTBOX_PURGE_INTERVAL = float(os.getenv("EMAIL_OUTBOX_PURGE_INTERVAL", "3600"))
+# Replaces the body once a row is SENT or FAILED; bodies hold one-time codes that must not outlive delivery
+REDACTED_BODY = "[redacted]"
+
+# (id, recipient, subject, body, attempts)
+ClaimedEmail = Tuple[int, str, str, str, int]
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(EMAIL_OUTBOX_MAX_BACKOFF, EMAIL_OUTBOX_BASE_BACKOFF * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def build_message(recipient: str, subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = EMAIL_FROM
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+class EmailOutboxService:
+    """
+    Durable outbox for transactional email.
+
+    Request handlers call enqueue() and commit the row together with whatever it
+    belongs to (e.g. the OTP), so the response never waits on SMTP. The worker
+    claims due rows with FOR UPDATE SKIP LOCKED, which lets several app workers
+    drain the table without sending the same message twice, sends each batch
+    concurrently over the SMTP pool and reschedules failures with exponential backoff.
+    """
+
+    def __init__(self, batch_size: int = EMAIL_OUTBOX_BATCH_SIZE, poll_interval: float = EMAIL_OUTBOX_POLL_INTERVAL):
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    @staticmethod
+    def enqueue(db: AsyncSession, recipient: str, subject: str, body: str) -> EmailOutbox:
+        """Stage an email in the caller's transaction; it is sent once the caller commits"""
+        message = EmailOutbox(
+            recipient=recipient,
+            subject=subject,
+            body=body,
+            status=EmailOutboxStatus.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        )
+        db.add(message)
+        return message
+
+    def wake(self):
+        """Let the worker in this process pick up newly committed rows without waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _claim_batch(self) -> List[ClaimedEmail]:
+        now = datetime.utcnow()
+        async with async_session() as db:
+            async with db.begin():
+                result = await db.execute(
+                    select(EmailOutbox)
+                    .filter(
+                        EmailOutbox.status == EmailOutboxStatus.PENDING,
+                        EmailOutbox.next_attempt_at <= now
+                    )
+                    .order_by(EmailOutbox.next_attempt_at)
+                    .limit(self._batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                claimed = []
+                for row in result.scalars().all():
+                    row.attempts += 1
+                    row.next_attempt_at = now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS)
+                    claimed.append((row.id, row.recipient, row.subject, row.body, row.attempts))
+        return claimed
+
+    async def _record_results(self, claimed: List[ClaimedEmail], results: list):
+        now = datetime.utcnow()
+        sent_ids = [email[0] for email, error in zip(claimed, results) if error is None]
+        async with async_session() as db:
+            if sent_ids:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent_ids))
+                    .values(status=EmailOutboxStatus.SENT, sent_at=now, last_error=None, body=REDACTED_BODY)
+                )
+                self.sent += len(sent_ids)
+            for (email_id, recipient, _, _, attempts), error in zip(claimed, results):
+                if error is None:
+                    continue
+                if attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    values = {"status": EmailOutboxStatus.FAILED, "last_error": str(error), "body": REDACTED_BODY}
+                    self.failed += 1
+                    logger.error(f"Giving up on email {email_id} to {recipient} after {attempts} attempts: {str(error)}")
+                else:
+                    values = {"next_attempt_at": now + _backoff(attempts), "last_error": str(error)}
+                    self.retried += 1
+                    logger.warning(f"Email {email_id} to {recipient} failed (attempt {attempts}), will retry: {str(error)}")
+                await db.execute(update(EmailOutbox).where(EmailOutbox.id == email_id).values(**values))
+            await db.commit()
+
+    @staticmethod
+    async def _send(recipient: str, subject: str, body: str) -> Optional[Exception]:
+        try:
+            await smtp_pool.send_message(build_message(recipient, subject, body))
+            return None
+        except Exception as e:
+            return e
+
+    async def process_batch(self) -> int:
+        """Claim, send and record one batch; returns the number of rows claimed"""
+        claimed = await self._claim_batch()
+        if not claimed:
+            return 0
+        # The SMTP pool caps how many of these are on the wire at once
+        results = await asyncio.gather(*(self._send(recipient, subject, body) for _, recipient, subject, body, _ in claimed))
+        await self._record_results(claimed, results)
+        logger.debug(f"Processed {len(claimed)} outbox emails")
+        return len(claimed)
+
+    async def purge_finished(self) -> int:
+        """Delete SENT and FAILED rows older than EMAIL_OUTBOX_RETENTION_DAYS"""
+        cutoff = datetime.utcnow() - timedelta(days=EMAIL_OUTBOX_RETENTION_DAYS)
+        async with async_session() as db:
+            result = await db.execute(
+                delete(EmailOutbox).where(
+                    or_(
+                        and_(EmailOutbox.status == EmailOutboxStatus.SENT, EmailOutbox.sent_at < cutoff),
+                        and_(EmailOutbox.status == EmailOutboxStatus.FAILED, EmailOutbox.created_at < cutoff),
+                    )
+                )
+            )
+            await db.commit()
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} finished outbox emails")
+        return result.rowcount
+
+    async def _worker_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                claimed = await self.process_batch()
+                if loop.time() - self._last_purge >= EMAIL_OUTBOX_PURGE_INTERVAL:
+                    self._last_purge = loop.time()
+                    await self.purge_finished()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in email outbox worker: {str(e)}")
+                claimed = 0
+            if claimed >= self._batch_size:
+                # More rows are probably due; keep draining
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._worker_loop())
+            logger.info("Email outbox worker started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Email outbox worker stopped")
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+
+# Global instance
+email_outbox = EmailOutboxService()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import time
+from email.message import Message
+from typing import List, Optional, Tuple
+import aiosmtplib
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+EMAIL_FROM = os.getenv("EMAIL_FROM")
+
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "3"))
+SMTP_CONNECT_TIMEOUT = float(os.getenv("SMTP_CONNECT_TIMEOUT", "10"))
+SMTP_SEND_TIMEOUT = float(os.getenv("SMTP_SEND_TIMEOUT", "15"))
+# Connections idle longer than this are probed with NOOP before reuse
+SMTP_HEALTHCHECK_AFTER = float(os.getenv("SMTP_HEALTHCHECK_AFTER", "30"))
+# Connections idle longer than this are closed instead of reused; most servers drop them around 5 minutes
+SMTP_MAX_IDLE = float(os.getenv("SMTP_MAX_IDLE", "240"))
+
+
+class SMTPConnectionPool:
+    """
+    Small pool of authenticated aiosmtplib connections kept open between sends.
+
+    At most `size` connections exist at once; senders beyond that wait for one to be
+    released. Idle connections are reused most-recently-used first, probed with NOOP
+    when they have been idle a while, and dropped once idle past SMTP_MAX_IDLE.
+    """
+
+    def __init__(
+        self,
+        hostname: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = SMTP_PASSWORD,
+        size: int = SMTP_POOL_SIZE,
+        send_timeout: float = SMTP_SEND_TIMEOUT,
+    ):
+        self._hostname = hostname
+        self._port = port
+        self._username = username
+        self._password = password
+        self._size = size
+        self._send_timeout = send_timeout
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.connects = 0
+        self.sends = 0
+        self.failures = 0
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._size)
+        return self._slots
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self._hostname,
+            port=self._port,
+            username=self._username,
+            password=self._password,
+            use_tls=self._port == 465,
+            timeout=SMTP_CONNECT_TIMEOUT,
+        )
+        # connect() also runs STARTTLS (when offered) and logs in
+        await client.connect()
+        self.connects += 1
+        logger.debug(f"Opened SMTP connection to {self._hostname}:{self._port}")
+        return client
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            client, released_at = self._idle.pop()
+            idle_for = time.monotonic() - released_at
+            if not client.is_connected or idle_for > SMTP_MAX_IDLE:
+                await self._discard(client)
+                continue
+            if idle_for > SMTP_HEALTHCHECK_AFTER:
+                try:
+                    await client.noop(timeout=SMTP_CONNECT_TIMEOUT)
+                except aiosmtplib.SMTPException as e:
+                    logger.debug(f"Dropping stale SMTP connection: {str(e)}")
+                    await self._discard(client)
+                    continue
+            return client
+        return await self._connect()
+
+    def _checkin(self, client: aiosmtplib.SMTP):
+        if client.is_connected:
+            self._idle.append((client, time.monotonic()))
+
+    @staticmethod
+    async def _discard(client: aiosmtplib.SMTP):
+        try:
+            if client.is_connected:
+                await client.quit(timeout=SMTP_CONNECT_TIMEOUT)
+        except Exception:
+            client.close()
+
+    async def send_message(self, message: Message):
+        """Send a message on a pooled connection, retrying once on a fresh connection if the reused one was dropped"""
+        async with self._get_slots():
+            for attempt in range(2):
+                client = await self._checkout()
+                try:
+                    await asyncio.wait_for(client.send_message(message), timeout=self._send_timeout)
+                except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    await self._discard(client)
+                    if attempt == 0:
+                        logger.debug(f"SMTP connection dropped mid-send, retrying on a new one: {str(e)}")
+                        continue
+                    self.failures += 1
+                    raise
+                except BaseException:
+                    # Timeouts and protocol errors leave the connection in an unknown state; a QUIT
+                    # would queue behind whatever the server is still doing, so drop it outright
+                    client.close()
+                    self.failures += 1
+                    raise
+                self._checkin(client)
+                self.sends += 1
+                return
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for client, _ in idle:
+            await self._discard(client)
+
+    def stats(self) -> dict:
+        return {
+            "idle_connections": len(self._idle),
+            "connects": self.connects,
+            "sends": self.sends,
+            "failures": self.failures,
+        }
+
+
+def is_configured() -> bool:
+    return bool(SMTP_USERNAME and SMTP_PASSWORD and EMAIL_FROM)
+
+
+# Global instance
+smtp_pool = SMTPConnectionPool()
@@ -5,7 +5,6 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.payment import Payment, PaymentType, PaymentStatus, PaymentNotification
 from app.models.user import User
 from app.models.notification import Notification, NotificationTargetType
-from app.models.registration import PartnershipLevel
 import logging
 
 logger = logging.getLogger(__name__)
@@ -141,7 +140,7 @@ class PaymentService:
             result = await db.execute(Select(User).filter(User.id == payment.user_id))
             user = result.scalar_one_or_none()
             
-            if user and user.partnership_level == payment.partnership_level.value:
+            if user and user.has_partnership(payment.partnership_level):
                 # Check if already deactivated
                 from app.models.payment import PartnershipDeactivation
                 existing_deactivation = await db.execute(
@@ -162,8 +161,8 @@ class PaymentService:
                     )
                     db.add(deactivation)
                     
-                    # Revert user to base level
-                    user.partnership_level = PartnershipLevel.DROP_SHIPPING.value
+                    # Drop only the unpaid partnership; the others stay active
+                    user.remove_partnership(payment.partnership_level)
                     db.add(user)
                     
                     logger.info(f"Partnership deactivated for user_id={payment.user_id}")
@@ -237,8 +237,8 @@ class RetentionService:
             # Users by partnership level
             users_by_level = {}
             for user in users:
-                level = user.partnership_level or "UNKNOWN"
-                users_by_level[level] = users_by_level.get(level, 0) + 1
+                for level in user.active_partnerships:
+                    users_by_level[level.value] = users_by_level.get(level.value, 0) + 1
             
             return {
                 "total_users": len(users),
@@ -0,0 +1,265 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, UploadFile
+from dotenv import load_dotenv
+from app.utils.uploads import SpooledUpload, StoredUpload, discard_upload, place_upload, spool_upload
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "local" (files under STORAGE_LOCAL_ROOT) or "s3" (any S3-compatible service)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", ".")
+S3_BUCKET = os.getenv("S3_BUCKET")
+# Set for MinIO, LocalStack or another S3 stand-in; unset for AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_REGION = os.getenv("S3_REGION")
+S3_KEY_PREFIX = os.getenv("S3_KEY_PREFIX", "")
+# Objects at least this large go up (and are copied) in parts of S3_MULTIPART_CHUNK_MB, S3_MAX_CONCURRENCY at a time
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "4"))
+# Lifetime of presigned upload forms
+STORAGE_PRESIGN_EXPIRY = int(os.getenv("STORAGE_PRESIGN_EXPIRY", "900"))
+# Keys direct uploads land under until confirmed; give it an S3 lifecycle rule to expire unconfirmed ones
+STORAGE_INCOMING_PREFIX = os.getenv("STORAGE_INCOMING_PREFIX", "uploads/incoming")
+
+MB = 1024 * 1024
+HASH_CHUNK_SIZE = MB
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded files live. Keys are relative paths such as
+    "uploads/blobs/ab/<sha>.pdf"; they are what the models store in file_path.
+
+    Uploads that pass through the API are spooled to a temp file in spool_dir(prefix)
+    and handed to put(), which consumes the temp file. Backends that support it
+    also hand out presigned forms so clients can upload straight to storage.
+    """
+
+    name = "base"
+    supports_presigned_uploads = False
+
+    @abstractmethod
+    def spool_dir(self, prefix: str) -> str:
+        """Local directory to spool uploads headed for keys under `prefix` in"""
+
+    @abstractmethod
+    async def put(self, spooled: SpooledUpload, key: str):
+        ...
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Size in bytes, or None when there is no such object"""
+
+    async def exists(self, key: str) -> bool:
+        return await self.size(key) is not None
+
+    @abstractmethod
+    async def sha256(self, key: str) -> Optional[str]:
+        """Hex SHA-256 of the object, or None when the backend has no verified digest for it"""
+
+    @abstractmethod
+    async def move(self, src: str, dst: str):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Delete the object; missing objects are ignored"""
+
+    async def presign_upload(self, key: str, max_bytes: int, sha256: str) -> dict:
+        raise HTTPException(status_code=400, detail=f"Direct uploads are not available with the {self.name} storage backend")
+
+
+class LocalStorage(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str = STORAGE_LOCAL_ROOT):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def spool_dir(self, prefix: str) -> str:
+        # On the destination's filesystem, so put() is a rename
+        return self._path(prefix)
+
+    async def put(self, spooled: SpooledUpload, key: str):
+        await place_upload(spooled, self._path(key))
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return await asyncio.to_thread(os.path.getsize, self._path(key))
+        except FileNotFoundError:
+            return None
+
+    async def sha256(self, key: str) -> str:
+        return await asyncio.to_thread(_hash_file, self._path(key))
+
+    async def move(self, src: str, dst: str):
+        def _move():
+            os.makedirs(os.path.dirname(self._path(dst)) or ".", exist_ok=True)
+            os.replace(self._path(src), self._path(dst))
+        await asyncio.to_thread(_move)
+
+    async def delete(self, key: str):
+        def _delete():
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+        await asyncio.to_thread(_delete)
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible object storage through boto3. Uploads and copies go through
+    s3transfer, which switches to concurrent multipart transfers above
+    S3_MULTIPART_THRESHOLD_MB. boto3 is blocking, so every call runs in a worker thread.
+    """
+
+    name = "s3"
+    supports_presigned_uploads = True
+
+    def __init__(self, bucket: Optional[str] = S3_BUCKET, endpoint_url: Optional[str] = S3_ENDPOINT_URL, prefix: str = S3_KEY_PREFIX):
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        # boto3 clients are thread-safe; one is shared by all worker threads
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=S3_REGION)
+        self._transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD_MB * MB,
+            multipart_chunksize=S3_MULTIPART_CHUNK_MB * MB,
+            max_concurrency=S3_MAX_CONCURRENCY,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def spool_dir(self, prefix: str) -> str:
+        return tempfile.gettempdir()
+
+    async def put(self, spooled: SpooledUpload, key: str):
+        try:
+            await asyncio.to_thread(
+                self._client.upload_file, spooled.temp_path, self.bucket, self._key(key), Config=self._transfer_config
+            )
+        finally:
+            await discard_upload(spooled)
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            head = await asyncio.to_thread(self._client.head_object, Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def sha256(self, key: str) -> Optional[str]:
+        """
+        The SHA-256 S3 verified when the object was written, read with a HEAD instead
+        of downloading it. Objects uploaded without a checksum, or in parts (whose
+        checksum is a checksum of the parts), have none.
+        """
+        head = await asyncio.to_thread(
+            self._client.head_object, Bucket=self.bucket, Key=self._key(key), ChecksumMode="ENABLED"
+        )
+        checksum = head.get("ChecksumSHA256")
+        if not checksum or "-" in checksum:
+            return None
+        return base64.b64decode(checksum).hex()
+
+    async def move(self, src: str, dst: str):
+        # Server-side (multipart) copy; the bytes never pass through this worker
+        await asyncio.to_thread(
+            self._client.copy,
+            {"Bucket": self.bucket, "Key": self._key(src)},
+            self.bucket,
+            self._key(dst),
+            Config=self._transfer_config,
+        )
+        await self.delete(src)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+    async def presign_upload(self, key: str, max_bytes: int, sha256: str) -> dict:
+        """
+        A presigned POST form for `key` that S3 itself rejects above `max_bytes` or when
+        the file's SHA-256 is not `sha256` (hex), as computed by the client beforehand.
+        """
+        checksum = sha256_to_base64(sha256)
+        form = await asyncio.to_thread(
+            self._client.generate_presigned_post,
+            Bucket=self.bucket,
+            Key=self._key(key),
+            Fields={"x-amz-checksum-algorithm": "SHA256", "x-amz-checksum-sha256": checksum},
+            Conditions=[
+                ["content-length-range", 1, max_bytes],
+                {"x-amz-checksum-algorithm": "SHA256"},
+                {"x-amz-checksum-sha256": checksum},
+            ],
+            ExpiresIn=STORAGE_PRESIGN_EXPIRY,
+        )
+        return {"method": "POST", "url": form["url"], "fields": form["fields"], "expires_in": STORAGE_PRESIGN_EXPIRY}
+
+
+def sha256_to_base64(sha256: str) -> str:
+    """Hex SHA-256 as the base64 S3 uses in x-amz-checksum-sha256; 400 unless it is one"""
+    try:
+        digest = bytes.fromhex(sha256)
+    except (ValueError, TypeError):
+        digest = b""
+    if len(digest) != hashlib.sha256().digest_size:
+        raise HTTPException(status_code=400, detail="sha256 must be the file's hex SHA-256 digest")
+    return base64.b64encode(digest).decode()
+
+
+def create_storage() -> StorageBackend:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage()
+    if STORAGE_BACKEND != "local":
+        raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}'")
+    return LocalStorage()
+
+
+# Global instance
+storage = create_storage()
+
+
+async def save_upload(file: UploadFile, key: str, max_bytes: int) -> StoredUpload:
+    """Stream an upload that passes through the API into storage at `key`"""
+    spooled = await spool_upload(file, storage.spool_dir(os.path.dirname(key)), max_bytes)
+    try:
+        await storage.put(spooled, key)
+    except BaseException:
+        await discard_upload(spooled)
+        raise
+    return StoredUpload(path=key, size=spooled.size, sha256=spooled.sha256)
+
+
+def incoming_key(ext: str) -> str:
+    """A fresh key for a direct upload that has not been confirmed yet"""
+    return f"{STORAGE_INCOMING_PREFIX}/{uuid.uuid4().hex}{ext}"
@@ -0,0 +1,110 @@
+"""
+Tests for the Google signing-certificate cache, served by a local ASGI cert endpoint
+"""
+import asyncio
+import json
+import httpx
+import pytest
+from app.services.auth import google_verifier
+from app.services.auth.google_verifier import GoogleTokenVerifier, MIN_CERTS_MAX_AGE, MIN_FORCED_REFRESH_INTERVAL
+
+
+class CertServer:
+    """Minimal ASGI app standing in for Google's certs endpoint"""
+
+    def __init__(self, certs: dict, cache_control: str = "public, max-age=300", delay: float = 0):
+        self.certs = certs
+        self.cache_control = cache_control
+        self.delay = delay
+        self.requests = 0
+
+    async def __call__(self, scope, receive, send):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        body = json.dumps(self.certs).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"cache-control", self.cache_control.encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(google_verifier.time, "time", clock)
+    return clock
+
+
+def make_verifier(server: CertServer) -> GoogleTokenVerifier:
+    verifier = GoogleTokenVerifier(certs_url="http://certs.local/oauth2/v1/certs")
+    verifier._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server))
+    return verifier
+
+
+async def test_certs_are_cached_for_max_age(clock):
+    server = CertServer({"kid-1": "cert-1"}, cache_control="public, max-age=300")
+    verifier = make_verifier(server)
+
+    assert await verifier.get_certs("kid-1") == {"kid-1": "cert-1"}
+    clock.now += 299
+    await verifier.get_certs("kid-1")
+    assert server.requests == 1
+
+    clock.now += 2
+    await verifier.get_certs("kid-1")
+    assert server.requests == 2
+    await verifier.close()
+
+
+async def test_max_age_has_a_floor(clock):
+    server = CertServer({"kid-1": "cert-1"}, cache_control="no-cache, max-age=0")
+    verifier = make_verifier(server)
+
+    await verifier.get_certs()
+    clock.now += MIN_CERTS_MAX_AGE - 1
+    await verifier.get_certs()
+    assert server.requests == 1
+    await verifier.close()
+
+
+async def test_concurrent_misses_share_one_fetch(clock):
+    server = CertServer({"kid-1": "cert-1"}, delay=0.05)
+    verifier = make_verifier(server)
+
+    results = await asyncio.gather(*(verifier.get_certs("kid-1") for _ in range(20)))
+    assert all(certs == {"kid-1": "cert-1"} for certs in results)
+    assert server.requests == 1
+    await verifier.close()
+
+
+async def test_unknown_kid_forces_a_rate_limited_refresh(clock):
+    server = CertServer({"kid-1": "cert-1"})
+    verifier = make_verifier(server)
+    await verifier.get_certs("kid-1")
+
+    # Google rotated keys: a token with the new kid refreshes at once...
+    clock.now += MIN_FORCED_REFRESH_INTERVAL
+    server.certs = {"kid-1": "cert-1", "kid-2": "cert-2"}
+    assert "kid-2" in await verifier.get_certs("kid-2")
+    assert server.requests == 2
+
+    # ...but bogus kids right after cannot trigger a fetch per request
+    for _ in range(5):
+        await verifier.get_certs("bogus")
+    assert server.requests == 2
+
+    clock.now += MIN_FORCED_REFRESH_INTERVAL
+    await verifier.get_certs("bogus")
+    assert server.requests == 3
+    await verifier.close()
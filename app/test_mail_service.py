@@ -0,0 +1,127 @@
+"""
+Tests for the SMTP connection pool, against a local aiosmtpd server
+"""
+import asyncio
+import socket
+import time
+from email.message import EmailMessage
+import pytest
+from app.services import mail_service
+from app.services.mail_service import SMTPConnectionPool
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.messages = []
+        self.noops = 0
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        self.noops += 1
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.messages.append(envelope.content)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+def make_pool(controller, **kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool(hostname=controller.hostname, port=controller.port, username=None, password=None, **kwargs)
+
+
+def make_message(n: int) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = f"user{n}@example.com"
+    message["Subject"] = f"Message {n}"
+    message.set_content("hello")
+    return message
+
+
+async def test_connection_is_reused_across_sends(smtp_server):
+    pool = make_pool(smtp_server)
+    for n in range(3):
+        await pool.send_message(make_message(n))
+
+    assert len(smtp_server.handler.messages) == 3
+    assert pool.stats()["connects"] == 1
+    assert pool.stats()["sends"] == 3
+    await pool.close()
+
+
+async def test_idle_connection_is_probed_with_noop(smtp_server, monkeypatch):
+    pool = make_pool(smtp_server)
+    await pool.send_message(make_message(1))
+    assert smtp_server.handler.noops == 0
+
+    monkeypatch.setattr(mail_service, "SMTP_HEALTHCHECK_AFTER", 0)
+    await pool.send_message(make_message(2))
+    assert smtp_server.handler.noops == 1
+    assert pool.stats()["connects"] == 1
+    await pool.close()
+
+
+async def test_connection_idle_past_max_idle_is_replaced(smtp_server, monkeypatch):
+    pool = make_pool(smtp_server)
+    await pool.send_message(make_message(1))
+
+    client, released_at = pool._idle[0]
+    pool._idle[0] = (client, released_at - mail_service.SMTP_MAX_IDLE - 1)
+    await pool.send_message(make_message(2))
+    assert pool.stats()["connects"] == 2
+    await pool.close()
+
+
+async def test_reconnects_after_the_server_drops_the_connection():
+    handler = RecordingHandler()
+    port = free_port()
+    first = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    first.start()
+    pool = make_pool(first)
+    await pool.send_message(make_message(1))
+    first.stop()
+
+    # A new server on the same port; the pooled connection is now dead
+    second = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    second.start()
+    try:
+        await pool.send_message(make_message(2))
+    finally:
+        second.stop()
+
+    assert pool.stats()["connects"] == 2
+    assert pool.stats()["failures"] == 0
+    assert len(handler.messages) == 2
+    await pool.close()
+
+
+async def test_send_timeout_discards_the_connection(smtp_server):
+    smtp_server.handler.delay = 1.0
+    pool = make_pool(smtp_server, send_timeout=0.2)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.send_message(make_message(1))
+    assert time.monotonic() - started < 1.0
+    assert pool.stats()["failures"] == 1
+    assert pool.stats()["idle_connections"] == 0
+    await pool.close()
@@ -0,0 +1,73 @@
+"""
+Tests for token revocation, run against the in-memory store
+"""
+import time
+from jose import jwt
+from app.services.auth.revocation import BloomFilter, InMemoryRevocationStore, TokenRevocationService
+from app.services.auth.token_cache import token_digest
+
+
+def make_token(user_id: int, expires_in: float = 600) -> str:
+    return jwt.encode({"user_id": user_id, "exp": int(time.time() + expires_in)}, "test-secret", algorithm="HS256")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    digests = [token_digest(make_token(i)) for i in range(500)]
+    for digest in digests:
+        bloom.add(digest)
+    assert all(bloom.might_contain(digest) for digest in digests)
+
+
+def test_bloom_filter_false_positive_rate_is_bounded():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(token_digest(make_token(i)))
+    false_positives = sum(bloom.might_contain(token_digest(make_token(i))) for i in range(10000, 12000))
+    assert false_positives < 2000 * 0.05
+
+
+async def test_revoked_token_is_rejected_and_others_pass_the_fast_path():
+    service = TokenRevocationService(store=InMemoryRevocationStore())
+    revoked, other = make_token(1), make_token(2)
+    await service.revoke(revoked)
+
+    assert service.is_revoked(token_digest(revoked))
+    assert not service.is_revoked(token_digest(other))
+
+
+async def test_revocation_expires_with_the_token():
+    store = InMemoryRevocationStore()
+    service = TokenRevocationService(store=store)
+    token = make_token(1, expires_in=-1)
+    await service.revoke(token)
+
+    assert not service.is_revoked(token_digest(token))
+    await service.purge()
+    assert service.stats()["active"] == 0
+    assert await store.load_since(0) == []
+
+
+async def test_revocation_is_seen_by_other_workers_after_sync():
+    store = InMemoryRevocationStore()
+    worker_a = TokenRevocationService(store=store)
+    worker_b = TokenRevocationService(store=store)
+    await worker_b.sync()
+
+    token = make_token(1)
+    await worker_a.revoke(token)
+    assert not worker_b.is_revoked(token_digest(token))
+
+    await worker_b.sync()
+    assert worker_b.is_revoked(token_digest(token))
+
+
+async def test_purge_keeps_active_revocations():
+    service = TokenRevocationService(store=InMemoryRevocationStore())
+    active, expired = make_token(1), make_token(2, expires_in=-1)
+    await service.revoke(active)
+    await service.revoke(expired)
+
+    await service.purge()
+    assert service.is_revoked(token_digest(active))
+    assert service.stats()["active"] == 1
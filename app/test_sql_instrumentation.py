@@ -0,0 +1,56 @@
+"""
+Tests for per-request query budgets, with statements run on a SQLite engine inside a local ASGI app
+"""
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+from app.core import sql_instrumentation
+from app.core.sql_instrumentation import RequestContextMiddleware, instrument_engine
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+def make_app(engine, statements: int):
+    async def app(scope, receive, send):
+        with engine.connect() as conn:
+            for _ in range(statements):
+                conn.execute(text("SELECT 1"))
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return RequestContextMiddleware(app)
+
+
+async def get(app) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/items")
+
+
+async def test_statements_are_counted_in_server_timing(engine):
+    response = await get(make_app(engine, 3))
+    assert response.status_code == 200
+    assert 'desc="3 queries"' in response.headers["server-timing"]
+
+
+async def test_request_over_budget_is_logged(engine, monkeypatch, caplog):
+    monkeypatch.setattr(sql_instrumentation, "SQL_QUERY_BUDGETS", {"GET /items": 2})
+    response = await get(make_app(engine, 3))
+    assert response.status_code == 200
+    assert "over its budget of 2" in caplog.text
+
+
+async def test_enforced_budget_fails_the_response(engine, monkeypatch):
+    monkeypatch.setattr(sql_instrumentation, "SQL_QUERY_BUDGETS", {"GET /items": 2})
+    monkeypatch.setattr(sql_instrumentation, "SQL_QUERY_BUDGET_ENFORCE", True)
+
+    response = await get(make_app(engine, 3))
+    assert response.status_code == 500
+    assert response.text == "GET /items ran 3 SQL statements, over its budget of 2"
+
+    assert (await get(make_app(engine, 2))).status_code == 200
@@ -0,0 +1,159 @@
+"""
+Tests for the S3 storage backend and direct-upload adoption, against a local moto S3 server
+"""
+import base64
+import hashlib
+import os
+import socket
+import uuid
+import httpx
+import pytest
+from boto3.s3.transfer import TransferConfig
+from fastapi import HTTPException
+from app.services import blob_store as blob_store_module
+from app.services.blob_store import BlobStore
+from app.services.storage import MB, S3Storage
+from app.utils.uploads import SpooledUpload
+
+moto_server = pytest.importorskip("moto.server")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=free_port())
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3(s3_endpoint, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    storage = S3Storage(bucket=f"test-{uuid.uuid4().hex[:12]}", endpoint_url=s3_endpoint, prefix="")
+    storage._client.create_bucket(Bucket=storage.bucket)
+    return storage
+
+
+def spooled_file(tmp_path, content: bytes) -> SpooledUpload:
+    path = tmp_path / f"{uuid.uuid4().hex}.part"
+    path.write_bytes(content)
+    return SpooledUpload(temp_path=str(path), size=len(content), sha256=hashlib.sha256(content).hexdigest())
+
+
+def read(storage: S3Storage, key: str) -> bytes:
+    return storage._client.get_object(Bucket=storage.bucket, Key=key)["Body"].read()
+
+
+def put_with_checksum(storage: S3Storage, key: str, content: bytes):
+    checksum = base64.b64encode(hashlib.sha256(content).digest()).decode()
+    storage._client.put_object(Bucket=storage.bucket, Key=key, Body=content, ChecksumAlgorithm="SHA256", ChecksumSHA256=checksum)
+
+
+async def test_put_size_move_and_delete(s3, tmp_path):
+    spooled = spooled_file(tmp_path, b"%PDF-1.4 hello")
+    await s3.put(spooled, "uploads/incoming/a.pdf")
+
+    assert not os.path.exists(spooled.temp_path)
+    assert await s3.size("uploads/incoming/a.pdf") == len(b"%PDF-1.4 hello")
+    assert await s3.size("uploads/incoming/missing.pdf") is None
+
+    await s3.move("uploads/incoming/a.pdf", "uploads/blobs/ab/a.pdf")
+    assert not await s3.exists("uploads/incoming/a.pdf")
+    assert read(s3, "uploads/blobs/ab/a.pdf") == b"%PDF-1.4 hello"
+
+    await s3.delete("uploads/blobs/ab/a.pdf")
+    await s3.delete("uploads/blobs/ab/a.pdf")
+    assert not await s3.exists("uploads/blobs/ab/a.pdf")
+
+
+async def test_large_objects_are_uploaded_and_copied_in_parts(s3, tmp_path):
+    s3._transfer_config = TransferConfig(multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=2)
+    content = os.urandom(11 * MB)
+    await s3.put(spooled_file(tmp_path, content), "uploads/incoming/big.pdf")
+
+    head = s3._client.head_object(Bucket=s3.bucket, Key="uploads/incoming/big.pdf")
+    # Multipart ETags end in -<number of parts>
+    assert head["ETag"].strip('"').endswith("-3")
+
+    await s3.move("uploads/incoming/big.pdf", "uploads/blobs/bi/big.pdf")
+    assert read(s3, "uploads/blobs/bi/big.pdf") == content
+
+
+async def test_presigned_form_uploads_straight_to_storage(s3):
+    content = b"%PDF-1.4 direct"
+    sha256 = hashlib.sha256(content).hexdigest()
+    form = await s3.presign_upload("uploads/incoming/direct.pdf", max_bytes=MB, sha256=sha256)
+
+    assert form["fields"]["x-amz-checksum-sha256"] == base64.b64encode(bytes.fromhex(sha256)).decode()
+    async with httpx.AsyncClient() as client:
+        response = await client.post(form["url"], data=form["fields"], files={"file": ("direct.pdf", content)})
+    assert response.status_code in (200, 201, 204)
+    assert read(s3, "uploads/incoming/direct.pdf") == content
+
+
+async def test_presign_rejects_a_malformed_digest(s3):
+    with pytest.raises(HTTPException) as e:
+        await s3.presign_upload("uploads/incoming/x.pdf", max_bytes=MB, sha256="not-a-digest")
+    assert e.value.status_code == 400
+
+
+@pytest.fixture
+def store(s3, monkeypatch):
+    monkeypatch.setattr(blob_store_module, "storage", s3)
+    store = BlobStore(root="uploads/blobs")
+
+    async def reference(db, blobs):
+        # Stands in for the Postgres upsert; only the path it returns matters here
+        return {sha256: store.path_for(sha256, ext) for sha256, (ext, size, count) in blobs.items()}
+
+    monkeypatch.setattr(store, "_reference", reference)
+    return store
+
+
+async def test_adopt_moves_a_verified_upload_without_downloading_it(s3, store):
+    content = b"%PDF-1.4 adopt me"
+    sha256 = hashlib.sha256(content).hexdigest()
+    put_with_checksum(s3, "uploads/incoming/new.pdf", content)
+
+    stored = await store.adopt(None, "uploads/incoming/new.pdf", MB, sha256)
+    assert stored.path == store.path_for(sha256, ".pdf")
+    assert not stored.deduplicated
+    assert read(s3, stored.path) == content
+    assert not await s3.exists("uploads/incoming/new.pdf")
+
+    put_with_checksum(s3, "uploads/incoming/again.pdf", content)
+    again = await store.adopt(None, "uploads/incoming/again.pdf", MB, sha256)
+    assert again.deduplicated
+    assert not await s3.exists("uploads/incoming/again.pdf")
+
+
+async def test_adopt_rejects_uploads_without_a_matching_checksum(s3, store):
+    content = b"%PDF-1.4 claimed"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    s3._client.put_object(Bucket=s3.bucket, Key="uploads/incoming/plain.pdf", Body=content)
+    put_with_checksum(s3, "uploads/incoming/other.pdf", b"%PDF-1.4 other")
+    for key in ("uploads/incoming/plain.pdf", "uploads/incoming/other.pdf"):
+        with pytest.raises(HTTPException) as e:
+            await store.adopt(None, key, MB, sha256)
+        assert e.value.status_code == 400
+        assert not await s3.exists(key)
+
+
+async def test_adopt_rejects_oversized_uploads(s3, store):
+    content = b"x" * 2048
+    put_with_checksum(s3, "uploads/incoming/huge.pdf", content)
+
+    with pytest.raises(HTTPException) as e:
+        await store.adopt(None, "uploads/incoming/huge.pdf", 1024, hashlib.sha256(content).hexdigest())
+    assert e.value.status_code == 413
+    assert not await s3.exists("uploads/incoming/huge.pdf")
@@ -0,0 +1,99 @@
+"""
+Tests for the streaming upload writer over a temp directory, and for the multipart
+request size limit in front of a local ASGI app
+"""
+import hashlib
+import io
+import os
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+from app.utils import uploads
+from app.utils.uploads import MB, UploadSizeLimitMiddleware, discard_upload, place_upload, spool_upload
+
+
+async def read_body(scope, receive, send):
+    size = 0
+    while True:
+        message = await receive()
+        size += len(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(size).encode()})
+
+
+def make_client(max_bytes: int) -> httpx.AsyncClient:
+    app = UploadSizeLimitMiddleware(read_body, max_bytes=max_bytes)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_upload_over_the_limit_is_refused_from_content_length():
+    async with make_client(1 * MB) as client:
+        response = await client.post("/documents/upload", files={"files": ("big.pdf", b"x" * (2 * MB))})
+    assert response.status_code == 413
+    assert "1 MB limit" in response.json()["detail"]
+
+
+async def test_upload_under_the_limit_and_other_bodies_pass():
+    async with make_client(1 * MB) as client:
+        small = await client.post("/documents/upload", files={"files": ("small.pdf", b"x" * 1024)})
+        json_body = await client.post("/auth/login", content=b"x" * (2 * MB), headers={"content-type": "application/json"})
+    assert small.status_code == 200
+    assert json_body.status_code == 200
+
+
+def make_upload(content: bytes, filename: str = "doc.pdf") -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+def leftover_parts(directory) -> list:
+    return [name for name in os.listdir(directory) if name.endswith(".part")]
+
+
+async def test_spool_computes_size_and_digest_and_places_the_file(tmp_path, monkeypatch):
+    # Several chunks, the last one partial
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 1000)
+    content = os.urandom(4500)
+    spooled = await spool_upload(make_upload(content), str(tmp_path), max_bytes=MB)
+
+    assert spooled.size == len(content)
+    assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+    assert os.path.dirname(spooled.temp_path) == str(tmp_path)
+
+    final_path = tmp_path / "ab" / "doc.pdf"
+    await place_upload(spooled, str(final_path))
+    assert final_path.read_bytes() == content
+    assert not os.path.exists(spooled.temp_path)
+    assert leftover_parts(tmp_path) == []
+
+
+async def test_place_replaces_an_existing_file_whole(tmp_path):
+    final_path = tmp_path / "doc.pdf"
+    final_path.write_bytes(b"old contents that are longer")
+    spooled = await spool_upload(make_upload(b"new"), str(tmp_path), max_bytes=MB)
+
+    await place_upload(spooled, str(final_path))
+    assert final_path.read_bytes() == b"new"
+
+
+async def test_spool_over_the_cap_aborts_and_removes_its_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 1000)
+    upload = make_upload(b"x" * 5000)
+    with pytest.raises(HTTPException) as e:
+        await spool_upload(upload, str(tmp_path), max_bytes=2500)
+
+    assert e.value.status_code == 413
+    # Stopped at the first chunk past the cap, not after reading everything
+    assert upload.file.tell() == 3000
+    assert "doc.pdf" in e.value.detail
+    assert leftover_parts(tmp_path) == []
+
+
+async def test_discard_removes_the_spooled_file(tmp_path):
+    spooled = await spool_upload(make_upload(b"duplicate bytes"), str(tmp_path), max_bytes=MB)
+    assert leftover_parts(tmp_path)
+
+    await discard_upload(spooled)
+    await discard_upload(spooled)
+    assert leftover_parts(tmp_path) == []
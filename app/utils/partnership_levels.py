@@ -72,9 +72,7 @@ async def update_partnership_level(user: User, kpi_score: float, db: AsyncSessio
     partnership_levels = partnership_dic
     
     # Get current partnerships as array
-    current_partnerships = user.partnership_level if user.partnership_level else ["DROP_SHIPPING"]
-    if isinstance(current_partnerships, str):
-        current_partnerships = [current_partnerships]
+    current_partnerships = [p.value for p in user.active_partnerships]
     
     # Find highest current level
     highest_level_str = "DROP_SHIPPING"
@@ -92,8 +90,7 @@ async def update_partnership_level(user: User, kpi_score: float, db: AsyncSessio
     if kpi_score >= next_level["min_kpi"] and is_retention_period_over(user.retention_period, user.retention_start_date or current_date, current_date):
         # Add new partnership to array if not already present
         if next_level["level"] not in current_partnerships:
-            current_partnerships.append(next_level["level"])
-            user.partnership_level = current_partnerships
+            user.add_partnership(PartnershipLevel(next_level["level"]))
             user.retention_period = next_level["retention"]
             user.retention_start_date = datetime.utcnow()
             
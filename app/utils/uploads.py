@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from fastapi import HTTPException, UploadFile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Bytes read from the client and written per step; peak memory per upload is about one chunk
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MB = 1024 * 1024
+# Maximum upload size per kind, in MB; UPLOAD_MAX_SIZES_MB (JSON) overrides entries
+UPLOAD_MAX_SIZES = {
+    kind: int(float(size_mb) * MB)
+    for kind, size_mb in {
+        "default": 20,
+        "product_catalog": 100,
+        "certifications": 50,
+        "appointment": 20,
+        "team_image": 5,
+        **json.loads(os.getenv("UPLOAD_MAX_SIZES_MB", "{}")),
+    }.items()
+}
+
+
+# Whole multipart request body, which may hold several files; UploadSizeLimitMiddleware
+# refuses larger requests before they are received, the per-file caps above apply as files are copied
+UPLOAD_MAX_REQUEST_BYTES = int(float(os.getenv("UPLOAD_MAX_REQUEST_MB", "250")) * MB)
+
+
+def max_size_for(kind: str) -> int:
+    return UPLOAD_MAX_SIZES.get(kind, UPLOAD_MAX_SIZES["default"])
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+
+
+@dataclass
+class SpooledUpload:
+    """An upload received into a temp file but not yet placed; see spool_upload()"""
+    temp_path: str
+    size: int
+    sha256: str
+
+
+def _open_temp(directory: str) -> tuple:
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _write_chunk(out, hasher, chunk: bytes):
+    # hashlib releases the GIL on large buffers, so hashing here does not stall other threads
+    hasher.update(chunk)
+    out.write(chunk)
+
+
+def _place(temp_path: str, final_path: str):
+    fd = os.open(temp_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
+    os.replace(temp_path, final_path)
+
+
+def _discard(temp_path: str):
+    if os.path.exists(temp_path):
+        os.unlink(temp_path)
+
+
+def _close_and_discard(out, temp_path: str):
+    try:
+        out.close()
+    finally:
+        _discard(temp_path)
+
+
+async def spool_upload(file: UploadFile, directory: str, max_bytes: int) -> SpooledUpload:
+    """
+    Receive `file` into a temp file in `directory` in UPLOAD_CHUNK_SIZE chunks.
+
+    All blocking I/O runs in a worker thread, the SHA-256 and size are computed as
+    the chunks pass, and the copy is aborted with a 413 as soon as it exceeds
+    `max_bytes` (the request body as a whole is bounded by UploadSizeLimitMiddleware). Nothing is fsynced yet: the caller either place_upload()s the
+    temp file or discard_upload()s it, e.g. once the digest shows the bytes are
+    already stored.
+    """
+    out, temp_path = await asyncio.to_thread(_open_temp, directory)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{file.filename} is larger than the {max_bytes // MB} MB limit",
+                )
+            await asyncio.to_thread(_write_chunk, out, hasher, chunk)
+        await asyncio.to_thread(out.close)
+    except BaseException:
+        await asyncio.shield(asyncio.to_thread(_close_and_discard, out, temp_path))
+        raise
+    return SpooledUpload(temp_path=temp_path, size=size, sha256=hasher.hexdigest())
+
+
+async def place_upload(spooled: SpooledUpload, final_path: str):
+    """fsync the spooled file and rename it into place, so readers never see a partial file"""
+    await asyncio.to_thread(_place, spooled.temp_path, final_path)
+
+
+async def discard_upload(spooled: SpooledUpload):
+    await asyncio.shield(asyncio.to_thread(_discard, spooled.temp_path))
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Pure ASGI middleware bounding multipart request bodies to UPLOAD_MAX_REQUEST_BYTES.
+
+    Starlette spools a multipart body to temp files before the route runs, so
+    spool_upload()'s per-file cap only bounds the copy that follows. This answers
+    413 from Content-Length without reading the body, and stops bodies sent without
+    one (or larger than declared) once they pass the limit.
+    """
+
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._is_multipart(scope):
+            await self.app(scope, receive, send)
+            return
+        detail = f"Request body is larger than the {self.max_bytes // MB} MB limit"
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            body = json.dumps({"detail": detail}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Surfaces from the route's form parsing as the 413 response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+    @staticmethod
+    def _is_multipart(scope) -> bool:
+        return dict(scope["headers"]).get(b"content-type", b"").startswith(b"multipart/form-data")
+
@@ -0,0 +1,32 @@
+"""Make created_at NOT NULL on keyset-paginated tables
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-16
+
+List endpoints page over (created_at, id) and put created_at in the cursor. A NULL
+created_at sorts first under DESC and cannot be encoded, so rows without one are
+backfilled with the migration time before the column is made NOT NULL.
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3b4c5d6e7f8'
+down_revision: Union[str, Sequence[str], None] = 'f2a3b4c5d6e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['users', 'documents', 'jobs', 'notifications', 'appointments', 'payments', 'partnership_deactivations']
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.execute(f"UPDATE {table} SET created_at = now() WHERE created_at IS NULL")
+        op.alter_column(table, 'created_at', nullable=False)
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.alter_column(table, 'created_at', nullable=True)
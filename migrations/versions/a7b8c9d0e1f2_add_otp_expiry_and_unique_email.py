@@ -0,0 +1,36 @@
+"""Add expires_at to otps and make email unique for upserts
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, Sequence[str], None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep only the newest OTP per email before enforcing uniqueness
+    op.execute("DELETE FROM otps a USING otps b WHERE a.email = b.email AND a.id < b.id")
+
+    op.add_column('otps', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    # Give codes issued before the deploy a fresh 10-minute window
+    op.execute("UPDATE otps SET expires_at = (now() AT TIME ZONE 'utc') + interval '10 minutes'")
+    op.alter_column('otps', 'expires_at', nullable=False)
+    op.create_index(op.f('ix_otps_expires_at'), 'otps', ['expires_at'], unique=False)
+
+    op.drop_index('ix_otps_email', table_name='otps', if_exists=True)
+    op.create_index('ux_otps_email', 'otps', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_otps_email', table_name='otps')
+    op.create_index('ix_otps_email', 'otps', ['email'], unique=False)
+    op.drop_index(op.f('ix_otps_expires_at'), table_name='otps')
+    op.drop_column('otps', 'expires_at')
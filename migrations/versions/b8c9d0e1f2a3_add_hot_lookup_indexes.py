@@ -0,0 +1,44 @@
+"""Add indexes for hot lookup columns
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-16
+
+Indexes recommended by app/index_advisor.py. They are built CONCURRENTLY so
+payments, notifications and appointments stay writable during the deploy.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, Sequence[str], None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_payments_stripe_payment_id', 'payments', ['stripe_payment_id'], {'postgresql_where': sa.text('stripe_payment_id IS NOT NULL')}),
+    ('ix_payments_user_id_created_at', 'payments', ['user_id', 'created_at'], {}),
+    ('ix_payments_overdue', 'payments', ['next_payment_due'], {'postgresql_where': sa.text("payment_type = 'MONTHLY' AND payment_status = 'FAILED'")}),
+    ('ix_payment_notifications_payment_id_type', 'payment_notifications', ['payment_id', 'notification_type'], {}),
+    ('ix_registration_levels_user_id', 'registration_levels', ['user_id'], {}),
+    ('ix_registration_info_user_id', 'registration_info', ['user_id'], {}),
+    ('ix_registration_products_user_id', 'registration_products', ['user_id'], {}),
+    ('ix_notifications_visible_target_created_at', 'notifications', ['target_type', 'created_at'], {'postgresql_where': sa.text('visibility')}),
+    ('ix_appointments_slot', 'appointments', ['appointment_date', 'appointment_time', 'time_zone'], {}),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,39 @@
+"""Add (created_at, id) indexes for keyset pagination
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-16
+
+List endpoints page newest first over (created_at, id); these indexes turn each
+page into a range scan from the cursor.
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, Sequence[str], None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_users_created_at_id', 'users'),
+    ('ix_documents_created_at_id', 'documents'),
+    ('ix_appointments_created_at_id', 'appointments'),
+    ('ix_jobs_created_at_id', 'jobs'),
+    ('ix_partnership_deactivations_created_at_id', 'partnership_deactivations'),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.create_index(name, table, ['created_at', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,61 @@
+"""Store users.partnership_level as JSONB with a GIN index
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-16
+
+Converts the column to JSONB, backfills every row to a JSON array of level
+names (legacy rows hold NULL or a bare string), and adds a jsonb_path_ops GIN
+index so "which users hold WHOLESALE" (partnership_level @> '["WHOLESALE"]')
+is an index lookup. The type change rewrites the users table under an
+exclusive lock; run it in a quiet window.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, Sequence[str], None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'users', 'partnership_level',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        postgresql_using='partnership_level::jsonb',
+    )
+    op.execute(
+        """
+        UPDATE users SET partnership_level = CASE
+            WHEN partnership_level IS NULL OR jsonb_typeof(partnership_level) = 'null'
+                OR partnership_level = '[]'::jsonb THEN '["DROP_SHIPPING"]'::jsonb
+            WHEN jsonb_typeof(partnership_level) = 'string' THEN jsonb_build_array(partnership_level)
+            ELSE partnership_level
+        END
+        WHERE partnership_level IS NULL OR jsonb_typeof(partnership_level) <> 'array'
+            OR partnership_level = '[]'::jsonb
+        """
+    )
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_partnership_level', 'users', ['partnership_level'], unique=False,
+            postgresql_using='gin', postgresql_ops={'partnership_level': 'jsonb_path_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_partnership_level', table_name='users', postgresql_concurrently=True, if_exists=True)
+    op.alter_column(
+        'users', 'partnership_level',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='partnership_level::json',
+    )
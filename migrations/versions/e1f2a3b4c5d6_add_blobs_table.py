@@ -0,0 +1,42 @@
+"""Add blobs table for content-addressed document storage
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-16
+
+Documents uploaded from now on point at uploads/blobs/<sha[:2]>/<sha><ext>,
+one file per distinct content with a reference count here. Existing documents
+keep their uploads/documents/... paths and are not counted.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f2a3b4c5d6'
+down_revision: Union[str, Sequence[str], None] = 'd0e1f2a3b4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('sha256'),
+        sa.UniqueConstraint('path'),
+    )
+    op.create_index(
+        'ix_blobs_unreferenced', 'blobs', ['updated_at'], unique=False,
+        postgresql_where=sa.text('ref_count <= 0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blobs_unreferenced', table_name='blobs')
+    op.drop_table('blobs')
@@ -0,0 +1,26 @@
+"""Redact bodies of sent and failed email_outbox rows
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-16
+
+Outbox bodies carry plaintext one-time codes. The worker now blanks them as
+soon as a row is SENT or FAILED; this clears the ones written before that.
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a3b4c5d6e7'
+down_revision: Union[str, Sequence[str], None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE email_outbox SET body = '[redacted]' WHERE status IN ('SENT', 'FAILED') AND body <> '[redacted]'")
+
+
+def downgrade() -> None:
+    # The codes are gone for good; nothing to restore
+    pass